@@ -65,13 +65,14 @@ def get_quick_stats():
 def calculate_success_rate():
     """Calculate the success rate of item matching."""
     try:
-        from items.models import Item, ItemMatch
+        from items.models import Item
+        from items.match_store import counted_matches
 
         total_lost = Item.objects.filter(item_type='lost').count()
         if total_lost == 0:
             return 0
 
-        matched_items = ItemMatch.objects.values('lost_item').distinct().count()
+        matched_items = counted_matches().values('lost_item').distinct().count()
         success_rate = int((matched_items / total_lost) * 100)
 
         return min(success_rate, 100)
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Item, Claim, ItemMatch
+from .models import Item, Claim, ItemMatch, Job
 
 @admin.register(Item)
 class ItemAdmin(admin.ModelAdmin):
@@ -16,6 +16,12 @@ class ClaimAdmin(admin.ModelAdmin):
 
 @admin.register(ItemMatch)
 class ItemMatchAdmin(admin.ModelAdmin):
-    list_display = ('lost_item', 'found_item', 'match_score', 'created_at')
-    list_filter = ('created_at',)
+    list_display = ('lost_item', 'found_item', 'match_score', 'scorer', 'active', 'created_at')
+    list_filter = ('active', 'scorer', 'created_at')
     search_fields = ('lost_item__name', 'found_item__name')
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = ('kind', 'status', 'attempts', 'run_after', 'created_at')
+    list_filter = ('kind', 'status')
+    search_fields = ('payload', 'last_error')
@@ -3,3 +3,10 @@ from django.apps import AppConfig
 
 class ItemsConfig(AppConfig):
     name = 'items'
+
+    def ready(self):
+        from . import signals  # noqa: F401
+        from .classifier import get_classifier
+
+        # Compile the keyword automaton once at startup, not on first search
+        get_classifier()
@@ -0,0 +1,301 @@
+"""
+Quality and throughput benchmark for the matchers.
+
+A deterministic corpus is built from the add_more_items templates. Each
+labeled pair is one lost report and one found report of the same object:
+the found side has typos, a paraphrased description, a reworded location
+and a date a few days later. Both sides carry the same owner initials and
+floor, so pairs made from the same template can still be told apart.
+Unpaired distractors are added on both sides.
+
+The corpus is never saved. Items are built in memory with ids of their own,
+candidate pairs come from the same blocking rule the database queries use,
+and the heuristic's phonetic and MinHash lookups are answered from keys
+computed up front, as the indexes would hold them. Results therefore do
+not depend on what the database contains, and nothing is written to it.
+
+Every scorer ranks the found items for each lost item. recall@k is the
+share of labeled lost items whose true match is ranked in the top k, and
+precision@k the share of top-k predictions that are true matches. Each
+scorer is also timed for pairs per second and, in a separate pass so the
+tracing does not slow the timing, measured for peak Python memory.
+"""
+
+import random
+import time
+import tracemalloc
+from collections import defaultdict, namedtuple
+from datetime import date, timedelta
+
+from .blocking import candidate_pairs
+from .heuristic import HEURISTIC_THRESHOLD, heuristic_score
+from .locations import apply_location_fields
+from .management.commands.add_more_items import ITEM_TEMPLATES
+from .match_store import MATCH_TOP_K_FOUND, MATCH_TOP_K_LOST
+from .matching import (
+    MATCH_THRESHOLD, MatchFeatures, score_candidates_vectorized, score_pairs_python, vectorized_available,
+)
+from .minhash import band_keys, signature, similar_signatures
+from .models import Item
+from .phonetic import full_name_key
+
+# The found report is made up to this many days after the loss
+DATE_JITTER_DAYS = 4
+
+# Corpus dates are spread over one year from here
+START_DATE = date(2024, 1, 1)
+
+SYNONYMS = {
+    'small': 'little',
+    'slightly': 'a bit',
+    'very': 'really',
+    'good': 'decent',
+    'has': 'with',
+    'contains': 'holding',
+    'case': 'cover',
+    'inside': 'in it',
+    'professional': 'pro',
+    'set': 'bunch',
+}
+
+ABBREVIATIONS = {
+    'Building': 'Bldg',
+    'Department': 'Dept',
+    'Laboratory': 'Lab',
+    'Center': 'Ctr',
+    'Room': 'Rm',
+    'Residence': 'Res',
+    'Student': 'Stu',
+}
+
+# lost and found hold Item field dicts; truth maps lost index to found index
+BenchmarkCorpus = namedtuple('BenchmarkCorpus', ['lost', 'found', 'truth'])
+
+def typo(word, rng):
+    """Swap, drop, double or replace one inner letter of a word"""
+    if len(word) < 4:
+        return word
+    position = rng.randrange(1, len(word) - 2)
+    kind = rng.randrange(4)
+    if kind == 0:
+        return word[:position] + word[position + 1] + word[position] + word[position + 2:]
+    if kind == 1:
+        return word[:position] + word[position + 1:]
+    if kind == 2:
+        return word[:position] + word[position] + word[position:]
+    return word[:position] + rng.choice('aeiourstnl') + word[position + 1:]
+
+def add_typos(text, rng, count=1):
+    """Put a typo into count random words of text"""
+    words = text.split()
+    for _ in range(count):
+        if words:
+            index = rng.randrange(len(words))
+            words[index] = typo(words[index], rng)
+    return ' '.join(words)
+
+def paraphrase(description, rng):
+    """Reorder the sentences, swap in synonyms and sometimes drop the last sentence"""
+    sentences = [sentence.strip().rstrip('.') for sentence in description.split('. ') if sentence.strip()]
+    rng.shuffle(sentences)
+    if len(sentences) > 2 and rng.random() < 0.3:
+        sentences.pop()
+    words = []
+    for word in '. '.join(sentences).split():
+        replacement = SYNONYMS.get(word.lower())
+        words.append(replacement if replacement and rng.random() < 0.6 else word)
+    return add_typos(' '.join(words), rng, count=rng.randint(0, 2)) + '.'
+
+def location_variant(location, rng):
+    """Abbreviate, lowercase or loosely reword a location"""
+    words = [ABBREVIATIONS.get(word, word) if rng.random() < 0.5 else word for word in location.split()]
+    location = ' '.join(words)
+    style = rng.randrange(3)
+    if style == 0:
+        return location.lower()
+    if style == 1:
+        return f"near {location}"
+    return location
+
+def base_report(template, rng):
+    """One lost report from a template, with its distinguishing details"""
+    initials = ''.join(rng.choice('ABCDEFGHJKLMNPRSTVW') for _ in range(2))
+    floor = rng.randint(1, 9)
+    return {
+        'name': template['name'],
+        'category': template['category'],
+        'description': f"{template['description']} Marked with the initials {initials}.",
+        'location': f"{template['location']}, floor {floor}",
+        'date': START_DATE + timedelta(days=rng.randrange(365)),
+    }
+
+def found_report(lost, rng):
+    """The matching found report, as a finder would word it"""
+    return dict(
+        lost,
+        name=add_typos(lost['name'], rng) if rng.random() < 0.5 else lost['name'],
+        description=paraphrase(lost['description'], rng),
+        location=location_variant(lost['location'], rng),
+        date=lost['date'] + timedelta(days=rng.randint(0, DATE_JITTER_DAYS)),
+    )
+
+def build_corpus(pairs=200, distractors=50, seed=42):
+    """Generate the same labeled corpus for the same arguments"""
+    rng = random.Random(seed)
+    lost = []
+    found = []
+    truth = {}
+    for index in range(pairs):
+        report = base_report(ITEM_TEMPLATES[index % len(ITEM_TEMPLATES)], rng)
+        truth[len(lost)] = len(found)
+        lost.append(report)
+        found.append(found_report(report, rng))
+    for _ in range(distractors):
+        lost.append(base_report(rng.choice(ITEM_TEMPLATES), rng))
+        found.append(found_report(base_report(rng.choice(ITEM_TEMPLATES), rng), rng))
+    return BenchmarkCorpus(lost, found, truth)
+
+def corpus_items(corpus):
+    """
+    Unsaved approved Items for the corpus; returns (lost, found, truth by id).
+
+    Ids are assigned here and the parsed location columns filled as a save
+    would fill them.
+    """
+    items = {'lost': [], 'found': []}
+    next_id = 1
+    for item_type, reports in (('lost', corpus.lost), ('found', corpus.found)):
+        for report in reports:
+            item = Item(id=next_id, item_type=item_type, status='approved', contact_info='benchmark@example.com', **report)
+            apply_location_fields(item)
+            items[item_type].append(item)
+            next_id += 1
+    lost, found = items['lost'], items['found']
+    truth = {lost[lost_index].id: found[found_index].id for lost_index, found_index in corpus.truth.items()}
+    return lost, found, truth
+
+def features(items):
+    """MatchFeatures of unsaved items"""
+    return [MatchFeatures(*(getattr(item, field) for field in MatchFeatures._fields)) for item in items]
+
+def rank_scored(scored):
+    """{lost_id: [found_id, ...]} best first, ties broken by id"""
+    candidates = defaultdict(list)
+    for lost_id, found_id, score in scored:
+        candidates[lost_id].append((-score, found_id))
+    return {lost_id: [found_id for _, found_id in sorted(ranked)] for lost_id, ranked in candidates.items()}
+
+def evaluate(rankings, truth, lost_ids, ks):
+    """Return (precision@k, recall@k) dicts keyed by k"""
+    precision = {}
+    recall = {}
+    for k in ks:
+        hits = sum(1 for lost_id, found_id in truth.items() if found_id in rankings.get(lost_id, [])[:k])
+        predicted = sum(min(k, len(rankings.get(lost_id, []))) for lost_id in lost_ids)
+        precision[k] = round(hits / predicted, 4) if predicted else 0.0
+        recall[k] = round(hits / len(truth), 4) if truth else 0.0
+    return precision, recall
+
+def heuristic_scorer(lost, found, pairs):
+    """
+    The report-time heuristic over the candidate pairs. Returns a run callable.
+
+    Phonetic name keys, description signatures and band keys are computed
+    once, as the indexes would hold them, so the timed run only scores.
+    """
+    name_keys = {item.id: full_name_key(item.name) for item in lost + found}
+    signatures = {}
+    bands = {}
+    for item in lost + found:
+        signatures[item.id] = signature(item.description)
+        bands[item.id] = set(band_keys(signatures[item.id])) if signatures[item.id] else set()
+
+    def run():
+        for lost_index, found_index in pairs:
+            lost_item = lost[lost_index]
+            found_item = found[found_index]
+            sound_alike = bool(name_keys[lost_item.id]) and name_keys[lost_item.id] == name_keys[found_item.id]
+            similar_description = bool(bands[lost_item.id] & bands[found_item.id]) and similar_signatures(
+                signatures[lost_item.id], signatures[found_item.id],
+            )
+            score = heuristic_score(lost_item, found_item, sound_alike, similar_description)
+            if score > HEURISTIC_THRESHOLD:
+                yield lost_item.id, found_item.id, score
+
+    return run
+
+def tfidf_scorer(lost, found, pairs, vectorized=False):
+    """The batch TF-IDF scorer over the candidate pairs. Returns a run callable."""
+    lost = features(lost)
+    found = features(found)
+    score = score_candidates_vectorized if vectorized else score_pairs_python
+
+    def run():
+        return score(lost, found, pairs, MATCH_THRESHOLD)
+
+    return run
+
+def available_scorers():
+    """Names of the scorers this installation can run"""
+    names = ['heuristic', 'tfidf_python']
+    if vectorized_available():
+        names.append('tfidf_vectorized')
+    return names
+
+def make_scorer(name, lost, found, pairs):
+    """Return the run callable for a scorer name"""
+    if name == 'heuristic':
+        return heuristic_scorer(lost, found, pairs)
+    return tfidf_scorer(lost, found, pairs, vectorized=name == 'tfidf_vectorized')
+
+def measure(run):
+    """Run once timed and once under tracemalloc; returns (scored, seconds, peak bytes)"""
+    started = time.perf_counter()
+    scored = list(run())
+    seconds = time.perf_counter() - started
+
+    tracemalloc.start()
+    try:
+        list(run())
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return scored, seconds, peak
+
+def benchmark_scorer(name, lost, found, pairs, truth, ks):
+    """Score the corpus with one scorer and summarise quality and cost"""
+    scored, seconds, peak = measure(make_scorer(name, lost, found, pairs))
+    precision, recall = evaluate(rank_scored(scored), truth, [item.id for item in lost], ks)
+    return {
+        'pairs_scored': len(pairs),
+        'matches': len(scored),
+        'seconds': round(seconds, 4),
+        'pairs_per_second': round(len(pairs) / seconds, 1) if seconds else None,
+        'peak_memory_bytes': peak,
+        'precision_at_k': precision,
+        'recall_at_k': recall,
+    }
+
+def run_benchmark(pairs=200, distractors=50, seed=42, ks=(1, 5, 10), scorers=None):
+    """Build the corpus in memory, benchmark each scorer and return a JSON-ready report"""
+    scorers = scorers or available_scorers()
+    corpus = build_corpus(pairs, distractors, seed)
+    lost, found, truth = corpus_items(corpus)
+    # Every scorer sees the same blocked candidates a matching run would
+    candidates, _ = candidate_pairs(features(lost), features(found))
+    results = {name: benchmark_scorer(name, lost, found, candidates, truth, ks) for name in scorers}
+    return {
+        'corpus': {
+            'seed': seed,
+            'pairs': pairs,
+            'distractors': distractors,
+            'lost_items': len(lost),
+            'found_items': len(found),
+            'candidate_pairs': len(candidates),
+        },
+        'ks': list(ks),
+        'threshold': MATCH_THRESHOLD,
+        'heuristic_threshold': HEURISTIC_THRESHOLD,
+        'match_top_k': {'lost': MATCH_TOP_K_LOST, 'found': MATCH_TOP_K_FOUND},
+        'scorers': results,
+    }
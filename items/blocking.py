@@ -0,0 +1,95 @@
+"""
+Candidate blocking for lost/found matching.
+
+Scoring every lost item against every found item wastes most of its work on
+pairs that cannot match. Blocking groups items by category and then keeps a
+pair only when the two dates fall within a window of each other, or when
+both were reported in the same parsed building. Dates are bucketed into
+window-sized buckets, so each item is compared only with the found items in
+its own and the two neighbouring buckets.
+"""
+
+from collections import defaultdict, namedtuple
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Q
+
+# Past this many days apart a pair is only kept if the building matches
+DATE_WINDOW_DAYS = getattr(settings, 'ITEMS_MATCH_DATE_WINDOW_DAYS', 30)
+
+BlockingReport = namedtuple('BlockingReport', ['total_pairs', 'candidate_pairs', 'pruned_pairs'])
+
+def block_index(items, window_days=DATE_WINDOW_DAYS):
+    """Index item positions by (category, date bucket) and (category, building)"""
+    by_bucket = defaultdict(list)
+    by_building = defaultdict(list)
+    for index, item in enumerate(items):
+        by_bucket[(item.category, item.date.toordinal() // window_days)].append(index)
+        if item.location_building:
+            by_building[(item.category, item.location_building)].append(index)
+    return by_bucket, by_building
+
+def block_matches(item, items, index, window_days=DATE_WINDOW_DAYS):
+    """Positions in items that share a block with item"""
+    by_bucket, by_building = index
+    day = item.date.toordinal()
+    bucket = day // window_days
+    matches = set()
+    for neighbour in (bucket - 1, bucket, bucket + 1):
+        for position in by_bucket.get((item.category, neighbour), ()):
+            if abs(items[position].date.toordinal() - day) <= window_days:
+                matches.add(position)
+    if item.location_building:
+        matches.update(by_building.get((item.category, item.location_building), ()))
+    return matches
+
+def candidate_pairs(lost, found, window_days=DATE_WINDOW_DAYS, changed_ids=None, pool_sizes=None):
+    """
+    Return (pairs, report) for two lists of MatchFeatures.
+
+    pairs is a sorted list of (lost index, found index) tuples that share a
+    category and either a date window or a building. With changed_ids only
+    pairs involving at least one of those items are produced, so an
+    incremental run costs in proportion to what changed. pool_sizes is
+    passed on to blocking_report when the lists are not the whole pool.
+    """
+    pairs = set()
+    found_index = block_index(found, window_days)
+    for lost_position, item in enumerate(lost):
+        if changed_ids is None or item.id in changed_ids:
+            for found_position in block_matches(item, found, found_index, window_days):
+                pairs.add((lost_position, found_position))
+
+    if changed_ids is not None:
+        lost_index = block_index(lost, window_days)
+        for found_position, item in enumerate(found):
+            if item.id in changed_ids:
+                for lost_position in block_matches(item, lost, lost_index, window_days):
+                    pairs.add((lost_position, found_position))
+
+    return sorted(pairs), blocking_report(lost, found, changed_ids, len(pairs), pool_sizes)
+
+def blocking_report(lost, found, changed_ids, candidate_count, pool_sizes=None):
+    """
+    Compare the candidates kept with every pair a run would otherwise score.
+
+    pool_sizes gives (approved lost, approved found) counts when lost and
+    found hold only the changed items and their candidates.
+    """
+    lost_count, found_count = pool_sizes or (len(lost), len(found))
+    if changed_ids is None:
+        total = lost_count * found_count
+    else:
+        changed_lost = sum(1 for item in lost if item.id in changed_ids)
+        changed_found = sum(1 for item in found if item.id in changed_ids)
+        total = changed_lost * found_count + changed_found * lost_count - changed_lost * changed_found
+    return BlockingReport(total, candidate_count, total - candidate_count)
+
+def candidate_filter(item, window_days=DATE_WINDOW_DAYS):
+    """The same blocking rule as a queryset filter for one item's counterparts"""
+    window = timedelta(days=window_days)
+    nearby = Q(date__gte=item.date - window, date__lte=item.date + window)
+    if item.location_building:
+        nearby |= Q(location_building=item.location_building)
+    return Q(category=item.category) & nearby
@@ -0,0 +1,122 @@
+"""
+Fallback cascade for searches that return nothing.
+
+The cascade has an ordered list of progressively broader tiers (related
+terms, category keywords, typo-tolerant terms, sound-alike names, category,
+location, item type, popular categories). Candidates for the tiers are
+gathered up front with a fixed number of queries: one trigram probe, one
+postings fetch and one grouped count. The phonetic tier adds a single
+indexed key lookup, and only when it is reached. The first non-empty tier
+is then chosen in memory instead of running an ``exists()`` query per
+tier. The tier that fired is returned and counted so the cascade can be
+tuned.
+"""
+
+from collections import Counter, namedtuple
+
+from django.db.models import Count
+
+from .classifier import classify
+from .models import Item
+from .phonetic import phonetic_item_ids
+from .search import MAX_RANKED_RESULTS, fetch_postings, rank_postings, sort_by_score, tokenize
+from .trigrams import similar_terms
+
+POPULAR_CATEGORIES = ['electronics', 'bags', 'keys', 'accessories', 'clothing', 'documents']
+
+# Fields searched by the related-terms tier
+RELATED_TERM_FIELDS = ('name', 'description', 'location')
+
+# Terms this short are too ambiguous for the fallback tiers
+MIN_FALLBACK_TERM_LENGTH = 3
+
+# How often each tier has answered a zero-result search in this process
+TIER_COUNTS = Counter()
+
+CascadeResult = namedtuple('CascadeResult', ['tier', 'item_ids', 'filters'])
+
+def run_cascade(search_params):
+    """Pick the first non-empty fallback tier for a set of search parameters"""
+    search = search_params.get('search', '')
+    category = search_params.get('category', '')
+    location = search_params.get('location', '')
+    item_type = search_params.get('item_type', '')
+
+    search_terms = [term for term in tokenize(search) if len(term) >= MIN_FALLBACK_TERM_LENGTH]
+    location_terms = [term for term in tokenize(location) if len(term) >= MIN_FALLBACK_TERM_LENGTH]
+
+    # Query 1: typo-tolerant expansions of the search terms
+    fuzzy_terms = set()
+    if search_terms:
+        for matches in similar_terms(search_terms).values():
+            fuzzy_terms.update(term for term, _ in matches)
+
+    # Query 2: postings for every term any tier could use
+    rows = fetch_postings(search_terms + sorted(fuzzy_terms) + location_terms)
+
+    # Query 3: how many approved items exist per (category, item_type)
+    group_counts = Counter()
+    for group in Item.objects.filter(status='approved').values('category', 'item_type').annotate(count=Count('id')):
+        group_counts[(group['category'], group['item_type'])] = group['count']
+    category_counts = Counter()
+    type_counts = Counter()
+    for (group_category, group_type), count in group_counts.items():
+        category_counts[group_category] += count
+        type_counts[group_type] += count
+
+    for tier, result in iter_tiers(search, search_terms, fuzzy_terms, category, location_terms,
+                                   item_type, rows, category_counts, type_counts):
+        if result is not None:
+            TIER_COUNTS[tier] += 1
+            return result
+
+    TIER_COUNTS['recent'] += 1
+    return CascadeResult('recent', None, {})
+
+def iter_tiers(search, search_terms, fuzzy_terms, category, location_terms,
+               item_type, rows, category_counts, type_counts):
+    """Yield (tier, result) in cascade order; result is None when a tier is empty"""
+    if search:
+        scores = rank_postings(rows, terms=set(search_terms), fields=RELATED_TERM_FIELDS)
+        yield 'terms', ids_result('terms', scores)
+
+        keyword_result = None
+        for keyword_category, _ in classify(search):
+            if category_counts[keyword_category]:
+                keyword_result = CascadeResult('category_keyword', None, {'category': keyword_category})
+                break
+        yield 'category_keyword', keyword_result
+
+        scores = rank_postings(rows, terms=fuzzy_terms, fields=('name', 'description'))
+        yield 'fuzzy', ids_result('fuzzy', scores)
+
+        # Misheard names ("Samsong", "Eirpods"): one indexed key lookup,
+        # only reached when every cheaper tier above came up empty
+        phonetic_ids = phonetic_item_ids(search)
+        phonetic_ranked = sorted(phonetic_ids, reverse=True)[:MAX_RANKED_RESULTS]
+        yield 'phonetic', CascadeResult('phonetic', phonetic_ranked, None) if phonetic_ids else None
+
+    if category:
+        yield 'category', CascadeResult('category', None, {'category': category}) if category_counts[category] else None
+
+    if location_terms:
+        scores = rank_postings(rows, terms=set(location_terms), fields=('location',))
+        yield 'location', ids_result('location', scores)
+
+    if item_type:
+        yield 'item_type', CascadeResult('item_type', None, {'item_type': item_type}) if type_counts[item_type] else None
+
+    for popular in POPULAR_CATEGORIES:
+        if category_counts[popular]:
+            yield 'popular', CascadeResult('popular', None, {'category': popular})
+            break
+
+def ids_result(tier, scores):
+    """Wrap ranked scores as a cascade result, or None if nothing matched"""
+    if not scores:
+        return None
+    return CascadeResult(tier, sort_by_score(scores, MAX_RANKED_RESULTS), None)
+
+def tier_stats():
+    """Return how often each tier fired, most frequent first"""
+    return dict(TIER_COUNTS.most_common())
@@ -0,0 +1,116 @@
+"""
+Keyword-based query classification.
+
+A keyword -> category table is compiled once per process into an
+Aho-Corasick automaton. Classifying a query is one linear pass over its
+characters that finds every keyword occurrence, however large the table
+grows. Keywords match anywhere in the text, as the original substring
+checks did, so 'phone' also fires inside 'iphone'.
+
+Extra or overriding entries can be supplied with the
+ITEMS_CATEGORY_KEYWORDS setting. It maps a keyword either to a category
+or to a (category, weight) pair.
+"""
+
+from collections import defaultdict, deque
+from functools import lru_cache
+
+from django.conf import settings
+
+DEFAULT_CATEGORY_KEYWORDS = {
+    'phone': 'electronics', 'mobile': 'electronics', 'laptop': 'electronics',
+    'computer': 'electronics', 'tablet': 'electronics', 'iphone': 'electronics',
+    'samsung': 'electronics', 'apple': 'electronics', 'android': 'electronics',
+    'airpods': 'electronics', 'headphones': 'electronics', 'earbuds': 'electronics',
+    'charger': 'electronics', 'cable': 'electronics', 'mouse': 'electronics',
+    'keyboard': 'electronics', 'speaker': 'electronics', 'camera': 'electronics',
+    'shirt': 'clothing', 'jacket': 'clothing', 'pants': 'clothing',
+    'shoes': 'clothing', 'dress': 'clothing', 'hoodie': 'clothing',
+    'jeans': 'clothing', 'sweater': 'clothing', 'coat': 'clothing',
+    'watch': 'accessories', 'glasses': 'accessories', 'jewelry': 'accessories',
+    'ring': 'accessories', 'necklace': 'accessories', 'bracelet': 'accessories',
+    'wallet': 'accessories', 'sunglasses': 'accessories', 'hat': 'accessories',
+    'purse': 'bags', 'backpack': 'bags', 'bag': 'bags', 'luggage': 'bags',
+    'suitcase': 'bags', 'briefcase': 'bags', 'handbag': 'bags',
+    'key': 'keys', 'keys': 'keys', 'keychain': 'keys', 'fob': 'keys',
+    'id': 'documents', 'passport': 'documents', 'license': 'documents',
+    'card': 'documents', 'certificate': 'documents', 'paper': 'documents'
+}
+
+DEFAULT_WEIGHT = 1.0
+
+class KeywordAutomaton:
+    """Aho-Corasick automaton mapping keyword occurrences to weighted categories"""
+
+    def __init__(self, table):
+        self._goto = [{}]
+        self._fail = [0]
+        self._output = [[]]
+        for keyword, (category, weight) in table.items():
+            self._add(keyword.lower(), category, weight)
+        self._link()
+
+    def _add(self, keyword, category, weight):
+        state = 0
+        for char in keyword:
+            next_state = self._goto[state].get(char)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto[state][char] = next_state
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append([])
+            state = next_state
+        self._output[state].append((keyword, category, weight))
+
+    def _link(self):
+        """Compute failure links breadth-first and merge suffix outputs"""
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fallback = self._fail[state]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                target = self._goto[fallback].get(char, 0)
+                self._fail[next_state] = target if target != next_state else 0
+                self._output[next_state] = self._output[next_state] + self._output[self._fail[next_state]]
+
+    def matches(self, text):
+        """Return the set of (keyword, category, weight) occurring in text"""
+        found = set()
+        state = 0
+        for char in text.lower():
+            while state and char not in self._goto[state]:
+                state = self._fail[state]
+            state = self._goto[state].get(char, 0)
+            found.update(self._output[state])
+        return found
+
+    def classify(self, text):
+        """Return [(category, weight), ...] for text, strongest first"""
+        weights = defaultdict(float)
+        for _, category, weight in self.matches(text):
+            weights[category] += weight
+        return sorted(weights.items(), key=lambda entry: (-entry[1], entry[0]))
+
+def keyword_table():
+    """Merge the default keyword table with ITEMS_CATEGORY_KEYWORDS"""
+    table = {keyword: (category, DEFAULT_WEIGHT) for keyword, category in DEFAULT_CATEGORY_KEYWORDS.items()}
+    for keyword, value in getattr(settings, 'ITEMS_CATEGORY_KEYWORDS', {}).items():
+        if isinstance(value, str):
+            value = (value, DEFAULT_WEIGHT)
+        table[keyword] = tuple(value)
+    return table
+
+@lru_cache(maxsize=None)
+def get_classifier():
+    """Return the process-wide automaton, compiling it on first use"""
+    return KeywordAutomaton(keyword_table())
+
+def classify(text):
+    """Return the categories suggested by text with their weights"""
+    if not text:
+        return []
+    return get_classifier().classify(text)
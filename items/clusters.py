@@ -0,0 +1,158 @@
+"""
+Hierarchical grid of item counts for the map view.
+
+Every approved item with coordinates is counted in the geohash cell that
+contains it at each precision from 1 to CLUSTER_LEVELS, together with the
+sums of its coordinates so each cell can be drawn at its items' centroid.
+Item signals apply +1/-1 deltas to the affected cells as items change.
+A map request reads only the cells covering its viewport at a precision
+chosen from the zoom level, so the response size depends on the viewport
+and not on the number of items.
+"""
+
+import math
+
+from django.db import IntegrityError, transaction
+from django.db.models import F
+
+from .geo import bounds, encode, valid_coordinates
+from .models import Item, MapCluster
+from .utils import iter_chunks
+
+CLUSTER_LEVELS = 8
+
+# Upper bound on cells returned for one viewport
+MAX_CELLS = 256
+
+# Geohash precision used at each web-map zoom level
+ZOOM_PRECISION = [1, 1, 1, 2, 2, 2, 3, 3, 4, 4, 4, 5, 5, 6, 6, 6, 7, 7, 8, 8, 8]
+
+def contribution(state):
+    """Return (item_type, latitude, longitude) an item adds to the grid, or None"""
+    if state is None or state.get('status') != 'approved':
+        return None
+    latitude = state.get('latitude')
+    longitude = state.get('longitude')
+    if not valid_coordinates(latitude, longitude):
+        return None
+    return state.get('item_type'), latitude, longitude
+
+def apply_delta(item_type, latitude, longitude, delta):
+    """Add or remove one item from its cell at every precision"""
+    geohash = encode(latitude, longitude, CLUSTER_LEVELS)
+    for precision in range(1, CLUSTER_LEVELS + 1):
+        cell = geohash[:precision]
+        if add_to_cell(precision, cell, item_type, latitude, longitude, delta) or delta <= 0:
+            continue
+        try:
+            with transaction.atomic():
+                MapCluster.objects.create(
+                    precision=precision, cell=cell, item_type=item_type,
+                    count=delta, latitude_sum=delta * latitude, longitude_sum=delta * longitude,
+                )
+        except IntegrityError:
+            # A concurrent save created the cell first; add to its row instead
+            add_to_cell(precision, cell, item_type, latitude, longitude, delta)
+
+def add_to_cell(precision, cell, item_type, latitude, longitude, delta):
+    """Apply a delta to an existing cell row; returns False when there is none"""
+    return MapCluster.objects.filter(precision=precision, cell=cell, item_type=item_type).update(
+        count=F('count') + delta,
+        latitude_sum=F('latitude_sum') + delta * latitude,
+        longitude_sum=F('longitude_sum') + delta * longitude,
+    ) > 0
+
+def update_clusters(previous, current):
+    """Move an item's contribution from its previous state to its current one"""
+    old = contribution(previous)
+    new = contribution(current)
+    if old == new:
+        return
+    if old is not None:
+        apply_delta(*old, -1)
+    if new is not None:
+        apply_delta(*new, 1)
+
+def rebuild_clusters(chunk_size=500):
+    """Recount every cell from scratch"""
+    MapCluster.objects.all().delete()
+    totals = {}
+    queryset = Item.objects.filter(status='approved', latitude__isnull=False, longitude__isnull=False)
+    for chunk in iter_chunks(queryset.only('id', 'item_type', 'latitude', 'longitude'), chunk_size):
+        for item in chunk:
+            if not valid_coordinates(item.latitude, item.longitude):
+                continue
+            geohash = encode(item.latitude, item.longitude, CLUSTER_LEVELS)
+            for precision in range(1, CLUSTER_LEVELS + 1):
+                key = (precision, geohash[:precision], item.item_type)
+                count, lat_sum, lng_sum = totals.get(key, (0, 0.0, 0.0))
+                totals[key] = (count + 1, lat_sum + item.latitude, lng_sum + item.longitude)
+
+    MapCluster.objects.bulk_create([
+        MapCluster(precision=precision, cell=cell, item_type=item_type,
+                   count=count, latitude_sum=lat_sum, longitude_sum=lng_sum)
+        for (precision, cell, item_type), (count, lat_sum, lng_sum) in totals.items()
+    ], batch_size=chunk_size)
+    return len(totals)
+
+def precision_for_zoom(zoom):
+    """Map a web-map zoom level to a geohash precision"""
+    zoom = max(0, min(int(zoom), len(ZOOM_PRECISION) - 1))
+    return ZOOM_PRECISION[zoom]
+
+def covering_cells(south, west, north, east, precision):
+    """Geohash cells at a precision that cover a bounding box, or None if too many"""
+    if west > east:
+        # The box crosses the antimeridian: cover each side separately
+        western = covering_cells(south, west, north, 180.0, precision)
+        eastern = covering_cells(south, -180.0, north, east, precision)
+        if western is None or eastern is None or len(western | eastern) > MAX_CELLS:
+            return None
+        return western | eastern
+
+    cell_south, cell_west, cell_north, cell_east = bounds(encode(south, west, precision))
+    height = cell_north - cell_south
+    width = cell_east - cell_west
+
+    rows = math.ceil((north - cell_south) / height) + 1
+    columns = math.ceil((east - cell_west) / width) + 1
+    if rows * columns > MAX_CELLS:
+        return None
+
+    cells = set()
+    for row in range(rows):
+        latitude = min(cell_south + (row + 0.5) * height, 90.0)
+        if latitude - height / 2 > north:
+            break
+        for column in range(columns):
+            longitude = cell_west + (column + 0.5) * width
+            if longitude - width / 2 > east:
+                break
+            cells.add(encode(latitude, (longitude + 180) % 360 - 180, precision))
+    return cells
+
+def clusters_in_view(south, west, north, east, zoom, item_type=None):
+    """Return cluster dicts for a viewport at a zoom level"""
+    precision = precision_for_zoom(zoom)
+    cells = covering_cells(south, west, north, east, precision)
+    # Zoomed out further than the zoom level suggests: coarsen until it fits
+    while cells is None and precision > 1:
+        precision -= 1
+        cells = covering_cells(south, west, north, east, precision)
+    if not cells:
+        return precision, []
+
+    clusters = MapCluster.objects.filter(precision=precision, cell__in=cells, count__gt=0)
+    if item_type:
+        clusters = clusters.filter(item_type=item_type)
+
+    return precision, [
+        {
+            'cell': cluster.cell,
+            'item_type': cluster.item_type,
+            'count': cluster.count,
+            'lat': cluster.latitude_sum / cluster.count,
+            'lng': cluster.longitude_sum / cluster.count,
+        }
+        for cluster in clusters
+    ]
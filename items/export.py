@@ -0,0 +1,61 @@
+"""
+Streaming export of search results as CSV or NDJSON.
+
+Rows are read in fixed-size chunks with only the exported columns and
+written to a StreamingHttpResponse as they arrive. Memory use does not
+depend on how many rows are exported.
+"""
+
+import csv
+import json
+
+from django.http import StreamingHttpResponse
+
+from .utils import iter_id_chunks, iter_value_chunks
+
+EXPORT_FIELDS = (
+    'id', 'name', 'category', 'item_type', 'status', 'description',
+    'location', 'date', 'contact_info', 'created_at',
+)
+
+EXPORT_CHUNK_SIZE = 1000
+
+CONTENT_TYPES = {
+    'csv': 'text/csv',
+    'ndjson': 'application/x-ndjson',
+}
+
+class Echo:
+    """File-like object whose write() hands the value back to the csv writer"""
+
+    def write(self, value):
+        return value
+
+def iter_rows(queryset, ranked_ids=None):
+    """Yield export rows, in rank order when ranked ids are given"""
+    if ranked_ids is not None:
+        chunks = iter_id_chunks(queryset, ranked_ids, EXPORT_FIELDS, EXPORT_CHUNK_SIZE)
+    else:
+        chunks = iter_value_chunks(queryset, EXPORT_FIELDS, EXPORT_CHUNK_SIZE)
+    for chunk in chunks:
+        yield from chunk
+
+def iter_csv(rows):
+    """Yield CSV lines, header first"""
+    writer = csv.writer(Echo())
+    yield writer.writerow(EXPORT_FIELDS)
+    for row in rows:
+        yield writer.writerow([row[field] for field in EXPORT_FIELDS])
+
+def iter_ndjson(rows):
+    """Yield one JSON object per line"""
+    for row in rows:
+        yield json.dumps({field: row[field] for field in EXPORT_FIELDS}, default=str) + '\n'
+
+def export_response(queryset, export_format='csv', ranked_ids=None):
+    """Build a streaming download of the queryset in the requested format"""
+    rows = iter_rows(queryset, ranked_ids)
+    content = iter_ndjson(rows) if export_format == 'ndjson' else iter_csv(rows)
+    response = StreamingHttpResponse(content, content_type=CONTENT_TYPES[export_format])
+    response['Content-Disposition'] = f'attachment; filename="items.{export_format}"'
+    return response
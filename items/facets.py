@@ -0,0 +1,52 @@
+"""
+Facet counts for item listings.
+
+All facets come from one grouped aggregation over (category, item_type,
+date). The category, type and week counts are then rolled up in memory,
+so adding facet values never adds database round-trips.
+"""
+
+from collections import Counter
+from datetime import timedelta
+
+from django.db.models import Count
+
+from .models import ITEM_CATEGORIES, ITEM_TYPE
+
+CATEGORY_LABELS = dict(ITEM_CATEGORIES)
+TYPE_LABELS = dict(ITEM_TYPE)
+
+# Only the most recent weeks are shown as facet values
+MAX_WEEKS = 8
+
+def week_start(day):
+    """Return the Monday of the week containing a date"""
+    return day - timedelta(days=day.weekday())
+
+def compute_facets(queryset):
+    """Return per-category, per-item_type and per-week counts for a queryset"""
+    categories = Counter()
+    item_types = Counter()
+    weeks = Counter()
+
+    groups = queryset.order_by().values('category', 'item_type', 'date').annotate(count=Count('id'))
+    for group in groups:
+        categories[group['category']] += group['count']
+        item_types[group['item_type']] += group['count']
+        if group['date']:
+            weeks[week_start(group['date'])] += group['count']
+
+    return {
+        'category': [
+            {'value': value, 'label': CATEGORY_LABELS.get(value, value), 'count': count}
+            for value, count in categories.most_common()
+        ],
+        'item_type': [
+            {'value': value, 'label': TYPE_LABELS.get(value, value), 'count': count}
+            for value, count in item_types.most_common()
+        ],
+        'week': [
+            {'value': week.isoformat(), 'label': f"Week of {week.strftime('%b %d')}", 'count': weeks[week]}
+            for week in sorted(weeks, reverse=True)[:MAX_WEEKS]
+        ],
+    }
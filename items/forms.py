@@ -9,9 +9,11 @@ class ItemForm(forms.ModelForm):
     """Form for creating and updating items"""
     class Meta:
         model = Item
-        fields = ['name', 'category', 'description', 'location', 'date', 'image', 'contact_info']
+        fields = ['name', 'category', 'description', 'location', 'latitude', 'longitude', 'date', 'image', 'contact_info']
         widgets = {
             'date': DateInput(),
+            'latitude': forms.HiddenInput(),
+            'longitude': forms.HiddenInput(),
             'description': forms.Textarea(attrs={'rows': 4}),
             'location': forms.TextInput(attrs={
                 'placeholder': 'e.g., Main Library - 2nd Floor, Study Area Near Windows',
@@ -98,6 +100,17 @@ class ItemSearchForm(forms.Form):
         choices=[('', 'All Types')] + Item._meta.get_field('item_type').choices,
         widget=forms.Select(attrs={'class': 'form-control'})
     )
+    near_lat = forms.FloatField(required=False, min_value=-90, max_value=90, widget=forms.HiddenInput())
+    near_lng = forms.FloatField(required=False, min_value=-180, max_value=180, widget=forms.HiddenInput())
+    radius = forms.TypedChoiceField(
+        required=False,
+        coerce=int,
+        empty_value=None,
+        choices=[('', 'Any Distance'), (100, 'Within 100 m'), (250, 'Within 250 m'),
+                 (500, 'Within 500 m'), (1000, 'Within 1 km')],
+        widget=forms.Select(attrs={'class': 'form-control'}),
+        label='Distance'
+    )
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
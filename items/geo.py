@@ -0,0 +1,157 @@
+"""
+Geohash grid index for item coordinates.
+
+Items with a latitude and longitude store their geohash in an indexed
+column. A "within N metres" query picks the geohash precision whose cells
+are at least N metres across and probes the centre cell and its eight
+neighbours with prefix lookups. Exact distances are then checked only for
+the handful of items in those cells.
+"""
+
+import math
+
+from django.db.models import Q
+
+BASE32 = '0123456789bcdefghjkmnpqrstuvwxyz'
+DECODE_MAP = {char: index for index, char in enumerate(BASE32)}
+
+GEOHASH_LENGTH = 9
+
+EARTH_RADIUS_METRES = 6371000
+
+# Lost and found reports this close together count as the same place
+MATCH_RADIUS_METRES = 150
+
+# Approximate cell (width, height) in metres at the equator per precision
+CELL_SIZES = {
+    1: (5009400, 4992600),
+    2: (1252300, 624100),
+    3: (156500, 156000),
+    4: (39100, 19500),
+    5: (4900, 4900),
+    6: (1200, 609.4),
+    7: (152.9, 152.4),
+    8: (38.2, 19.0),
+    9: (4.8, 4.8),
+}
+
+def valid_coordinates(latitude, longitude):
+    """True when both coordinates are present and in range"""
+    return (
+        latitude is not None and longitude is not None
+        and -90 <= latitude <= 90 and -180 <= longitude <= 180
+    )
+
+def encode(latitude, longitude, precision=GEOHASH_LENGTH):
+    """Encode a coordinate as a geohash string"""
+    lat_range = [-90.0, 90.0]
+    lng_range = [-180.0, 180.0]
+    chars = []
+    bits = 0
+    bit_count = 0
+    even = True
+    while len(chars) < precision:
+        value, target = (longitude, lng_range) if even else (latitude, lat_range)
+        middle = (target[0] + target[1]) / 2
+        if value >= middle:
+            bits = (bits << 1) | 1
+            target[0] = middle
+        else:
+            bits <<= 1
+            target[1] = middle
+        even = not even
+        bit_count += 1
+        if bit_count == 5:
+            chars.append(BASE32[bits])
+            bits = 0
+            bit_count = 0
+    return ''.join(chars)
+
+def bounds(geohash):
+    """Return (south, west, north, east) of a geohash cell"""
+    lat_range = [-90.0, 90.0]
+    lng_range = [-180.0, 180.0]
+    even = True
+    for char in geohash:
+        value = DECODE_MAP[char]
+        for shift in range(4, -1, -1):
+            target = lng_range if even else lat_range
+            middle = (target[0] + target[1]) / 2
+            if (value >> shift) & 1:
+                target[0] = middle
+            else:
+                target[1] = middle
+            even = not even
+    return lat_range[0], lng_range[0], lat_range[1], lng_range[1]
+
+def center(geohash):
+    """Return the (latitude, longitude) centre of a geohash cell"""
+    south, west, north, east = bounds(geohash)
+    return (south + north) / 2, (west + east) / 2
+
+def neighbours(geohash):
+    """Return the cell itself plus its eight surrounding cells"""
+    south, west, north, east = bounds(geohash)
+    height = north - south
+    width = east - west
+    latitude, longitude = center(geohash)
+    cells = set()
+    for lat_step in (-1, 0, 1):
+        for lng_step in (-1, 0, 1):
+            neighbour_lat = latitude + lat_step * height
+            if not -90 <= neighbour_lat <= 90:
+                continue
+            neighbour_lng = (longitude + lng_step * width + 180) % 360 - 180
+            cells.add(encode(neighbour_lat, neighbour_lng, len(geohash)))
+    return cells
+
+def distance_metres(lat1, lng1, lat2, lng2):
+    """Great-circle distance between two coordinates"""
+    phi1 = math.radians(lat1)
+    phi2 = math.radians(lat2)
+    d_phi = math.radians(lat2 - lat1)
+    d_lambda = math.radians(lng2 - lng1)
+    a = math.sin(d_phi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(d_lambda / 2) ** 2
+    return 2 * EARTH_RADIUS_METRES * math.asin(math.sqrt(a))
+
+def precision_for_radius(radius, latitude=0.0):
+    """Finest precision whose cells are still at least radius metres across"""
+    shrink = max(math.cos(math.radians(latitude)), 0.01)
+    for precision in range(GEOHASH_LENGTH, 0, -1):
+        width, height = CELL_SIZES[precision]
+        if min(width * shrink, height) >= radius:
+            return precision
+    return 1
+
+def nearby_item_ids(queryset, latitude, longitude, radius):
+    """Return ids of items in queryset within radius metres, nearest first"""
+    precision = precision_for_radius(radius, latitude)
+    cells = neighbours(encode(latitude, longitude, precision))
+
+    cell_query = Q()
+    for cell in cells:
+        cell_query |= Q(geohash__startswith=cell)
+
+    distances = []
+    rows = queryset.filter(cell_query).values_list('id', 'latitude', 'longitude')
+    for item_id, item_lat, item_lng in rows:
+        distance = distance_metres(latitude, longitude, item_lat, item_lng)
+        if distance <= radius:
+            distances.append((distance, item_id))
+    distances.sort()
+    return [item_id for _, item_id in distances]
+
+def apply_geohash(item):
+    """Fill an item's geohash from its coordinates"""
+    if valid_coordinates(item.latitude, item.longitude):
+        item.geohash = encode(item.latitude, item.longitude)
+    else:
+        item.geohash = ''
+
+def within_match_radius(first, second):
+    """True when both items have coordinates within MATCH_RADIUS_METRES"""
+    if not (valid_coordinates(first.latitude, first.longitude)
+            and valid_coordinates(second.latitude, second.longitude)):
+        return False
+    distance = distance_metres(first.latitude, first.longitude, second.latitude, second.longitude)
+    return distance <= MATCH_RADIUS_METRES
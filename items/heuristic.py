@@ -0,0 +1,65 @@
+"""
+The quick match heuristic run when an item is reported.
+
+A candidate earns one point each for a similar name, a similar description
+and the same place, plus up to one point for how close the dates are. The
+0-4 total is scaled to the 0-100 range of the batch TF-IDF scorer (see
+items.matching), so matches from both scorers can be ranked together, and
+a pair is kept above a quarter of the range (the old "score > 1").
+
+heuristic_score is a pure function of two items and two precomputed
+flags, so it can also score unsaved items; heuristic_matches looks the
+flags up in the phonetic and MinHash indexes for a saved item. An LSH band
+collision only nominates a description; the point is awarded when the two
+stored signatures are estimated to be similar enough.
+"""
+
+from .blocking import candidate_filter
+from .geo import within_match_radius
+from .locations import same_place
+from .matching import MAX_SCORE
+from .minhash import similar_description_ids, similar_signatures, unpack
+from .models import Item
+from .phonetic import same_sounding_item_ids
+
+HEURISTIC_SCALE = MAX_SCORE / 4
+
+HEURISTIC_THRESHOLD = HEURISTIC_SCALE
+
+# Dates this many days apart or more earn no date point
+DATE_RANGE_DAYS = 30
+
+def contains_either(first, second):
+    """True when either text contains the other, ignoring case"""
+    first = first.lower()
+    second = second.lower()
+    return first in second or second in first
+
+def heuristic_score(item, match, sound_alike=False, similar_description=False):
+    """Score two items on the 0-100 scale"""
+    name_match = 1 if sound_alike or contains_either(item.name, match.name) else 0
+    desc_match = 1 if similar_description or contains_either(item.description, match.description) else 0
+    location_match = 1 if (within_match_radius(item, match) or same_place(item, match)
+                           or contains_either(item.location, match.location)) else 0
+
+    # Date proximity (0-1 score)
+    date_diff = abs((item.date - match.date).days)
+    date_score = 1 if date_diff == 0 else max(0, 1 - (date_diff / DATE_RANGE_DAYS))
+
+    return (name_match + desc_match + location_match + date_score) * HEURISTIC_SCALE
+
+def heuristic_matches(item):
+    """Yield (lost_id, found_id, score) for an item's blocked candidates above threshold"""
+    # Items whose names sound the same, from one indexed phonetic key lookup
+    sound_alikes = same_sounding_item_ids(item)
+    # Items that may have near-duplicate descriptions, from one LSH band lookup
+    similar_descriptions = similar_description_ids(item)
+    values = unpack(item.minhash)
+
+    other_type = 'found' if item.item_type == 'lost' else 'lost'
+    candidates = Item.objects.filter(candidate_filter(item), item_type=other_type, status='approved')
+    for match in candidates:
+        similar_description = match.id in similar_descriptions and similar_signatures(values, unpack(match.minhash))
+        score = heuristic_score(item, match, match.id in sound_alikes, similar_description)
+        if score > HEURISTIC_THRESHOLD:
+            yield (item.id, match.id, score) if item.item_type == 'lost' else (match.id, item.id, score)
@@ -0,0 +1,147 @@
+"""
+Database-backed background jobs.
+
+Work that should not hold up a request (matching a newly reported item,
+re-scoring an edited one, emailing the owners of new matches) is stored as a Job row and run later by
+the ``run_jobs`` management command, so no outside broker is needed. A
+worker claims a job with a conditional UPDATE, which lets several workers
+share the table safely. Failed jobs are retried with exponential backoff
+until they run out of attempts. Jobs left running by a crashed worker are
+picked up again once their lock times out.
+
+Set ITEMS_JOBS_EAGER = True to run jobs inline when they are enqueued,
+e.g. in development without a worker.
+"""
+
+import json
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Count, Q
+from django.utils import timezone
+
+from .match_store import item_matches
+from .models import JOB_STATUS, Item, Job
+from .notifications import notify_match
+
+JOBS_EAGER = getattr(settings, 'ITEMS_JOBS_EAGER', False)
+
+# Seconds before the first retry; doubled after every further failure
+RETRY_DELAY = getattr(settings, 'ITEMS_JOB_RETRY_DELAY', 30)
+
+# Seconds after which a running job is assumed abandoned
+LOCK_TIMEOUT = getattr(settings, 'ITEMS_JOB_LOCK_TIMEOUT', 600)
+
+JOB_HANDLERS = {}
+
+def job_handler(kind):
+    """Register a function as the handler for a job kind"""
+    def register(function):
+        JOB_HANDLERS[kind] = function
+        return function
+    return register
+
+def enqueue(kind, max_attempts=5, **payload):
+    """
+    Queue a job and return it.
+
+    An identical job that is still pending is reused instead of queueing a
+    duplicate.
+    """
+    encoded = json.dumps(payload, sort_keys=True)
+    job = Job.objects.filter(kind=kind, payload=encoded, status='pending').first()
+    if job is None:
+        job = Job.objects.create(kind=kind, payload=encoded, max_attempts=max_attempts)
+    if JOBS_EAGER:
+        run_job(job)
+    return job
+
+def claim_next_job():
+    """Lock the next due job for this worker, or return None"""
+    now = timezone.now()
+    due = Q(status='pending', run_after__lte=now)
+    abandoned = Q(status='running', locked_at__lt=now - timedelta(seconds=LOCK_TIMEOUT))
+    for job in Job.objects.filter(due | abandoned).order_by('run_after', 'id')[:10]:
+        # Only one worker's UPDATE can match the state it read
+        claimed = Job.objects.filter(pk=job.pk, status=job.status, locked_at=job.locked_at).update(
+            status='running', locked_at=now,
+        )
+        if claimed:
+            job.status = 'running'
+            job.locked_at = now
+            return job
+    return None
+
+def run_job(job):
+    """Run a claimed job, recording success or scheduling a retry; True on success"""
+    job.attempts += 1
+    try:
+        handler = JOB_HANDLERS[job.kind]
+        handler(**json.loads(job.payload))
+    except Exception:
+        job.last_error = traceback.format_exc()[-2000:]
+        if job.attempts >= job.max_attempts:
+            job.status = 'failed'
+        else:
+            job.status = 'pending'
+            job.run_after = timezone.now() + timedelta(seconds=RETRY_DELAY * 2 ** (job.attempts - 1))
+        job.locked_at = None
+        job.save(update_fields=['attempts', 'last_error', 'status', 'run_after', 'locked_at'])
+        return False
+
+    job.status = 'done'
+    job.locked_at = None
+    job.save(update_fields=['attempts', 'status', 'locked_at'])
+    return True
+
+def run_pending_jobs(limit=None):
+    """Run due jobs until none are left or limit is reached; return (done, failed)"""
+    done = failed = 0
+    while limit is None or done + failed < limit:
+        job = claim_next_job()
+        if job is None:
+            break
+        if run_job(job):
+            done += 1
+        else:
+            failed += 1
+    return done, failed
+
+def queue_stats():
+    """Number of jobs in each status"""
+    counts = {status: 0 for status, _ in JOB_STATUS}
+    for group in Job.objects.values('status').annotate(count=Count('id')):
+        counts[group['status']] = group['count']
+    return counts
+
+@job_handler('find_matches')
+def find_matches_job(item_id):
+    """Match a newly reported item, then queue emails for what it matched"""
+    from .views import find_matches
+
+    item = Item.objects.filter(pk=item_id).first()
+    if item is None:
+        return
+    find_matches(item)
+    if item_matches(item_id).filter(notified=False, active=True).exists():
+        enqueue('notify_matches', item_id=item_id)
+
+@job_handler('rescore_matches')
+def rescore_matches_job(item_id):
+    """Bring an edited item's matches up to date, then queue emails for new ones"""
+    from .match_runs import rescore_item
+
+    item = Item.objects.filter(pk=item_id).first()
+    if item is None:
+        return
+    rescore_item(item)
+    if item_matches(item_id).filter(notified=False, active=True).exists():
+        enqueue('notify_matches', item_id=item_id)
+
+@job_handler('notify_matches')
+def notify_matches_job(item_id):
+    """Email the owners of an item's matches that have not been notified yet"""
+    matches = item_matches(item_id).filter(notified=False, active=True)
+    for match in matches.select_related('lost_item__user', 'found_item__user'):
+        notify_match(match, fail_silently=False)
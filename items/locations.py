@@ -0,0 +1,124 @@
+"""
+Structured parsing of free-text item locations.
+
+Locations such as "Main Library - 2nd Floor, Study Area Near Windows" are
+split into a normalized building ("main library"), a floor number (2) and
+the remaining area text. The parsed parts are stored in indexed columns on
+Item, so "Main Library 2F" and "main library, 2nd floor" land on the same
+building and floor and can be filtered and grouped with exact lookups.
+"""
+
+import re
+from collections import namedtuple
+
+from django.db.models import Q
+
+ParsedLocation = namedtuple('ParsedLocation', ['building', 'floor', 'area'])
+
+ORDINAL_WORDS = {
+    'first': 1, 'second': 2, 'third': 3, 'fourth': 4, 'fifth': 5,
+    'sixth': 6, 'seventh': 7, 'eighth': 8, 'ninth': 9, 'tenth': 10,
+}
+
+FLOOR_PATTERNS = [
+    (re.compile(r'\b(?:ground|g)\s*(?:floor|fl)\b'), lambda match: 0),
+    (re.compile(r'\b(?:basement|lower\s+level)\b'), lambda match: -1),
+    (re.compile(r'\b(\d{1,2})\s*(?:st|nd|rd|th)?\s*(?:floor|flr|fl|f)\b'), lambda match: int(match.group(1))),
+    (re.compile(r'\b(?:floor|flr|fl|level|lvl)\s*(\d{1,2})\b'), lambda match: int(match.group(1))),
+    (re.compile(r'\b(' + '|'.join(ORDINAL_WORDS) + r')\s+floor\b'), lambda match: ORDINAL_WORDS[match.group(1)]),
+]
+
+SEPARATOR_RE = re.compile(r'\s*(?:[-,/|;:()]|\bnear\b|\bnext to\b|\bby the\b)\s*')
+PUNCTUATION_RE = re.compile(r'[^a-z0-9 ]+')
+
+# Common abbreviations folded to one spelling
+WORD_ALIASES = {
+    'bldg': 'building', 'bld': 'building', 'lib': 'library', 'ctr': 'center',
+    'centre': 'center', 'dept': 'department', 'rm': 'room', 'hq': 'headquarters',
+    'caf': 'cafeteria', 'gymnasium': 'gym', 'univ': 'university',
+}
+
+# Trailing words that describe a spot inside a building rather than the building
+AREA_WORDS = {
+    'entrance', 'lobby', 'hallway', 'corridor', 'restroom', 'bathroom',
+    'cafeteria', 'parking', 'desk', 'counter', 'steps', 'stairs', 'elevator',
+    'lounge', 'room',
+}
+
+LEADING_WORDS = {'the', 'at', 'in', 'on', 'of', 'inside', 'outside'}
+
+def normalize_words(text):
+    """Lowercase, strip punctuation and fold abbreviations"""
+    words = PUNCTUATION_RE.sub(' ', text.lower()).split()
+    return [WORD_ALIASES.get(word, word) for word in words]
+
+def parse_location(text):
+    """Split a free-text location into building, floor and area"""
+    text = (text or '').lower()
+
+    floor = None
+    for pattern, convert in FLOOR_PATTERNS:
+        match = pattern.search(text)
+        if match:
+            floor = convert(match)
+            text = text[:match.start()] + ' , ' + text[match.end():]
+            break
+
+    segments = [segment for segment in SEPARATOR_RE.split(text) if segment and segment.strip()]
+    if not segments:
+        return ParsedLocation('', floor, '')
+
+    building_words = normalize_words(segments[0])
+    while building_words and building_words[0] in LEADING_WORDS:
+        building_words.pop(0)
+
+    # "Main Library Entrance" -> building "main library", area "entrance"
+    area_words = []
+    for index, word in enumerate(building_words):
+        if index > 0 and word in AREA_WORDS:
+            area_words = building_words[index:]
+            building_words = building_words[:index]
+            break
+
+    for segment in segments[1:]:
+        area_words.extend(normalize_words(segment))
+
+    return ParsedLocation(' '.join(building_words)[:100], floor, ' '.join(area_words)[:100])
+
+def apply_location_fields(item):
+    """Fill an item's parsed location columns from its location text"""
+    parsed = parse_location(item.location)
+    item.location_building = parsed.building
+    item.location_floor = parsed.floor
+    item.location_area = parsed.area
+    return parsed
+
+def location_filter(text):
+    """
+    Q filter for a location query on the indexed parsed columns.
+
+    Stored buildings must start with the parsed building, so "Main" finds
+    "main library", and a parsed floor must match exactly. Only a query
+    that parses to nothing falls back to a substring match on the raw
+    text. Rows saved before the columns existed are filled in by the
+    backfill_locations command.
+    """
+    text = (text or '').strip()
+    parsed = parse_location(text)
+    if not parsed.building and parsed.floor is None:
+        return Q(location__icontains=text)
+
+    structured = Q()
+    if parsed.building:
+        structured &= Q(location_building__startswith=parsed.building)
+    if parsed.floor is not None:
+        structured &= Q(location_floor=parsed.floor)
+    return structured
+
+def same_place(first, second):
+    """True when two items share a parsed building and do not disagree on floor"""
+    if not first.location_building or first.location_building != second.location_building:
+        return False
+    if first.location_floor is None or second.location_floor is None:
+        return True
+    return first.location_floor == second.location_floor
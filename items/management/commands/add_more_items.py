@@ -5,6 +5,256 @@ from datetime import timedelta
 import random
 from items.models import Item
 
+# Item templates, also used to build the benchmark_matching corpus
+ITEM_TEMPLATES = [
+    # Electronics
+    {
+        'name': 'Samsung Galaxy S23',
+        'category': 'electronics',
+        'description': 'White Samsung Galaxy S23 with cracked screen protector. Has a purple phone case.',
+        'location': 'Engineering Building - Room 205',
+        'item_type': 'lost',
+        'contact_info': 'tech.student@email.com'
+    },
+    {
+        'name': 'Apple AirPods Pro',
+        'category': 'electronics',
+        'description': 'White AirPods Pro with charging case. Left earbud has small scratch.',
+        'location': 'Music Department',
+        'item_type': 'found',
+        'contact_info': 'music.lover@email.com'
+    },
+    {
+        'name': 'Dell Laptop Charger',
+        'category': 'electronics',
+        'description': 'Black Dell laptop charger, 65W, with frayed cable near connector.',
+        'location': 'Computer Science Lab',
+        'item_type': 'found',
+        'contact_info': 'cs.student@email.com'
+    },
+    {
+        'name': 'iPad Air with Keyboard',
+        'category': 'electronics',
+        'description': 'Silver iPad Air with blue keyboard case. Has drawing app installed.',
+        'location': 'Art Studio',
+        'item_type': 'lost',
+        'contact_info': 'art.student@email.com'
+    },
+    {
+        'name': 'Bluetooth Speaker',
+        'category': 'electronics',
+        'description': 'Small black JBL Bluetooth speaker. Still has good battery life.',
+        'location': 'Outdoor Amphitheater',
+        'item_type': 'found',
+        'contact_info': 'event.organizer@email.com'
+    },
+
+    # Clothing
+    {
+        'name': 'Red Hoodie',
+        'category': 'clothing',
+        'description': 'Red university hoodie, size L, with small stain on front pocket.',
+        'location': 'Dormitory Common Room',
+        'item_type': 'found',
+        'contact_info': 'dorm.resident@email.com'
+    },
+    {
+        'name': 'Black Running Shoes',
+        'category': 'clothing',
+        'description': 'Black Nike running shoes, size 9, well-worn but good condition.',
+        'location': 'Track and Field',
+        'item_type': 'lost',
+        'contact_info': 'runner.student@email.com'
+    },
+    {
+        'name': 'Blue Baseball Cap',
+        'category': 'clothing',
+        'description': 'Blue baseball cap with university logo. Slightly faded.',
+        'location': 'Baseball Field',
+        'item_type': 'found',
+        'contact_info': 'sports.fan@email.com'
+    },
+    {
+        'name': 'Winter Scarf',
+        'category': 'clothing',
+        'description': 'Knitted winter scarf in red and white stripes. Very soft material.',
+        'location': 'Main Library Entrance',
+        'item_type': 'found',
+        'contact_info': 'winter.student@email.com'
+    },
+    {
+        'name': 'Leather Jacket',
+        'category': 'clothing',
+        'description': 'Black leather jacket, size M, with zipper pockets. Vintage style.',
+        'location': 'Motorcycle Parking',
+        'item_type': 'lost',
+        'contact_info': 'biker.student@email.com'
+    },
+
+    # Accessories
+    {
+        'name': 'Silver Bracelet',
+        'category': 'accessories',
+        'description': 'Silver charm bracelet with small heart pendant. Slightly tarnished.',
+        'location': 'Chemistry Lab',
+        'item_type': 'found',
+        'contact_info': 'chem.student@email.com'
+    },
+    {
+        'name': 'Prescription Glasses',
+        'category': 'accessories',
+        'description': 'Black-rimmed prescription glasses in brown case. Strong prescription.',
+        'location': 'Philosophy Department',
+        'item_type': 'lost',
+        'contact_info': 'philosophy.student@email.com'
+    },
+    {
+        'name': 'Sunglasses',
+        'category': 'accessories',
+        'description': 'Ray-Ban style sunglasses with dark lenses. One lens has small scratch.',
+        'location': 'Tennis Courts',
+        'item_type': 'found',
+        'contact_info': 'tennis.player@email.com'
+    },
+    {
+        'name': 'Fitness Tracker',
+        'category': 'accessories',
+        'description': 'Black Fitbit fitness tracker with sport band. Needs charging.',
+        'location': 'Recreation Center',
+        'item_type': 'lost',
+        'contact_info': 'fitness.enthusiast@email.com'
+    },
+
+    # Documents
+    {
+        'name': 'Driver\'s License',
+        'category': 'documents',
+        'description': 'Driver\'s license for Jennifer Martinez, expires 2026.',
+        'location': 'Student Union Building',
+        'item_type': 'found',
+        'contact_info': 'security@university.edu'
+    },
+    {
+        'name': 'Passport',
+        'category': 'documents',
+        'description': 'US Passport in blue cover. Belongs to international student.',
+        'location': 'International Student Office',
+        'item_type': 'found',
+        'contact_info': 'international@university.edu'
+    },
+    {
+        'name': 'Credit Cards',
+        'category': 'documents',
+        'description': 'Two credit cards and a debit card found together.',
+        'location': 'Campus Bookstore',
+        'item_type': 'found',
+        'contact_info': 'bookstore@university.edu'
+    },
+
+    # Keys
+    {
+        'name': 'Dorm Room Keys',
+        'category': 'keys',
+        'description': 'Set of dorm keys with blue lanyard and room number tag.',
+        'location': 'Residence Hall A',
+        'item_type': 'found',
+        'contact_info': 'housing@university.edu'
+    },
+    {
+        'name': 'Bike Lock Key',
+        'category': 'keys',
+        'description': 'Small key for bike lock with red keychain.',
+        'location': 'Bike Rack Area',
+        'item_type': 'lost',
+        'contact_info': 'cyclist@email.com'
+    },
+    {
+        'name': 'Office Keys',
+        'category': 'keys',
+        'description': 'Set of office keys with faculty ID attached.',
+        'location': 'Faculty Parking Lot',
+        'item_type': 'found',
+        'contact_info': 'faculty.services@university.edu'
+    },
+
+    # Bags
+    {
+        'name': 'Messenger Bag',
+        'category': 'bags',
+        'description': 'Brown leather messenger bag with laptop compartment. Contains notebooks.',
+        'location': 'Business School',
+        'item_type': 'found',
+        'contact_info': 'business.student@email.com'
+    },
+    {
+        'name': 'Gym Bag',
+        'category': 'bags',
+        'description': 'Black gym bag with workout clothes inside. Smells like detergent.',
+        'location': 'Fitness Center Locker Room',
+        'item_type': 'lost',
+        'contact_info': 'gym.member@email.com'
+    },
+    {
+        'name': 'Purse',
+        'category': 'bags',
+        'description': 'Small black purse with gold chain strap. Contains makeup items.',
+        'location': 'Theater Building',
+        'item_type': 'found',
+        'contact_info': 'theater.student@email.com'
+    },
+    {
+        'name': 'Camera Bag',
+        'category': 'bags',
+        'description': 'Professional camera bag with padding. Contains lens cleaning kit.',
+        'location': 'Photography Studio',
+        'item_type': 'lost',
+        'contact_info': 'photographer@email.com'
+    },
+
+    # Other
+    {
+        'name': 'Water Bottle',
+        'category': 'other',
+        'description': 'Stainless steel water bottle with university stickers.',
+        'location': 'Dining Hall',
+        'item_type': 'found',
+        'contact_info': 'dining.services@university.edu'
+    },
+    {
+        'name': 'Textbook - Calculus',
+        'category': 'other',
+        'description': 'Calculus textbook with highlighted pages and notes in margins.',
+        'location': 'Mathematics Building',
+        'item_type': 'found',
+        'contact_info': 'math.student@email.com'
+    },
+    {
+        'name': 'Umbrella',
+        'category': 'other',
+        'description': 'Black umbrella with wooden handle. One spoke is slightly bent.',
+        'location': 'Administration Building',
+        'item_type': 'lost',
+        'contact_info': 'staff.member@email.com'
+    },
+    {
+        'name': 'Coffee Mug',
+        'category': 'other',
+        'description': 'White ceramic mug with "World\'s Best Student" text.',
+        'location': 'Coffee Shop',
+        'item_type': 'found',
+        'contact_info': 'coffee.shop@university.edu'
+    },
+    {
+        'name': 'Notebook',
+        'category': 'other',
+        'description': 'Spiral notebook with physics equations and diagrams.',
+        'location': 'Physics Laboratory',
+        'item_type': 'lost',
+        'contact_info': 'physics.student@email.com'
+    }
+]
+
+
 class Command(BaseCommand):
     help = 'Add more diverse items for testing browse functionality'
 
@@ -58,253 +308,7 @@ class Command(BaseCommand):
         all_users = [user] + additional_users
         
         # Comprehensive list of items
-        items_data = [
-            # Electronics
-            {
-                'name': 'Samsung Galaxy S23',
-                'category': 'electronics',
-                'description': 'White Samsung Galaxy S23 with cracked screen protector. Has a purple phone case.',
-                'location': 'Engineering Building - Room 205',
-                'item_type': 'lost',
-                'contact_info': 'tech.student@email.com'
-            },
-            {
-                'name': 'Apple AirPods Pro',
-                'category': 'electronics',
-                'description': 'White AirPods Pro with charging case. Left earbud has small scratch.',
-                'location': 'Music Department',
-                'item_type': 'found',
-                'contact_info': 'music.lover@email.com'
-            },
-            {
-                'name': 'Dell Laptop Charger',
-                'category': 'electronics',
-                'description': 'Black Dell laptop charger, 65W, with frayed cable near connector.',
-                'location': 'Computer Science Lab',
-                'item_type': 'found',
-                'contact_info': 'cs.student@email.com'
-            },
-            {
-                'name': 'iPad Air with Keyboard',
-                'category': 'electronics',
-                'description': 'Silver iPad Air with blue keyboard case. Has drawing app installed.',
-                'location': 'Art Studio',
-                'item_type': 'lost',
-                'contact_info': 'art.student@email.com'
-            },
-            {
-                'name': 'Bluetooth Speaker',
-                'category': 'electronics',
-                'description': 'Small black JBL Bluetooth speaker. Still has good battery life.',
-                'location': 'Outdoor Amphitheater',
-                'item_type': 'found',
-                'contact_info': 'event.organizer@email.com'
-            },
-            
-            # Clothing
-            {
-                'name': 'Red Hoodie',
-                'category': 'clothing',
-                'description': 'Red university hoodie, size L, with small stain on front pocket.',
-                'location': 'Dormitory Common Room',
-                'item_type': 'found',
-                'contact_info': 'dorm.resident@email.com'
-            },
-            {
-                'name': 'Black Running Shoes',
-                'category': 'clothing',
-                'description': 'Black Nike running shoes, size 9, well-worn but good condition.',
-                'location': 'Track and Field',
-                'item_type': 'lost',
-                'contact_info': 'runner.student@email.com'
-            },
-            {
-                'name': 'Blue Baseball Cap',
-                'category': 'clothing',
-                'description': 'Blue baseball cap with university logo. Slightly faded.',
-                'location': 'Baseball Field',
-                'item_type': 'found',
-                'contact_info': 'sports.fan@email.com'
-            },
-            {
-                'name': 'Winter Scarf',
-                'category': 'clothing',
-                'description': 'Knitted winter scarf in red and white stripes. Very soft material.',
-                'location': 'Main Library Entrance',
-                'item_type': 'found',
-                'contact_info': 'winter.student@email.com'
-            },
-            {
-                'name': 'Leather Jacket',
-                'category': 'clothing',
-                'description': 'Black leather jacket, size M, with zipper pockets. Vintage style.',
-                'location': 'Motorcycle Parking',
-                'item_type': 'lost',
-                'contact_info': 'biker.student@email.com'
-            },
-            
-            # Accessories
-            {
-                'name': 'Silver Bracelet',
-                'category': 'accessories',
-                'description': 'Silver charm bracelet with small heart pendant. Slightly tarnished.',
-                'location': 'Chemistry Lab',
-                'item_type': 'found',
-                'contact_info': 'chem.student@email.com'
-            },
-            {
-                'name': 'Prescription Glasses',
-                'category': 'accessories',
-                'description': 'Black-rimmed prescription glasses in brown case. Strong prescription.',
-                'location': 'Philosophy Department',
-                'item_type': 'lost',
-                'contact_info': 'philosophy.student@email.com'
-            },
-            {
-                'name': 'Sunglasses',
-                'category': 'accessories',
-                'description': 'Ray-Ban style sunglasses with dark lenses. One lens has small scratch.',
-                'location': 'Tennis Courts',
-                'item_type': 'found',
-                'contact_info': 'tennis.player@email.com'
-            },
-            {
-                'name': 'Fitness Tracker',
-                'category': 'accessories',
-                'description': 'Black Fitbit fitness tracker with sport band. Needs charging.',
-                'location': 'Recreation Center',
-                'item_type': 'lost',
-                'contact_info': 'fitness.enthusiast@email.com'
-            },
-            
-            # Documents
-            {
-                'name': 'Driver\'s License',
-                'category': 'documents',
-                'description': 'Driver\'s license for Jennifer Martinez, expires 2026.',
-                'location': 'Student Union Building',
-                'item_type': 'found',
-                'contact_info': 'security@university.edu'
-            },
-            {
-                'name': 'Passport',
-                'category': 'documents',
-                'description': 'US Passport in blue cover. Belongs to international student.',
-                'location': 'International Student Office',
-                'item_type': 'found',
-                'contact_info': 'international@university.edu'
-            },
-            {
-                'name': 'Credit Cards',
-                'category': 'documents',
-                'description': 'Two credit cards and a debit card found together.',
-                'location': 'Campus Bookstore',
-                'item_type': 'found',
-                'contact_info': 'bookstore@university.edu'
-            },
-            
-            # Keys
-            {
-                'name': 'Dorm Room Keys',
-                'category': 'keys',
-                'description': 'Set of dorm keys with blue lanyard and room number tag.',
-                'location': 'Residence Hall A',
-                'item_type': 'found',
-                'contact_info': 'housing@university.edu'
-            },
-            {
-                'name': 'Bike Lock Key',
-                'category': 'keys',
-                'description': 'Small key for bike lock with red keychain.',
-                'location': 'Bike Rack Area',
-                'item_type': 'lost',
-                'contact_info': 'cyclist@email.com'
-            },
-            {
-                'name': 'Office Keys',
-                'category': 'keys',
-                'description': 'Set of office keys with faculty ID attached.',
-                'location': 'Faculty Parking Lot',
-                'item_type': 'found',
-                'contact_info': 'faculty.services@university.edu'
-            },
-            
-            # Bags
-            {
-                'name': 'Messenger Bag',
-                'category': 'bags',
-                'description': 'Brown leather messenger bag with laptop compartment. Contains notebooks.',
-                'location': 'Business School',
-                'item_type': 'found',
-                'contact_info': 'business.student@email.com'
-            },
-            {
-                'name': 'Gym Bag',
-                'category': 'bags',
-                'description': 'Black gym bag with workout clothes inside. Smells like detergent.',
-                'location': 'Fitness Center Locker Room',
-                'item_type': 'lost',
-                'contact_info': 'gym.member@email.com'
-            },
-            {
-                'name': 'Purse',
-                'category': 'bags',
-                'description': 'Small black purse with gold chain strap. Contains makeup items.',
-                'location': 'Theater Building',
-                'item_type': 'found',
-                'contact_info': 'theater.student@email.com'
-            },
-            {
-                'name': 'Camera Bag',
-                'category': 'bags',
-                'description': 'Professional camera bag with padding. Contains lens cleaning kit.',
-                'location': 'Photography Studio',
-                'item_type': 'lost',
-                'contact_info': 'photographer@email.com'
-            },
-            
-            # Other
-            {
-                'name': 'Water Bottle',
-                'category': 'other',
-                'description': 'Stainless steel water bottle with university stickers.',
-                'location': 'Dining Hall',
-                'item_type': 'found',
-                'contact_info': 'dining.services@university.edu'
-            },
-            {
-                'name': 'Textbook - Calculus',
-                'category': 'other',
-                'description': 'Calculus textbook with highlighted pages and notes in margins.',
-                'location': 'Mathematics Building',
-                'item_type': 'found',
-                'contact_info': 'math.student@email.com'
-            },
-            {
-                'name': 'Umbrella',
-                'category': 'other',
-                'description': 'Black umbrella with wooden handle. One spoke is slightly bent.',
-                'location': 'Administration Building',
-                'item_type': 'lost',
-                'contact_info': 'staff.member@email.com'
-            },
-            {
-                'name': 'Coffee Mug',
-                'category': 'other',
-                'description': 'White ceramic mug with "World\'s Best Student" text.',
-                'location': 'Coffee Shop',
-                'item_type': 'found',
-                'contact_info': 'coffee.shop@university.edu'
-            },
-            {
-                'name': 'Notebook',
-                'category': 'other',
-                'description': 'Spiral notebook with physics equations and diagrams.',
-                'location': 'Physics Laboratory',
-                'item_type': 'lost',
-                'contact_info': 'physics.student@email.com'
-            }
-        ]
+        items_data = [dict(template) for template in ITEM_TEMPLATES]
         
         # Create items
         created_count = 0
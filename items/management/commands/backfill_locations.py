@@ -0,0 +1,45 @@
+from django.core.management.base import BaseCommand
+from items.locations import apply_location_fields
+from items.models import Item
+from items.search import bump_item_version
+from items.utils import iter_chunks
+
+class Command(BaseCommand):
+    help = 'Parse building, floor and area for items saved before location parsing existed'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=500,
+            help='Number of items to read and update per batch (default: 500)'
+        )
+        parser.add_argument(
+            '--all',
+            action='store_true',
+            help='Re-parse every item, not only those without a building'
+        )
+
+    def handle(self, *args, **options):
+        chunk_size = options['chunk_size']
+
+        self.stdout.write("📍 Backfilling Parsed Locations")
+        self.stdout.write("=" * 50)
+
+        items = Item.objects.only('id', 'location')
+        if not options['all']:
+            items = items.filter(location_building='')
+
+        updated = 0
+        for chunk in iter_chunks(items, chunk_size):
+            for item in chunk:
+                apply_location_fields(item)
+            Item.objects.bulk_update(chunk, ['location_building', 'location_floor', 'location_area'])
+            updated += len(chunk)
+            self.stdout.write(f"   Updated {updated} items...")
+
+        # bulk_update skips save signals, so cached results are invalidated here
+        if updated:
+            bump_item_version()
+
+        self.stdout.write(f"✅ Parsed locations for {updated} items")
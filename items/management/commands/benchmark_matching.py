@@ -0,0 +1,75 @@
+import json
+
+from django.core.management.base import BaseCommand
+from items.benchmark import available_scorers, run_benchmark
+
+class Command(BaseCommand):
+    help = 'Benchmark match quality and throughput on a labeled synthetic corpus, reported as JSON'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--pairs',
+            type=int,
+            default=200,
+            help='Number of labeled lost/found pairs to generate (default: 200)'
+        )
+        parser.add_argument(
+            '--distractors',
+            type=int,
+            default=None,
+            help='Unpaired items added on each side (default: a quarter of --pairs)'
+        )
+        parser.add_argument(
+            '--seed',
+            type=int,
+            default=42,
+            help='Random seed; the same seed always builds the same corpus (default: 42)'
+        )
+        parser.add_argument(
+            '--k',
+            type=int,
+            nargs='+',
+            default=[1, 5, 10],
+            help='Cut-offs for precision@k and recall@k (default: 1 5 10)'
+        )
+        parser.add_argument(
+            '--scorers',
+            nargs='+',
+            choices=available_scorers(),
+            default=None,
+            help='Scorers to run (default: every available scorer)'
+        )
+        parser.add_argument(
+            '--output',
+            help='Write the JSON report to this file instead of standard output'
+        )
+
+    def handle(self, *args, **options):
+        pairs = options['pairs']
+        distractors = options['distractors'] if options['distractors'] is not None else pairs // 4
+        output = options['output']
+
+        if output:
+            self.stdout.write("📏 Benchmarking Matching")
+            self.stdout.write("=" * 50)
+            self.stdout.write(f"🧪 Corpus: {pairs} labeled pairs, {distractors} distractors per side (seed {options['seed']})")
+
+        # The corpus lives in memory only; nothing is written to the database
+        report = run_benchmark(
+            pairs=pairs,
+            distractors=distractors,
+            seed=options['seed'],
+            ks=options['k'],
+            scorers=options['scorers'],
+        )
+
+        if not output:
+            self.stdout.write(json.dumps(report, indent=2))
+            return
+
+        with open(output, 'w') as handle:
+            json.dump(report, handle, indent=2)
+        for name, result in report['scorers'].items():
+            recall = ', '.join(f"R@{k} {value:.2f}" for k, value in result['recall_at_k'].items())
+            self.stdout.write(f"⚙️  {name}: {result['pairs_per_second']} pairs/s, peak {result['peak_memory_bytes'] // 1024} KiB, {recall}")
+        self.stdout.write(f"✅ Report written to {output}")
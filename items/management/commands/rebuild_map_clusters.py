@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+from items.clusters import rebuild_clusters
+
+class Command(BaseCommand):
+    help = 'Recount the map cluster grid from scratch'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=500,
+            help='Number of items to read per batch (default: 500)'
+        )
+
+    def handle(self, *args, **options):
+        self.stdout.write("🗺️  Rebuilding Map Clusters")
+        self.stdout.write("=" * 50)
+
+        cells = rebuild_clusters(chunk_size=options['chunk_size'])
+
+        self.stdout.write(f"✅ Rebuilt {cells} cluster cells")
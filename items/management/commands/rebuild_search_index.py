@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand
+from items.minhash import rebuild_minhash_index
+from items.phonetic import rebuild_phonetic_keys
+from items.search import rebuild_index
+
+class Command(BaseCommand):
+    help = 'Rebuild the item search index from scratch'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=500,
+            help='Number of items to read and index per batch (default: 500)'
+        )
+
+    def handle(self, *args, **options):
+        chunk_size = options['chunk_size']
+
+        self.stdout.write("🔎 Rebuilding Search Index")
+        self.stdout.write("=" * 50)
+
+        indexed = rebuild_index(chunk_size=chunk_size)
+
+        self.stdout.write(f"✅ Indexed {indexed} approved items")
+
+        keyed = rebuild_phonetic_keys(chunk_size=chunk_size)
+
+        self.stdout.write(f"🔤 Rebuilt phonetic name keys for {keyed} items")
+
+        banded = rebuild_minhash_index(chunk_size=chunk_size)
+
+        self.stdout.write(f"🧬 Rebuilt description MinHash bands for {banded} items")
@@ -0,0 +1,49 @@
+import time
+
+from django.core.management.base import BaseCommand
+from items.jobs import queue_stats, run_pending_jobs
+
+class Command(BaseCommand):
+    help = 'Run queued background jobs (matching and notifications)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Run the jobs that are due now and exit instead of polling'
+        )
+        parser.add_argument(
+            '--sleep',
+            type=float,
+            default=5,
+            help='Seconds to wait between polls when the queue is empty (default: 5)'
+        )
+        parser.add_argument(
+            '--limit',
+            type=int,
+            default=None,
+            help='Stop after running this many jobs'
+        )
+
+    def handle(self, *args, **options):
+        self.stdout.write("🛠️  Running Background Jobs")
+        self.stdout.write("=" * 50)
+
+        limit = options['limit']
+        total_done = total_failed = 0
+        while True:
+            remaining = None if limit is None else limit - total_done - total_failed
+            done, failed = run_pending_jobs(limit=remaining)
+            total_done += done
+            total_failed += failed
+            if done or failed:
+                self.stdout.write(f"✅ Ran {done} jobs, ❌ {failed} failed")
+
+            if options['once'] or (limit is not None and total_done + total_failed >= limit):
+                break
+            if not (done or failed):
+                time.sleep(options['sleep'])
+
+        stats = queue_stats()
+        self.stdout.write(f"📊 Done: {total_done}, failed attempts: {total_failed}")
+        self.stdout.write(f"📋 Queue: {stats['pending']} pending, {stats['running']} running, {stats['failed']} failed")
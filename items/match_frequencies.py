@@ -0,0 +1,77 @@
+"""
+Collection-wide trigram document frequencies for match scoring.
+
+TF-IDF weights depend on how many approved items contain each character
+trigram. Instead of recounting them over the whole collection on every run,
+the counts live in MatchTrigram rows: a full matching run rebuilds them and
+item signals apply +1/-1 deltas as approved items change. An incremental
+run or a single re-score then reads only the rows for the trigrams of the
+items it scores, and still weighs them exactly as a full run would.
+"""
+
+from collections import Counter
+
+from django.db.models import F
+
+from .matching import FIELD_POINTS, char_ngrams
+from .models import Item, MatchTrigram
+
+FREQUENCY_FIELDS = tuple(field for field, _ in FIELD_POINTS)
+
+# Trigrams looked up or written per query
+GRAM_CHUNK_SIZE = 500
+
+def contribution(state):
+    """{field: trigram set} an item adds to the counts, or None when not approved"""
+    if state is None or state.get('status') != 'approved':
+        return None
+    return {field: set(char_ngrams(state.get(field))) for field in FREQUENCY_FIELDS}
+
+def apply_delta(field, grams, delta):
+    """Add delta to the count of each trigram of one field"""
+    grams = sorted(grams)
+    for start in range(0, len(grams), GRAM_CHUNK_SIZE):
+        chunk = grams[start:start + GRAM_CHUNK_SIZE]
+        if delta > 0:
+            MatchTrigram.objects.bulk_create(
+                [MatchTrigram(field=field, gram=gram) for gram in chunk], ignore_conflicts=True,
+            )
+        MatchTrigram.objects.filter(field=field, gram__in=chunk).update(count=F('count') + delta)
+
+def update_frequencies(previous, current):
+    """Move an item's trigrams from its previous state to its current one"""
+    old = contribution(previous) or {}
+    new = contribution(current) or {}
+    for field in FREQUENCY_FIELDS:
+        old_grams = old.get(field, set())
+        new_grams = new.get(field, set())
+        apply_delta(field, old_grams - new_grams, -1)
+        apply_delta(field, new_grams - old_grams, 1)
+
+def rebuild_frequencies(frequencies):
+    """Replace the stored counts with document_frequencies() of every approved item"""
+    MatchTrigram.objects.all().delete()
+    rows = [
+        MatchTrigram(field=field, gram=gram, count=count)
+        for field, (counts, _) in frequencies.items()
+        for gram, count in counts.items()
+    ]
+    MatchTrigram.objects.bulk_create(rows, batch_size=GRAM_CHUNK_SIZE)
+
+def stored_frequencies(items):
+    """
+    document_frequencies() for the given MatchFeatures, from the stored counts.
+
+    Only the trigrams that occur in the items are read, and the text count
+    is the number of approved items, as in a full run.
+    """
+    total = Item.objects.filter(status='approved').count()
+    frequencies = {}
+    for field in FREQUENCY_FIELDS:
+        grams = sorted(set().union(*(char_ngrams(getattr(item, field)).keys() for item in items)))
+        counts = Counter()
+        for start in range(0, len(grams), GRAM_CHUNK_SIZE):
+            rows = MatchTrigram.objects.filter(field=field, gram__in=grams[start:start + GRAM_CHUNK_SIZE])
+            counts.update(dict(rows.values_list('gram', 'count')))
+        frequencies[field] = (counts, total)
+    return frequencies
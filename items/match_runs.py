@@ -0,0 +1,242 @@
+"""
+Incremental automatic matching runs.
+
+A run remembers when it started in MatchingState. The next run only scores
+pairs where at least one side was created or updated after that mark. It
+reads the changed items and their blocked candidates on the other side,
+never the whole pool, and weighs trigrams with the collection-wide counts
+kept in MatchTrigram (items.match_frequencies). Results are written through
+upsert_matches, which looks up only the scored pairs and writes in batches.
+A nightly run therefore costs in proportion to the items that changed and
+their candidates, not to the collection. Full runs read everything and
+rebuild the stored counts.
+
+With several workers the candidate pairs are split into shards that never
+cross a category, each carrying only the feature tuples its pairs need.
+The shards are scored in a process pool and this process, as the single
+writer, merges the results and writes them.
+"""
+
+from collections import defaultdict, namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+from django.db.models import Q
+from django.utils import timezone
+
+from .blocking import candidate_filter, candidate_pairs
+from .matching import MATCH_THRESHOLD, document_frequencies, init_worker, item_features, score_pairs, score_shard
+from .match_frequencies import rebuild_frequencies, stored_frequencies
+from .heuristic import heuristic_matches
+from .match_store import item_matches, retire_matches, upsert_matches
+from .minhash import band_rows, lsh_candidate_pairs
+from .models import Item, MatchingState
+
+# Shards handed to each worker, so one large category cannot hold up the pool
+SHARDS_PER_WORKER = 4
+
+# Items read per id lookup, and changed items whose candidates share one query
+LOOKUP_CHUNK_SIZE = 500
+CANDIDATE_QUERY_SIZE = 50
+
+# matches holds (lost features, found features, score) for every match created
+MatchRun = namedtuple('MatchRun', ['matches', 'updated', 'report', 'changed_count', 'full'])
+
+def get_matching_state():
+    """Return the single row holding the matching high-water mark"""
+    state = MatchingState.objects.first()
+    if state is None:
+        state = MatchingState.objects.create()
+    return state
+
+def changed_item_ids(since):
+    """Ids of approved items created or updated after since"""
+    return set(Item.objects.filter(status='approved', updated_at__gt=since).values_list('id', flat=True))
+
+def features_by_id(item_ids):
+    """MatchFeatures of the approved items among item_ids, in id order"""
+    item_ids = sorted(item_ids)
+    features = []
+    for start in range(0, len(item_ids), LOOKUP_CHUNK_SIZE):
+        chunk = item_ids[start:start + LOOKUP_CHUNK_SIZE]
+        features.extend(item_features(Item.objects.filter(id__in=chunk, status='approved').order_by('id')))
+    return features
+
+def blocked_candidate_ids(items, item_type):
+    """Ids of approved items of item_type sharing a block with any of items"""
+    candidate_ids = set()
+    for start in range(0, len(items), CANDIDATE_QUERY_SIZE):
+        query = Q()
+        for item in items[start:start + CANDIDATE_QUERY_SIZE]:
+            query |= candidate_filter(item)
+        candidate_ids.update(
+            Item.objects.filter(query, item_type=item_type, status='approved').values_list('id', flat=True)
+        )
+    return candidate_ids
+
+def changed_features(changed, lsh=False):
+    """
+    Return (lost, found, buckets): the changed items and their candidates.
+
+    With lsh the candidates are the items sharing a description band, and
+    the buckets read are returned for lsh_candidate_pairs; otherwise they
+    come from the blocking rule and buckets is None.
+    """
+    buckets = None
+    if lsh:
+        buckets = band_rows(changed)
+        items = features_by_id(set(changed).union(*buckets.values()))
+    else:
+        items = features_by_id(changed)
+        item_ids = {item.id for item in items}
+        item_ids |= blocked_candidate_ids([item for item in items if item.item_type == 'lost'], 'found')
+        item_ids |= blocked_candidate_ids([item for item in items if item.item_type == 'found'], 'lost')
+        items = features_by_id(item_ids)
+    lost = [item for item in items if item.item_type == 'lost']
+    found = [item for item in items if item.item_type == 'found']
+    return lost, found, buckets
+
+def build_shards(lost, found, pairs, shard_count, threshold=MATCH_THRESHOLD):
+    """
+    Split candidate pairs into about shard_count self-contained shards.
+
+    Lost items are taken category by category and a shard is closed once it
+    holds its share of the pairs or the category changes. Each shard is a
+    (lost, found, pairs, threshold) tuple re-indexed to its own items.
+    """
+    found_by_lost = defaultdict(list)
+    for lost_position, found_position in pairs:
+        found_by_lost[lost_position].append(found_position)
+    target = max(1, len(pairs) // max(shard_count, 1))
+
+    shards = []
+    current = []
+    size = 0
+    for lost_position in sorted(found_by_lost, key=lambda position: (lost[position].category, position)):
+        if current and (size >= target or lost[current[-1]].category != lost[lost_position].category):
+            shards.append(make_shard(lost, found, current, found_by_lost, threshold))
+            current = []
+            size = 0
+        current.append(lost_position)
+        size += len(found_by_lost[lost_position])
+    if current:
+        shards.append(make_shard(lost, found, current, found_by_lost, threshold))
+    return shards
+
+def make_shard(lost, found, lost_positions, found_by_lost, threshold):
+    """Package the given lost items with the found items they pair with"""
+    found_positions = sorted({position for lost_position in lost_positions for position in found_by_lost[lost_position]})
+    local = {position: index for index, position in enumerate(found_positions)}
+    shard_pairs = [
+        (lost_index, local[found_position])
+        for lost_index, lost_position in enumerate(lost_positions)
+        for found_position in found_by_lost[lost_position]
+    ]
+    return (
+        [lost[position] for position in lost_positions],
+        [found[position] for position in found_positions],
+        shard_pairs,
+        threshold,
+    )
+
+def score_in_pool(lost, found, pairs, workers, threshold=MATCH_THRESHOLD, frequencies=None):
+    """Yield (lost_id, found_id, score) from shards scored across worker processes"""
+    shards = build_shards(lost, found, pairs, workers * SHARDS_PER_WORKER, threshold)
+    frequencies = frequencies or document_frequencies(lost, found)
+    with ProcessPoolExecutor(max_workers=workers, initializer=init_worker, initargs=(frequencies,)) as pool:
+        for results in pool.map(score_shard, shards):
+            yield from results
+
+def run_matching(full=False, threshold=MATCH_THRESHOLD, workers=1, lsh=False):
+    """
+    Score new candidate pairs, store the new matches and advance the mark.
+
+    The first run, or any run with full=True, scores every candidate pair.
+    With workers > 1 scoring is spread over that many processes. With lsh
+    the candidates are pairs with similar descriptions (items.minhash)
+    instead of pairs sharing a date window or building.
+    """
+    started = timezone.now()
+    state = get_matching_state()
+    full = full or state.matched_until is None or not state.frequencies_ready
+
+    if full:
+        changed = None
+        lost = item_features(Item.objects.filter(item_type='lost', status='approved'))
+        found = item_features(Item.objects.filter(item_type='found', status='approved'))
+        frequencies = document_frequencies(lost, found)
+        rebuild_frequencies(frequencies)
+        pool_sizes = buckets = None
+    else:
+        changed = changed_item_ids(state.matched_until)
+        lost, found, buckets = changed_features(changed, lsh)
+        frequencies = stored_frequencies(lost + found)
+        approved = Item.objects.filter(status='approved')
+        pool_sizes = (approved.filter(item_type='lost').count(), approved.filter(item_type='found').count())
+
+    if lsh:
+        pairs, report = lsh_candidate_pairs(lost, found, changed_ids=changed, buckets=buckets, pool_sizes=pool_sizes)
+    else:
+        pairs, report = candidate_pairs(lost, found, changed_ids=changed, pool_sizes=pool_sizes)
+
+    matches = []
+    updated = 0
+    if pairs:
+        if workers > 1:
+            scored = score_in_pool(lost, found, pairs, workers, threshold, frequencies)
+        else:
+            scored = score_pairs(lost, found, threshold, pairs, frequencies)
+        created, updated = upsert_matches(scored, 'tfidf')
+        by_id = {item.id: item for item in lost + found}
+        matches = [(by_id[lost_id], by_id[found_id], score) for lost_id, found_id, score in created]
+
+    # Items saved while this run was reading are picked up by the next one
+    MatchingState.objects.filter(pk=state.pk).update(matched_until=started, frequencies_ready=True)
+    return MatchRun(matches, updated, report, len(changed) if changed is not None else len(lost) + len(found), full)
+
+def match_frequencies(items):
+    """Collection-wide document frequencies for scoring items outside a full run"""
+    if get_matching_state().frequencies_ready:
+        return stored_frequencies(items)
+    # No full run has counted them yet: count every approved item once
+    lost = item_features(Item.objects.filter(item_type='lost', status='approved'))
+    found = item_features(Item.objects.filter(item_type='found', status='approved'))
+    return document_frequencies(lost, found)
+
+def tfidf_matches(item, threshold=MATCH_THRESHOLD):
+    """(lost_id, found_id, score) of one item against its blocked candidates, as a batch run scores them"""
+    other_type = 'found' if item.item_type == 'lost' else 'lost'
+    candidates = item_features(Item.objects.filter(candidate_filter(item), item_type=other_type, status='approved'))
+    features = item_features(Item.objects.filter(pk=item.pk))
+    frequencies = match_frequencies(features + candidates)
+    if item.item_type == 'lost':
+        return list(score_pairs(features, candidates, threshold, frequencies=frequencies))
+    return list(score_pairs(candidates, features, threshold, frequencies=frequencies))
+
+# How each scorer re-scores a single item
+RESCORERS = {
+    'heuristic': lambda item: list(heuristic_matches(item)),
+    'tfidf': tfidf_matches,
+}
+
+def rescore_item(item):
+    """
+    Recompute one item's matches after one of its match fields was edited.
+
+    Each scorer that produced one of the item's matches is run again (the
+    heuristic alone when there are none). Its pairs are upserted with
+    their new score, which reactivates retired ones that hold again, and
+    the matches it stored but no longer produces are retired; other
+    scorers' matches are left alone. An item that is not approved just
+    has all its matches retired. Returns (upserted, retired).
+    """
+    if item.status != 'approved':
+        return 0, retire_matches(item.pk)
+
+    scorers = set(item_matches(item.pk).values_list('scorer', flat=True)) or {'heuristic'}
+    upserted = retired = 0
+    for scorer in sorted(scorers):
+        scored = RESCORERS[scorer](item)
+        upsert_matches(scored, scorer, replace=True)
+        retired += retire_matches(item.pk, keep=[(lost_id, found_id) for lost_id, found_id, _ in scored], scorer=scorer)
+        upserted += len(scored)
+    return upserted, retired
@@ -0,0 +1,260 @@
+"""
+Writing ItemMatch rows.
+
+Each (lost_item, found_item) pair is stored at most once, enforced by a
+unique constraint. Every matching code path writes through upsert_matches:
+new pairs are inserted with bulk_create and pairs that already exist only
+have their score raised when the new score is better, so re-running a
+match never adds rows. A pair found again is also made active again.
+Both scorers (MATCH_SCORERS) work on the same 0-100 scale, and each row
+records the scorer whose score it holds. Re-scoring after an edit uses
+replace mode, which overwrites stale scores from the same scorer even when
+they drop; another scorer's score is only ever beaten. Duplicates left
+over from before the constraint existed were removed by its migration.
+
+Only the best active matches of each item are kept: ITEMS_MATCH_TOP_K_LOST
+per lost item and ITEMS_MATCH_TOP_K_FOUND per found item (both default to
+ITEMS_MATCH_TOP_K). A pair stays while it ranks in the top k of either of
+its items, on the shared 0-100 scale of both scorers. New scores stream
+through one bounded min-heap per item, so a run holds at most k entries
+per item instead of every pair. The survivors are merged with
+the stored matches of the items involved, and stored pairs that no longer
+rank in either item's top k are evicted. The table therefore grows with the
+number of items, not the number of pairs.
+"""
+
+import heapq
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+
+from .models import ItemMatch
+
+# Item statuses that mean a match led somewhere
+RESOLVED_STATUSES = ('claimed', 'returned')
+
+# Pairs looked up and written per batch
+UPSERT_BATCH_SIZE = 500
+
+# Best matches kept per lost and per found item; a side set to 0 ranks
+# nothing, and with both at 0 every match is kept
+MATCH_TOP_K = getattr(settings, 'ITEMS_MATCH_TOP_K', 10)
+MATCH_TOP_K_LOST = getattr(settings, 'ITEMS_MATCH_TOP_K_LOST', MATCH_TOP_K)
+MATCH_TOP_K_FOUND = getattr(settings, 'ITEMS_MATCH_TOP_K_FOUND', MATCH_TOP_K)
+
+class TopMatches:
+    """
+    Per-item bounded min-heaps of the best (score, lost_id, found_id) entries.
+
+    Each pair is expected to be added once, with its best score.
+    """
+
+    def __init__(self, lost_k, found_k):
+        self.lost_k = lost_k
+        self.found_k = found_k
+        self._heaps = defaultdict(list)
+
+    def add(self, lost_id, found_id, score):
+        """Offer a pair to the top k of both of its items"""
+        entry = (score, lost_id, found_id)
+        for item_id, k in ((lost_id, self.lost_k), (found_id, self.found_k)):
+            if not k:
+                continue
+            heap = self._heaps[item_id]
+            if len(heap) < k:
+                heapq.heappush(heap, entry)
+            elif entry > heap[0]:
+                heapq.heapreplace(heap, entry)
+
+    def scores(self):
+        """{(lost_id, found_id): score} for every pair in some item's top k"""
+        kept = {}
+        for heap in self._heaps.values():
+            for score, lost_id, found_id in heap:
+                pair = (lost_id, found_id)
+                if pair not in kept or score > kept[pair]:
+                    kept[pair] = score
+        return kept
+
+def best_scores(scored):
+    """Collapse (lost_id, found_id, score) triples to {pair: best score}"""
+    best = {}
+    for lost_id, found_id, score in scored:
+        pair = (lost_id, found_id)
+        if pair not in best or score > best[pair]:
+            best[pair] = score
+    return best
+
+def stored_matches(item_ids, batch_size=UPSERT_BATCH_SIZE):
+    """{(lost_id, found_id): (id, score, scorer)} of the active matches touching item_ids"""
+    item_ids = sorted(item_ids)
+    stored = {}
+    for start in range(0, len(item_ids), batch_size):
+        chunk = item_ids[start:start + batch_size]
+        rows = ItemMatch.objects.filter(
+            Q(lost_item_id__in=chunk) | Q(found_item_id__in=chunk), active=True,
+        ).values_list('id', 'lost_item_id', 'found_item_id', 'match_score', 'scorer')
+        for match_id, lost_id, found_id, score, scorer in rows:
+            stored[(lost_id, found_id)] = (match_id, score, scorer)
+    return stored
+
+def merged_score(score, scorer, stored_score, stored_scorer, replace=False, active=True):
+    """Return the (score, scorer) a stored pair keeps after a new score arrives"""
+    if not active or (replace and scorer == stored_scorer) or score > stored_score:
+        return score, scorer
+    return stored_score, stored_scorer
+
+def merge_top_k(best, top_k, scorer, replace=False):
+    """
+    Merge new best scores with stored matches and keep each item's top k.
+
+    top_k is a (lost k, found k) pair.
+    Returns (best, evicted): the new scores that made some item's top k,
+    and ids of stored matches that dropped out of both items' top k.
+    """
+    touched = {item_id for pair in best for item_id in pair}
+    stored = stored_matches(touched)
+    # Partners' full lists are needed to know whether they still rank a pair
+    partners = {item_id for pair in stored for item_id in pair} - touched
+    stored.update(stored_matches(partners))
+
+    combined = {pair: score for pair, (_, score, _) in stored.items()}
+    for pair, score in best.items():
+        if pair in stored:
+            _, stored_score, stored_scorer = stored[pair]
+            score, _ = merged_score(score, scorer, stored_score, stored_scorer, replace)
+        combined[pair] = score
+
+    top = TopMatches(*top_k)
+    for (lost_id, found_id), score in combined.items():
+        top.add(lost_id, found_id, score)
+    kept = top.scores()
+
+    # Pairs between two untouched partners are unaffected and never evicted
+    evicted = [
+        match_id for pair, (match_id, _, _) in stored.items()
+        if pair not in kept and (pair[0] in touched or pair[1] in touched)
+    ]
+    return {pair: score for pair, score in best.items() if pair in kept}, evicted
+
+def upsert_chunk(chunk, best, scorer, replace=False, attempts=3):
+    """
+    Upsert one chunk of pairs; returns (created, updated) like upsert_matches.
+
+    Another writer (the job worker or the batch command) may insert one of
+    the new pairs between the lookup and the insert. The unique constraint
+    then rejects the insert, and the chunk is read again so those pairs are
+    updated instead.
+    """
+    for attempt in range(attempts):
+        stored = {}
+        rows = ItemMatch.objects.filter(
+            lost_item_id__in={lost_id for lost_id, _ in chunk},
+            found_item_id__in={found_id for _, found_id in chunk},
+        ).only('id', 'lost_item_id', 'found_item_id', 'match_score', 'scorer', 'active')
+        for match in rows:
+            stored[(match.lost_item_id, match.found_item_id)] = match
+
+        new_matches = []
+        created = []
+        changed = []
+        for pair in chunk:
+            score = best[pair]
+            match = stored.get(pair)
+            if match is None:
+                new_matches.append(ItemMatch(lost_item_id=pair[0], found_item_id=pair[1], match_score=score, scorer=scorer))
+                created.append((pair[0], pair[1], score))
+                continue
+            merged = merged_score(score, scorer, match.match_score, match.scorer, replace, match.active)
+            if merged != (match.match_score, match.scorer) or not match.active:
+                match.match_score, match.scorer = merged
+                match.active = True
+                changed.append(match)
+
+        try:
+            with transaction.atomic():
+                ItemMatch.objects.bulk_create(new_matches)
+        except IntegrityError:
+            if attempt == attempts - 1:
+                raise
+            continue
+        if changed:
+            ItemMatch.objects.bulk_update(changed, ['match_score', 'scorer', 'active'])
+        return created, len(changed)
+
+def upsert_matches(scored, scorer, replace=False, top_k=(MATCH_TOP_K_LOST, MATCH_TOP_K_FOUND),
+                   batch_size=UPSERT_BATCH_SIZE):
+    """
+    Store (lost_id, found_id, score) matches from scorer, keeping the best score per pair.
+
+    With replace the new score is stored even when it is lower than a score
+    the same scorer stored before. With a (lost k, found k) top_k only
+    pairs ranking in some item's top k are stored and stored pairs pushed
+    out are deleted. Returns (created, updated) where created lists
+    the new (lost_id, found_id, score) triples and updated counts rows that
+    were changed.
+    """
+    # A pair offered twice must not take two places in a top-k heap
+    best = best_scores(scored)
+    evicted = []
+    if top_k and any(top_k):
+        top = TopMatches(*top_k)
+        for (lost_id, found_id), score in best.items():
+            top.add(lost_id, found_id, score)
+        best, evicted = merge_top_k(top.scores(), top_k, scorer, replace)
+    pairs = sorted(best)
+    created = []
+    updated = 0
+    for start in range(0, len(pairs), batch_size):
+        chunk_created, chunk_updated = upsert_chunk(pairs[start:start + batch_size], best, scorer, replace)
+        created.extend(chunk_created)
+        updated += chunk_updated
+
+    for start in range(0, len(evicted), batch_size):
+        ItemMatch.objects.filter(id__in=evicted[start:start + batch_size]).delete()
+    return created, updated
+
+def item_matches(item_id):
+    """Every stored match that involves an item, on either side"""
+    return ItemMatch.objects.filter(Q(lost_item_id=item_id) | Q(found_item_id=item_id))
+
+def retire_matches(item_id, keep=(), scorer=None):
+    """
+    Deactivate an item's active matches except the (lost_id, found_id) pairs in keep.
+
+    With scorer only that scorer's matches are considered.
+    """
+    keep = set(keep)
+    matches = item_matches(item_id).filter(active=True)
+    if scorer:
+        matches = matches.filter(scorer=scorer)
+    retired = [
+        match_id
+        for match_id, lost_id, found_id in matches.values_list('id', 'lost_item_id', 'found_item_id')
+        if (lost_id, found_id) not in keep
+    ]
+    if retired:
+        ItemMatch.objects.filter(id__in=retired).update(active=False)
+    return len(retired)
+
+def counted_matches():
+    """
+    Matches the statistics count: active ones, plus the retired matches of
+    claimed or returned items.
+
+    Leaving approved retires an item's matches. For a claimed or returned
+    item that is because a match worked out, so those still count; matches
+    retired as stale or for a rejected item do not.
+    """
+    return ItemMatch.objects.filter(Q(active=True) | resolved_match_filter())
+
+def resolved_match_filter():
+    """Q for matches whose lost or found item has been claimed or returned"""
+    return Q(lost_item__status__in=RESOLVED_STATUSES) | Q(found_item__status__in=RESOLVED_STATUSES)
+
+def match_success_counts():
+    """Return (total, successful) counted matches for the success-rate statistics"""
+    matches = counted_matches()
+    return matches.count(), matches.filter(resolved_match_filter()).count()
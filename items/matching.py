@@ -0,0 +1,278 @@
+"""
+Bulk scoring of lost/found pairs for automatic matching.
+
+Every pair is scored on the same 0-100 scale as before: 30 points for a
+matching category, up to 25 for name similarity, 20 for description, 15 for
+location and 10 for date proximity, with 70 as the match threshold. Text
+similarity is the cosine between TF-IDF weighted character trigram vectors.
+
+With NumPy and SciPy installed each text field becomes a sparse matrix, and
+a block of lost items is scored against every found item with one sparse
+product per field. When blocking has already narrowed the pairs down, the
+candidate rows are gathered and multiplied element-wise instead. Without
+NumPy and SciPy the same formula runs pair by pair in pure Python, so every
+path gives identical scores. score_shard lets a process pool score disjoint
+shards of one run with the run's shared IDF statistics.
+"""
+
+import math
+from collections import Counter, namedtuple
+
+try:
+    import numpy as np
+    from scipy import sparse
+except ImportError:
+    np = None
+    sparse = None
+
+MATCH_THRESHOLD = 70
+
+CATEGORY_POINTS = 30
+
+# Maximum points for each compared text field
+FIELD_POINTS = (('name', 25), ('description', 20), ('location', 15))
+
+# (maximum days apart, points) checked in order
+DATE_POINTS = ((1, 10), (3, 7), (7, 5), (14, 3))
+
+MAX_SCORE = 100
+
+NGRAM_SIZE = 3
+
+# Lost items scored per sparse product, which bounds the dense score block;
+# candidate pairs are scored BLOCK_SIZE ** 2 / 10 at a time
+BLOCK_SIZE = 1000
+
+# Keeps cosine rounding error (0.99999...) from costing a whole point
+EPSILON = 1e-9
+
+# The only item data scoring needs, read with values_list
+MatchFeatures = namedtuple('MatchFeatures', ['id', 'category', 'name', 'description', 'location', 'date', 'location_building', 'item_type'])
+
+def item_features(queryset):
+    """Read the scoring fields of every item in a queryset"""
+    return [MatchFeatures(*row) for row in queryset.values_list(*MatchFeatures._fields)]
+
+def vectorized_available():
+    """True when NumPy and SciPy are installed"""
+    return np is not None and sparse is not None
+
+def char_ngrams(text):
+    """Count the character trigrams of whitespace-normalized, lowercased text"""
+    text = ' '.join((text or '').lower().split())
+    if not text:
+        return Counter()
+    padded = f' {text} '
+    return Counter(padded[index:index + NGRAM_SIZE] for index in range(len(padded) - NGRAM_SIZE + 1))
+
+def document_frequencies(lost, found):
+    """Return {field: (trigram document frequencies, text count)} over both sides"""
+    frequencies = {}
+    for field, _ in FIELD_POINTS:
+        counts = Counter()
+        for item in lost + found:
+            counts.update(char_ngrams(getattr(item, field)).keys())
+        frequencies[field] = (counts, len(lost) + len(found))
+    return frequencies
+
+def field_weights(texts, frequencies=None):
+    """
+    L2-normalized TF-IDF trigram weights for each text.
+
+    IDF is taken over the texts themselves unless ``frequencies`` supplies
+    (document frequencies, text count) from a larger collection.
+    """
+    counts = [char_ngrams(text) for text in texts]
+    if frequencies is None:
+        frequencies = (Counter(gram for count in counts for gram in count), len(counts))
+    document_frequency, total = frequencies
+
+    weights = []
+    for count in counts:
+        weighted = {
+            gram: frequency * (math.log((1 + total) / (1 + document_frequency[gram])) + 1)
+            for gram, frequency in count.items()
+        }
+        norm = math.sqrt(sum(value * value for value in weighted.values()))
+        weights.append({gram: value / norm for gram, value in weighted.items()} if norm else {})
+    return weights
+
+def date_points(first, second):
+    """Points for two dates being close together"""
+    days = abs((first - second).days)
+    for limit, points in DATE_POINTS:
+        if days <= limit:
+            return points
+    return 0
+
+def text_points(similarity, points):
+    """Scale a 0-1 similarity to whole points, truncating like int() did"""
+    return math.floor(min(similarity, 1.0) * points + EPSILON)
+
+def cosine(first, second):
+    """Dot product of two normalized sparse vectors stored as dicts"""
+    if len(first) > len(second):
+        first, second = second, first
+    return sum(value * second.get(gram, 0.0) for gram, value in first.items())
+
+def field_vectors(lost, found, frequencies=None):
+    """Return {field: (lost weights, found weights)} with a shared IDF per field"""
+    vectors = {}
+    for field, _ in FIELD_POINTS:
+        texts = [getattr(item, field) for item in lost] + [getattr(item, field) for item in found]
+        weights = field_weights(texts, frequencies[field] if frequencies else None)
+        vectors[field] = (weights[:len(lost)], weights[len(lost):])
+    return vectors
+
+def score_pairs(lost, found, threshold=MATCH_THRESHOLD, pairs=None, frequencies=None):
+    """
+    Yield (lost_id, found_id, score) for every pair scoring at least threshold.
+
+    ``pairs`` limits scoring to (lost index, found index) candidates, as
+    produced by blocking; by default every lost item meets every found item.
+    ``frequencies`` (see document_frequencies) fixes the IDF weights, so a
+    shard of a larger run scores exactly as the whole run would. Only the
+    items that appear in ``pairs`` are vectorized.
+    """
+    if not lost or not found:
+        return iter(())
+    if pairs is not None:
+        if frequencies is None:
+            frequencies = document_frequencies(lost, found)
+        lost, found, pairs = compact_pairs(lost, found, pairs)
+        if not pairs:
+            return iter(())
+    if vectorized_available():
+        if pairs is None:
+            return score_all_vectorized(lost, found, threshold, frequencies)
+        return score_candidates_vectorized(lost, found, pairs, threshold, frequencies)
+    if pairs is None:
+        pairs = ((lost_index, found_index) for lost_index in range(len(lost)) for found_index in range(len(found)))
+    return score_pairs_python(lost, found, pairs, threshold, frequencies)
+
+def compact_pairs(lost, found, pairs):
+    """Drop items no pair uses; returns (lost, found, pairs) re-indexed to what is left"""
+    pairs = list(pairs)
+    lost_positions = sorted({lost_index for lost_index, _ in pairs})
+    found_positions = sorted({found_index for _, found_index in pairs})
+    lost_local = {position: index for index, position in enumerate(lost_positions)}
+    found_local = {position: index for index, position in enumerate(found_positions)}
+    return (
+        [lost[position] for position in lost_positions],
+        [found[position] for position in found_positions],
+        [(lost_local[lost_index], found_local[found_index]) for lost_index, found_index in pairs],
+    )
+
+def score_pairs_python(lost, found, pairs, threshold=MATCH_THRESHOLD, frequencies=None):
+    """Pure-Python scoring, one pair at a time"""
+    vectors = field_vectors(lost, found, frequencies)
+    for lost_index, found_index in pairs:
+        lost_item = lost[lost_index]
+        found_item = found[found_index]
+        score = CATEGORY_POINTS if lost_item.category == found_item.category else 0
+        for field, points in FIELD_POINTS:
+            lost_vectors, found_vectors = vectors[field]
+            score += text_points(cosine(lost_vectors[lost_index], found_vectors[found_index]), points)
+        score = min(score + date_points(lost_item.date, found_item.date), MAX_SCORE)
+        if score >= threshold:
+            yield lost_item.id, found_item.id, score
+
+def to_matrix(weights, vocabulary):
+    """Pack weight dicts into CSR arrays, growing the shared vocabulary"""
+    indptr = [0]
+    indices = []
+    data = []
+    for weighted in weights:
+        for gram, value in weighted.items():
+            indices.append(vocabulary.setdefault(gram, len(vocabulary)))
+            data.append(value)
+        indptr.append(len(indices))
+    return data, indices, indptr
+
+def field_matrices(lost, found, frequencies=None):
+    """Return {field: (lost matrix, found matrix)} as row-normalized CSR matrices"""
+    matrices = {}
+    for field, (lost_weights, found_weights) in field_vectors(lost, found, frequencies).items():
+        vocabulary = {}
+        lost_arrays = to_matrix(lost_weights, vocabulary)
+        found_arrays = to_matrix(found_weights, vocabulary)
+        width = max(len(vocabulary), 1)
+        matrices[field] = (
+            sparse.csr_matrix(lost_arrays, shape=(len(lost), width)),
+            sparse.csr_matrix(found_arrays, shape=(len(found), width)),
+        )
+    return matrices
+
+def item_arrays(items, category_codes):
+    """Category codes and day ordinals of items as NumPy arrays"""
+    categories = np.array([category_codes.setdefault(item.category, len(category_codes)) for item in items])
+    days = np.array([item.date.toordinal() for item in items])
+    return categories, days
+
+def combine_scores(same_category, similarities, days_apart):
+    """Vectorized version of the per-pair formula over arrays of any shape"""
+    scores = CATEGORY_POINTS * same_category.astype(float)
+    for (_, points), similarity in zip(FIELD_POINTS, similarities):
+        scores += np.floor(np.minimum(similarity, 1.0) * points + EPSILON)
+    scores += np.select([days_apart <= limit for limit, _ in DATE_POINTS], [points for _, points in DATE_POINTS], 0)
+    return np.minimum(scores, MAX_SCORE)
+
+def score_all_vectorized(lost, found, threshold=MATCH_THRESHOLD, frequencies=None):
+    """Sparse-matrix scoring, one block of lost items against all found items at a time"""
+    matrices = field_matrices(lost, found, frequencies)
+    found_transposed = {field: found_matrix.T.tocsc() for field, (_, found_matrix) in matrices.items()}
+    category_codes = {}
+    lost_categories, lost_days = item_arrays(lost, category_codes)
+    found_categories, found_days = item_arrays(found, category_codes)
+
+    for start in range(0, len(lost), BLOCK_SIZE):
+        stop = min(start + BLOCK_SIZE, len(lost))
+        similarities = [
+            (matrices[field][0][start:stop] @ found_transposed[field]).toarray()
+            for field, _ in FIELD_POINTS
+        ]
+        scores = combine_scores(
+            lost_categories[start:stop, None] == found_categories[None, :],
+            similarities,
+            np.abs(lost_days[start:stop, None] - found_days[None, :]),
+        )
+        for row, column in zip(*np.nonzero(scores >= threshold)):
+            yield lost[start + row].id, found[column].id, int(scores[row, column])
+
+def score_candidates_vectorized(lost, found, pairs, threshold=MATCH_THRESHOLD, frequencies=None):
+    """Sparse-matrix scoring of explicit candidate pairs, a slice of pairs at a time"""
+    pairs = np.asarray(list(pairs), dtype=int).reshape(-1, 2)
+    matrices = field_matrices(lost, found, frequencies)
+    category_codes = {}
+    lost_categories, lost_days = item_arrays(lost, category_codes)
+    found_categories, found_days = item_arrays(found, category_codes)
+
+    slice_size = BLOCK_SIZE * BLOCK_SIZE // 10
+    for start in range(0, len(pairs), slice_size):
+        lost_index = pairs[start:start + slice_size, 0]
+        found_index = pairs[start:start + slice_size, 1]
+        # Row-wise dot products of the gathered rows: one cosine per pair
+        similarities = [
+            np.asarray(lost_matrix[lost_index].multiply(found_matrix[found_index]).sum(axis=1)).ravel()
+            for lost_matrix, found_matrix in (matrices[field] for field, _ in FIELD_POINTS)
+        ]
+        scores = combine_scores(
+            lost_categories[lost_index] == found_categories[found_index],
+            similarities,
+            np.abs(lost_days[lost_index] - found_days[found_index]),
+        )
+        for position in np.nonzero(scores >= threshold)[0]:
+            yield lost[lost_index[position]].id, found[found_index[position]].id, int(scores[position])
+
+# Set in each pool worker by init_worker so shards need not carry them
+_worker_frequencies = None
+
+def init_worker(frequencies):
+    """Process pool initializer: keep the run's IDF statistics in the worker"""
+    global _worker_frequencies
+    _worker_frequencies = frequencies
+
+def score_shard(shard):
+    """Score one (lost, found, pairs, threshold) shard in a pool worker"""
+    lost, found, pairs, threshold = shard
+    return list(score_pairs(lost, found, threshold, pairs, _worker_frequencies))
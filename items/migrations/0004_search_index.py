@@ -0,0 +1,41 @@
+# Generated by Django 3.1.14 on 2026-10-18 04:44
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('items', '0003_itemmatch_notified'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchIndexState',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('document_count', models.PositiveIntegerField(default=0)),
+                ('total_length', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='SearchPosting',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('term', models.CharField(db_index=True, max_length=50)),
+                ('field', models.CharField(max_length=20)),
+                ('frequency', models.PositiveIntegerField(default=1)),
+                ('document_length', models.PositiveIntegerField(default=0)),
+                ('item', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='search_postings', to='items.item')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='SearchDocument',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('length', models.PositiveIntegerField(default=0)),
+                ('item', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='search_document', to='items.item')),
+            ],
+        ),
+    ]
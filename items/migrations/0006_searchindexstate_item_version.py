@@ -0,0 +1,18 @@
+# Generated by Django 3.1.14 on 2026-10-18 04:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('items', '0005_search_trigrams'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='searchindexstate',
+            name='item_version',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
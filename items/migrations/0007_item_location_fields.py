@@ -0,0 +1,28 @@
+# Generated by Django 3.1.14 on 2026-10-18 04:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('items', '0006_searchindexstate_item_version'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='item',
+            name='location_area',
+            field=models.CharField(blank=True, default='', max_length=100),
+        ),
+        migrations.AddField(
+            model_name='item',
+            name='location_building',
+            field=models.CharField(blank=True, db_index=True, default='', max_length=100),
+        ),
+        migrations.AddField(
+            model_name='item',
+            name='location_floor',
+            field=models.SmallIntegerField(blank=True, db_index=True, null=True),
+        ),
+    ]
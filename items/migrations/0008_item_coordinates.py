@@ -0,0 +1,28 @@
+# Generated by Django 3.1.14 on 2026-10-18 04:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('items', '0007_item_location_fields'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='item',
+            name='geohash',
+            field=models.CharField(blank=True, db_index=True, default='', max_length=12),
+        ),
+        migrations.AddField(
+            model_name='item',
+            name='latitude',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='item',
+            name='longitude',
+            field=models.FloatField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 3.1.14 on 2026-10-18 04:53
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('items', '0009_map_clusters'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PhoneticKey',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(db_index=True, max_length=12)),
+                ('full_name', models.BooleanField(default=False)),
+                ('item', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='phonetic_keys', to='items.item')),
+            ],
+        ),
+    ]
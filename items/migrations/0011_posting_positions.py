@@ -0,0 +1,23 @@
+# Generated by Django 3.1.14 on 2026-10-18 04:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('items', '0010_phonetic_keys'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='searchposting',
+            name='offsets',
+            field=models.TextField(blank=True, default=''),
+        ),
+        migrations.AddField(
+            model_name='searchposting',
+            name='positions',
+            field=models.TextField(blank=True, default=''),
+        ),
+    ]
@@ -0,0 +1,56 @@
+# Generated by Django 3.1.14 on 2026-10-18 05:01
+
+from collections import defaultdict
+
+from django.db import migrations
+
+CHUNK_SIZE = 500
+
+
+def remove_duplicate_matches(apps, schema_editor):
+    """
+    Duplicates must go before the unique constraint can be added.
+
+    Keeps the best-scored (then oldest) row of each pair, marked notified
+    if any of its duplicates was, one chunk of lost items at a time.
+    """
+    ItemMatch = apps.get_model('items', 'ItemMatch')
+    lost_ids = sorted(set(ItemMatch.objects.values_list('lost_item_id', flat=True)))
+    for start in range(0, len(lost_ids), CHUNK_SIZE):
+        groups = defaultdict(list)
+        rows = ItemMatch.objects.filter(lost_item_id__in=lost_ids[start:start + CHUNK_SIZE]).values_list(
+            'id', 'lost_item_id', 'found_item_id', 'match_score', 'notified',
+        )
+        for match_id, lost_id, found_id, score, notified in rows:
+            groups[(lost_id, found_id)].append((-score, match_id, notified))
+
+        duplicate_ids = []
+        notified_ids = []
+        for group in groups.values():
+            if len(group) < 2:
+                continue
+            group.sort()
+            keep = group[0]
+            duplicate_ids.extend(match_id for _, match_id, _ in group[1:])
+            if not keep[2] and any(notified for _, _, notified in group[1:]):
+                notified_ids.append(keep[1])
+
+        if notified_ids:
+            ItemMatch.objects.filter(id__in=notified_ids).update(notified=True)
+        for offset in range(0, len(duplicate_ids), CHUNK_SIZE):
+            ItemMatch.objects.filter(id__in=duplicate_ids[offset:offset + CHUNK_SIZE]).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('items', '0013_jobs'),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_duplicate_matches, migrations.RunPython.noop),
+        migrations.AlterUniqueTogether(
+            name='itemmatch',
+            unique_together={('lost_item', 'found_item')},
+        ),
+    ]
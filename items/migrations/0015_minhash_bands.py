@@ -0,0 +1,27 @@
+# Generated by Django 3.1.14 on 2026-10-18 05:02
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('items', '0014_unique_item_matches'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='item',
+            name='minhash',
+            field=models.BinaryField(blank=True, default=b''),
+        ),
+        migrations.CreateModel(
+            name='MinHashBand',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(db_index=True, max_length=24)),
+                ('item', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='minhash_bands', to='items.item')),
+            ],
+        ),
+    ]
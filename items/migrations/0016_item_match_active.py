@@ -0,0 +1,18 @@
+# Generated by Django 3.1.14 on 2026-10-18 05:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('items', '0015_minhash_bands'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='itemmatch',
+            name='active',
+            field=models.BooleanField(db_index=True, default=True),
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 3.1.14 on 2026-10-18 05:17
+
+from django.db import migrations
+
+
+def remove_duplicate_trigrams(apps, schema_editor):
+    """Concurrent registrations may have stored a (gram, term) row twice"""
+    SearchTrigram = apps.get_model('items', 'SearchTrigram')
+    seen = set()
+    duplicate_ids = []
+    for trigram_id, gram, term in SearchTrigram.objects.order_by('id').values_list('id', 'gram', 'term').iterator():
+        if (gram, term) in seen:
+            duplicate_ids.append(trigram_id)
+        else:
+            seen.add((gram, term))
+    for start in range(0, len(duplicate_ids), 500):
+        SearchTrigram.objects.filter(id__in=duplicate_ids[start:start + 500]).delete()
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('items', '0016_item_match_active'),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_duplicate_trigrams, migrations.RunPython.noop),
+        migrations.AlterUniqueTogether(
+            name='searchtrigram',
+            unique_together={('gram', 'term')},
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 3.1.14 on 2026-10-18 05:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('items', '0017_unique_search_trigrams'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='matchingstate',
+            name='frequencies_ready',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.CreateModel(
+            name='MatchTrigram',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('field', models.CharField(max_length=20)),
+                ('gram', models.CharField(max_length=3)),
+                ('count', models.IntegerField(default=0)),
+            ],
+            options={
+                'unique_together': {('field', 'gram')},
+            },
+        ),
+    ]
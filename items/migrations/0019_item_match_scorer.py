@@ -0,0 +1,38 @@
+# Generated by Django 3.1.14 on 2026-10-18 05:21
+
+from django.db import migrations, models
+from django.db.models import F
+
+# The heuristic scored 0-4; the batch scorer 0-100 with a threshold of 70
+HEURISTIC_MAX = 4
+HEURISTIC_SCALE = 25
+
+
+def label_heuristic_matches(apps, schema_editor):
+    """Mark heuristic rows and move their scores onto the 0-100 scale"""
+    ItemMatch = apps.get_model('items', 'ItemMatch')
+    ItemMatch.objects.filter(match_score__lte=HEURISTIC_MAX).update(
+        scorer='heuristic', match_score=F('match_score') * HEURISTIC_SCALE,
+    )
+
+
+def unlabel_heuristic_matches(apps, schema_editor):
+    """Put heuristic scores back on their 0-4 scale"""
+    ItemMatch = apps.get_model('items', 'ItemMatch')
+    ItemMatch.objects.filter(scorer='heuristic').update(match_score=F('match_score') / HEURISTIC_SCALE)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('items', '0018_match_trigrams'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='itemmatch',
+            name='scorer',
+            field=models.CharField(choices=[('heuristic', 'Report-time heuristic'), ('tfidf', 'Batch TF-IDF')], default='tfidf', max_length=10),
+        ),
+        migrations.RunPython(label_heuristic_matches, unlabel_heuristic_matches),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 3.1.14 on 2026-10-18 05:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('items', '0019_item_match_scorer'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='phonetickey',
+            name='key',
+            field=models.CharField(db_index=True, max_length=40),
+        ),
+    ]
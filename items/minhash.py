@@ -0,0 +1,173 @@
+"""
+MinHash signatures and an LSH band index for item descriptions.
+
+Each description is reduced to its set of index terms (see items.search)
+and summarised by a fixed-size MinHash signature of NUM_HASHES 32-bit
+values, packed into the item's ``minhash`` column when it is saved. Two
+signatures agree in a position with probability equal to the Jaccard
+similarity of the term sets.
+
+The signature is cut into BANDS bands of ROWS values and every band is
+hashed to a MinHashBand key. Items sharing any key are candidates. With 16
+bands of 4 rows, pairs above roughly 0.5 Jaccard collide with high
+probability and dissimilar pairs rarely do, so candidates come from indexed
+key lookups instead of comparing every pair.
+"""
+
+import hashlib
+import random
+import struct
+import zlib
+from collections import defaultdict
+
+from .blocking import blocking_report
+from .models import Item, MinHashBand
+from .search import bump_item_version, tokenize
+from .utils import iter_chunks
+
+NUM_HASHES = 64
+BANDS = 16
+ROWS = NUM_HASHES // BANDS
+
+# Mersenne prime for the (a * x + b) mod p hash family
+PRIME = (1 << 61) - 1
+MAX_HASH = (1 << 32) - 1
+
+# Fixed seed so signatures stay comparable across processes and deploys
+_random = random.Random(20240601)
+HASH_PARAMS = [(_random.randrange(1, PRIME), _random.randrange(0, PRIME)) for _ in range(NUM_HASHES)]
+
+SIGNATURE_FORMAT = f'<{NUM_HASHES}I'
+
+# Keys looked up per query
+LOOKUP_CHUNK_SIZE = 500
+
+# A shared band only makes two descriptions candidates; they count as
+# similar when their signatures agree on at least this share of positions
+SIMILARITY_THRESHOLD = 0.5
+
+def signature(text):
+    """MinHash signature of a text's term set, or None when it has no terms"""
+    terms = {zlib.crc32(term.encode()) for term in tokenize(text)}
+    if not terms:
+        return None
+    return [min((a * term + b) % PRIME for term in terms) & MAX_HASH for a, b in HASH_PARAMS]
+
+def pack(values):
+    """Pack a signature into the fixed-size bytes stored on Item"""
+    return struct.pack(SIGNATURE_FORMAT, *values) if values else b''
+
+def unpack(data):
+    """Unpack stored signature bytes, or None for an empty column"""
+    data = bytes(data or b'')
+    return list(struct.unpack(SIGNATURE_FORMAT, data)) if len(data) == struct.calcsize(SIGNATURE_FORMAT) else None
+
+def estimated_similarity(first, second):
+    """Fraction of agreeing positions: an estimate of Jaccard similarity"""
+    return sum(1 for a, b in zip(first, second) if a == b) / NUM_HASHES
+
+def similar_signatures(first, second, threshold=SIMILARITY_THRESHOLD):
+    """True when both signatures exist and their estimated similarity reaches threshold"""
+    return bool(first) and bool(second) and estimated_similarity(first, second) >= threshold
+
+def band_keys(values):
+    """One short key per band of a signature"""
+    keys = []
+    for band in range(BANDS):
+        rows = struct.pack(f'<{ROWS}I', *values[band * ROWS:(band + 1) * ROWS])
+        keys.append(f'{band}:{hashlib.blake2b(rows, digest_size=8).hexdigest()}')
+    return keys
+
+def apply_minhash(item):
+    """Fill an item's signature column from its description"""
+    item.minhash = pack(signature(item.description))
+
+def index_item_bands(item):
+    """Replace an item's band rows; only approved items with a signature are kept"""
+    MinHashBand.objects.filter(item_id=item.pk).delete()
+    values = unpack(item.minhash)
+    if item.status == 'approved' and values:
+        MinHashBand.objects.bulk_create([MinHashBand(item_id=item.pk, key=key) for key in band_keys(values)])
+
+def rebuild_minhash_index(chunk_size=500):
+    """Recompute every signature and re-band every approved item"""
+    MinHashBand.objects.all().delete()
+    banded = 0
+    for chunk in iter_chunks(Item.objects.all(), chunk_size):
+        bands = []
+        for item in chunk:
+            apply_minhash(item)
+            values = unpack(item.minhash)
+            if item.status == 'approved' and values:
+                bands.extend(MinHashBand(item_id=item.pk, key=key) for key in band_keys(values))
+                banded += 1
+        # bulk_update skips save signals, so nothing else is re-indexed
+        Item.objects.bulk_update(chunk, ['minhash'])
+        MinHashBand.objects.bulk_create(bands)
+    bump_item_version()
+    return banded
+
+def band_rows(item_ids=None):
+    """
+    Return {key: [item_id, ...]} for the band index.
+
+    With item_ids only the buckets those items fall into are read: first
+    their own keys, then every item sharing one of those keys.
+    """
+    rows = MinHashBand.objects.values_list('key', 'item_id')
+    if item_ids is None:
+        buckets = defaultdict(list)
+        for key, item_id in rows:
+            buckets[key].append(item_id)
+        return buckets
+
+    item_ids = sorted(item_ids)
+    keys = set()
+    for start in range(0, len(item_ids), LOOKUP_CHUNK_SIZE):
+        keys.update(rows.filter(item_id__in=item_ids[start:start + LOOKUP_CHUNK_SIZE]).values_list('key', flat=True))
+    keys = sorted(keys)
+    buckets = defaultdict(list)
+    for start in range(0, len(keys), LOOKUP_CHUNK_SIZE):
+        for key, item_id in rows.filter(key__in=keys[start:start + LOOKUP_CHUNK_SIZE]):
+            buckets[key].append(item_id)
+    return buckets
+
+def similar_description_ids(item):
+    """
+    Ids of approved items whose description shares an LSH band with item's.
+
+    These are candidates only: short descriptions collide often, so confirm
+    each one with similar_signatures before treating it as similar.
+    """
+    values = unpack(item.minhash)
+    if not values:
+        return set()
+    item_ids = set(MinHashBand.objects.filter(key__in=band_keys(values)).values_list('item_id', flat=True))
+    item_ids.discard(item.pk)
+    return item_ids
+
+def lsh_candidate_pairs(lost, found, changed_ids=None, buckets=None, pool_sizes=None):
+    """
+    Return (pairs, report) like blocking.candidate_pairs, from LSH buckets.
+
+    A pair is a candidate when both items share a category and at least one
+    description band. With changed_ids only pairs touching those items are
+    produced, and only their buckets are read, unless the caller already
+    has them from band_rows(changed_ids).
+    """
+    if buckets is None:
+        buckets = band_rows(changed_ids)
+    lost_positions = {item.id: position for position, item in enumerate(lost)}
+    found_positions = {item.id: position for position, item in enumerate(found)}
+    pairs = set()
+    for item_ids in buckets.values():
+        bucket_lost = [lost_positions[item_id] for item_id in item_ids if item_id in lost_positions]
+        bucket_found = [found_positions[item_id] for item_id in item_ids if item_id in found_positions]
+        for lost_position in bucket_lost:
+            for found_position in bucket_found:
+                if lost[lost_position].category != found[found_position].category:
+                    continue
+                if changed_ids is None or lost[lost_position].id in changed_ids or found[found_position].id in changed_ids:
+                    pairs.add((lost_position, found_position))
+
+    return sorted(pairs), blocking_report(lost, found, changed_ids, len(pairs), pool_sizes)
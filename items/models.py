@@ -34,6 +34,16 @@ class Item(models.Model):
     category = models.CharField(max_length=20, choices=ITEM_CATEGORIES)
     description = models.TextField()
     location = models.CharField(max_length=200)
+    # Parsed from location on save (see items.locations)
+    location_building = models.CharField(max_length=100, blank=True, default='', db_index=True)
+    location_floor = models.SmallIntegerField(blank=True, null=True, db_index=True)
+    location_area = models.CharField(max_length=100, blank=True, default='')
+    # Optional map coordinates from the select_location picker
+    latitude = models.FloatField(blank=True, null=True)
+    longitude = models.FloatField(blank=True, null=True)
+    geohash = models.CharField(max_length=12, blank=True, default='', db_index=True)
+    # Packed MinHash signature of the description (see items.minhash)
+    minhash = models.BinaryField(blank=True, default=b'', editable=False)
     date = models.DateField()
     image = models.ImageField(upload_to='items/', blank=True, null=True)
     item_type = models.CharField(max_length=5, choices=ITEM_TYPE)
@@ -41,7 +51,7 @@ class Item(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='items')
     contact_info = models.CharField(max_length=100)
     created_at = models.DateTimeField(auto_now_add=True)
-    updated_at = models.DateTimeField(auto_now=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
 
     def __str__(self):
         return f"{self.name} ({self.get_item_type_display()})"
@@ -62,16 +72,152 @@ class Claim(models.Model):
     class Meta:
         ordering = ['-claim_date']
 
+# Scorers that produce ItemMatch rows, both on a 0-100 scale
+MATCH_SCORERS = [
+    ('heuristic', 'Report-time heuristic'),
+    ('tfidf', 'Batch TF-IDF'),
+]
+
 class ItemMatch(models.Model):
     """Model for potential matches between lost and found items"""
     lost_item = models.ForeignKey(Item, on_delete=models.CASCADE, related_name='lost_matches')
     found_item = models.ForeignKey(Item, on_delete=models.CASCADE, related_name='found_matches')
     match_score = models.FloatField()
+    scorer = models.CharField(max_length=10, choices=MATCH_SCORERS, default='tfidf')  # Which scorer produced match_score
     created_at = models.DateTimeField(auto_now_add=True)
     notified = models.BooleanField(default=False)  # Track if users were notified
+    active = models.BooleanField(default=True, db_index=True)  # False once either item leaves approved or the pair stops matching
 
     def __str__(self):
         return f"Match between {self.lost_item.name} and {self.found_item.name}"
 
     class Meta:
         ordering = ['-match_score']
+        unique_together = ('lost_item', 'found_item')
+
+# Background job states
+JOB_STATUS = [
+    ('pending', 'Pending'),
+    ('running', 'Running'),
+    ('done', 'Done'),
+    ('failed', 'Failed'),
+]
+
+class Job(models.Model):
+    """Unit of background work picked up by the run_jobs worker"""
+    kind = models.CharField(max_length=50, db_index=True)
+    payload = models.TextField(default='{}')  # JSON arguments for the handler
+    status = models.CharField(max_length=10, choices=JOB_STATUS, default='pending', db_index=True)
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=5)
+    run_after = models.DateTimeField(default=timezone.now, db_index=True)
+    locked_at = models.DateTimeField(blank=True, null=True)
+    last_error = models.TextField(blank=True, default='')
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.kind} job #{self.pk} ({self.status})"
+
+    class Meta:
+        ordering = ['run_after', 'id']
+
+class MatchingState(models.Model):
+    """High-water mark of the automatic matching runs (single row)"""
+    matched_until = models.DateTimeField(blank=True, null=True)  # Items updated after this still need scoring
+    frequencies_ready = models.BooleanField(default=False)  # MatchTrigram counts cover every approved item
+
+    def __str__(self):
+        return f"Matching state (until {self.matched_until})"
+
+class MatchTrigram(models.Model):
+    """Number of approved items whose text field contains a character trigram"""
+    field = models.CharField(max_length=20)
+    gram = models.CharField(max_length=3)
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        unique_together = ('field', 'gram')
+
+    def __str__(self):
+        return f"{self.field}:{self.gram} ({self.count})"
+
+class SearchDocument(models.Model):
+    """Per-item bookkeeping for the search index"""
+    item = models.OneToOneField(Item, on_delete=models.CASCADE, related_name='search_document')
+    length = models.PositiveIntegerField(default=0)  # Indexed tokens across all fields
+
+    def __str__(self):
+        return f"Search document for {self.item_id}"
+
+class SearchPosting(models.Model):
+    """Inverted index entry: one term in one field of one item"""
+    term = models.CharField(max_length=50, db_index=True)
+    item = models.ForeignKey(Item, on_delete=models.CASCADE, related_name='search_postings')
+    field = models.CharField(max_length=20)
+    frequency = models.PositiveIntegerField(default=1)
+    document_length = models.PositiveIntegerField(default=0)  # Copied from SearchDocument to avoid a join
+    positions = models.TextField(blank=True, default='')  # Comma-separated token positions in the field
+    offsets = models.TextField(blank=True, default='')  # Comma-separated character offsets of those tokens
+
+    def __str__(self):
+        return f"{self.term} -> {self.item_id} ({self.field})"
+
+class SearchIndexState(models.Model):
+    """Collection-wide statistics needed for BM25 ranking (single row)"""
+    document_count = models.PositiveIntegerField(default=0)
+    total_length = models.PositiveIntegerField(default=0)
+    item_version = models.PositiveIntegerField(default=0)  # Bumped on every Item write
+
+    def __str__(self):
+        return f"Search index ({self.document_count} documents)"
+
+class SearchTerm(models.Model):
+    """Vocabulary of terms seen in item names and descriptions"""
+    text = models.CharField(max_length=50, unique=True)
+
+    def __str__(self):
+        return self.text
+
+class SearchTrigram(models.Model):
+    """Character trigram of a vocabulary term, used for typo-tolerant lookups"""
+    gram = models.CharField(max_length=3, db_index=True)
+    term = models.CharField(max_length=50)
+    gram_count = models.PositiveSmallIntegerField()  # Trigrams in the whole term
+
+    class Meta:
+        unique_together = ('gram', 'term')
+
+    def __str__(self):
+        return f"{self.gram} -> {self.term}"
+
+class MapCluster(models.Model):
+    """Pre-aggregated count of approved items in one geohash cell"""
+    precision = models.PositiveSmallIntegerField()
+    cell = models.CharField(max_length=12)
+    item_type = models.CharField(max_length=5, choices=ITEM_TYPE)
+    count = models.IntegerField(default=0)
+    latitude_sum = models.FloatField(default=0)
+    longitude_sum = models.FloatField(default=0)
+
+    def __str__(self):
+        return f"{self.cell} ({self.item_type}): {self.count}"
+
+    class Meta:
+        unique_together = ('precision', 'cell', 'item_type')
+
+class PhoneticKey(models.Model):
+    """Metaphone key of a word, word pair or whole name of an approved item"""
+    key = models.CharField(max_length=40, db_index=True)
+    item = models.ForeignKey(Item, on_delete=models.CASCADE, related_name='phonetic_keys')
+    full_name = models.BooleanField(default=False)  # Key of the whole name run together
+
+    def __str__(self):
+        return f"{self.key} -> {self.item_id}"
+
+class MinHashBand(models.Model):
+    """One LSH band of an approved item's description signature"""
+    key = models.CharField(max_length=24, db_index=True)  # "<band>:<hash of the band's rows>"
+    item = models.ForeignKey(Item, on_delete=models.CASCADE, related_name='minhash_bands')
+
+    def __str__(self):
+        return f"{self.key} -> {self.item_id}"
@@ -0,0 +1,57 @@
+"""Email notifications about potential matches"""
+
+from django.conf import settings
+from django.core.mail import send_mail
+
+def send_match_email(user, user_item, matched_item, item_type, score, fail_silently=True):
+    """Send email notification about a potential match"""
+    subject = f"🎯 Potential Match Found for Your {item_type.title()} Item!"
+
+    message = f"""
+Hi {user.username},
+
+Great news! We found a potential match for your {item_type} item:
+
+YOUR ITEM:
+• Name: {user_item.name}
+• Category: {user_item.get_category_display()}
+• Location: {user_item.location}
+• Date: {user_item.date}
+
+POTENTIAL MATCH:
+• Name: {matched_item.name}
+• Category: {matched_item.get_category_display()}
+• Location: {matched_item.location}
+• Date: {matched_item.date}
+• Match Score: {score}%
+
+NEXT STEPS:
+1. Review the match details: http://127.0.0.1:8000/items/{matched_item.id}/
+2. If this looks like your item, click "Claim This Item"
+3. The owner will be notified and can approve your claim
+
+Don't wait - someone else might claim it first!
+
+Best regards,
+Lost and Found Team
+    """
+
+    try:
+        send_mail(
+            subject,
+            message,
+            settings.DEFAULT_FROM_EMAIL,
+            [user.email],
+            fail_silently=fail_silently,
+        )
+    except:
+        # Email sending failed, but continue processing unless asked to fail
+        if not fail_silently:
+            raise
+
+def notify_match(match, fail_silently=True):
+    """Email both owners about a match and mark it as notified"""
+    send_match_email(match.lost_item.user, match.lost_item, match.found_item, 'lost', match.match_score, fail_silently)
+    send_match_email(match.found_item.user, match.found_item, match.lost_item, 'found', match.match_score, fail_silently)
+    match.notified = True
+    match.save(update_fields=['notified'])
@@ -0,0 +1,135 @@
+"""
+Cursor-based pagination for the browse page.
+
+Date-ordered listings are paginated on the ``(created_at, id)`` key, so a
+page is fetched with a range filter instead of an OFFSET and deep pages
+cost the same as the first one. Relevance-ranked listings already hold
+their ordered ids in memory and only load the rows of the requested page.
+Cursors are opaque URL-safe tokens.
+"""
+
+import base64
+import json
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+
+DEFAULT_PER_PAGE = 10
+
+# Collections at least this large get a cached, possibly stale, count
+ESTIMATED_COUNT_THRESHOLD = getattr(settings, 'ITEMS_ESTIMATED_COUNT_THRESHOLD', 10000)
+ESTIMATED_COUNT_TIMEOUT = getattr(settings, 'ITEMS_ESTIMATED_COUNT_TIMEOUT', 300)
+
+class KeysetPage:
+    """One page of results plus the cursors needed to move around it"""
+
+    def __init__(self, object_list, next_cursor=None, previous_cursor=None):
+        self.object_list = list(object_list)
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+def encode_cursor(data):
+    """Pack cursor data into an opaque URL-safe token"""
+    raw = json.dumps(data, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+def decode_cursor(token):
+    """Unpack a cursor token, returning None for anything malformed"""
+    if not token:
+        return None
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        data = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (ValueError, TypeError):
+        return None
+    return data if isinstance(data, dict) else None
+
+def item_key(item):
+    """Cursor data identifying an item's position in date order"""
+    return {'c': item.created_at.isoformat(), 'i': item.id}
+
+def paginate_keyset(queryset, cursor=None, per_page=DEFAULT_PER_PAGE):
+    """Return a KeysetPage of a queryset ordered newest first"""
+    data = decode_cursor(cursor) or {}
+    created_at = parse_datetime(data.get('c', '')) if isinstance(data.get('c'), str) else None
+    item_id = data.get('i')
+    backwards = data.get('d') == 'prev'
+
+    if created_at is None or not isinstance(item_id, int):
+        created_at = item_id = None
+        backwards = False
+
+    if created_at is None:
+        rows = list(queryset.order_by('-created_at', '-id')[:per_page + 1])
+        has_more = len(rows) > per_page
+        rows = rows[:per_page]
+        has_before = False
+    elif backwards:
+        rows = list(queryset.filter(
+            Q(created_at__gt=created_at) | Q(created_at=created_at, id__gt=item_id)
+        ).order_by('created_at', 'id')[:per_page + 1])
+        has_before = len(rows) > per_page
+        rows = list(reversed(rows[:per_page]))
+        has_more = True
+    else:
+        rows = list(queryset.filter(
+            Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=item_id)
+        ).order_by('-created_at', '-id')[:per_page + 1])
+        has_more = len(rows) > per_page
+        rows = rows[:per_page]
+        has_before = True
+
+    next_cursor = encode_cursor(item_key(rows[-1])) if rows and has_more else None
+    previous_cursor = encode_cursor(dict(item_key(rows[0]), d='prev')) if rows and has_before else None
+    return KeysetPage(rows, next_cursor, previous_cursor)
+
+def paginate_ranked(queryset, ranked_ids, cursor=None, per_page=DEFAULT_PER_PAGE):
+    """Return a KeysetPage over an in-memory ranking, loading only that page"""
+    data = decode_cursor(cursor) or {}
+    offset = data.get('o', 0)
+    if not isinstance(offset, int) or offset < 0 or offset >= len(ranked_ids):
+        offset = 0
+
+    page_ids = ranked_ids[offset:offset + per_page]
+    rows = queryset.in_bulk(page_ids)
+    object_list = [rows[item_id] for item_id in page_ids if item_id in rows]
+
+    next_cursor = encode_cursor({'o': offset + per_page}) if offset + per_page < len(ranked_ids) else None
+    previous_cursor = encode_cursor({'o': max(offset - per_page, 0)}) if offset > 0 else None
+    return KeysetPage(object_list, next_cursor, previous_cursor)
+
+def count_items(queryset, cache_key):
+    """
+    Count a queryset, caching the result once the collection is large.
+
+    Returns (count, is_estimate). Small collections are always counted
+    exactly; large ones reuse the cached count until it expires.
+    """
+    cached = cache.get(cache_key)
+    if cached is not None:
+        return cached, True
+
+    count = queryset.count()
+    if count >= ESTIMATED_COUNT_THRESHOLD:
+        cache.set(cache_key, count, ESTIMATED_COUNT_TIMEOUT)
+    return count, False
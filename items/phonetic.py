@@ -0,0 +1,181 @@
+"""
+Phonetic keys for item names.
+
+Each word of an approved item's name is reduced to a simplified Metaphone
+key, so misheard spellings such as "Samsong" / "Samsung" or "Eirpods" /
+"Airpods" share a key. Adjacent words are also keyed joined together, so
+"Jan Sport" meets "Jansport", and the whole name is keyed run together
+for name-to-name comparisons during matching. Metaphone ignores digits,
+so the numbers in a name ("iPhone 13") are appended to the whole-name
+key verbatim and model variants do not sound alike. Keys are stored in an
+indexed PhoneticKey table, which makes candidate generation an equality
+lookup instead of a per-row comparison.
+"""
+
+import re
+
+from .models import Item, PhoneticKey
+from .utils import iter_chunks
+
+WORD_RE = re.compile(r'[a-z]+')
+NUMBER_RE = re.compile(r'\d+')
+
+VOWELS = set('AEIOU')
+FRONT_VOWELS = set('EIY')
+
+MAX_KEY_LENGTH = 12
+
+# Whole-name keys also carry the name's numbers
+MAX_FULL_KEY_LENGTH = 40
+MIN_WORD_LENGTH = 3
+
+def metaphone(word):
+    """Return a simplified Metaphone key for one word"""
+    word = ''.join(char for char in word.upper() if char.isalpha())
+    if not word:
+        return ''
+
+    # Initial letter exceptions
+    if word[:2] in ('KN', 'GN', 'PN', 'AE', 'WR'):
+        word = word[1:]
+    if word[0] == 'X':
+        word = 'S' + word[1:]
+    if word[:2] == 'WH':
+        word = 'W' + word[2:]
+
+    key = []
+    length = len(word)
+    for index, char in enumerate(word):
+        previous = word[index - 1] if index > 0 else ''
+        following = word[index + 1] if index + 1 < length else ''
+        after_next = word[index + 2] if index + 2 < length else ''
+
+        if char == previous and char != 'C':
+            continue
+
+        if char in VOWELS:
+            # Every leading vowel sounds alike for our purposes
+            if index == 0:
+                key.append('A')
+        elif char == 'B':
+            if not (previous == 'M' and index == length - 1):
+                key.append('B')
+        elif char == 'C':
+            if following == 'I' and after_next == 'A' or following == 'H':
+                key.append('K' if previous == 'S' else 'X')
+            elif following in FRONT_VOWELS:
+                if previous != 'S':
+                    key.append('S')
+            else:
+                key.append('K')
+        elif char == 'D':
+            if following == 'G' and after_next in FRONT_VOWELS:
+                key.append('J')
+            else:
+                key.append('T')
+        elif char == 'G':
+            if following == 'H' and index + 2 < length and after_next not in VOWELS:
+                continue
+            if following == 'N' and index + 2 >= length:
+                continue
+            if following in FRONT_VOWELS and previous != 'G':
+                key.append('J')
+            else:
+                key.append('K')
+        elif char == 'H':
+            if following in VOWELS and previous not in 'CGPST':
+                key.append('H')
+        elif char == 'K':
+            if previous != 'C':
+                key.append('K')
+        elif char == 'P':
+            key.append('F' if following == 'H' else 'P')
+        elif char == 'Q':
+            key.append('K')
+        elif char == 'S':
+            if following == 'H' or (following == 'I' and after_next in ('O', 'A')):
+                key.append('X')
+            else:
+                key.append('S')
+        elif char == 'T':
+            if following == 'I' and after_next in ('O', 'A'):
+                key.append('X')
+            elif following == 'H':
+                key.append('0')
+            elif not (following == 'C' and after_next == 'H'):
+                key.append('T')
+        elif char == 'V':
+            key.append('F')
+        elif char in 'WY':
+            if following in VOWELS:
+                key.append(char)
+        elif char == 'X':
+            key.append('KS')
+        elif char == 'Z':
+            key.append('S')
+        else:
+            key.append(char)
+
+    return ''.join(key)[:MAX_KEY_LENGTH]
+
+def name_keys(name):
+    """Phonetic keys for a name: one per word plus one per adjacent word pair"""
+    words = WORD_RE.findall((name or '').lower())
+    keys = set()
+    for word in words:
+        if len(word) >= MIN_WORD_LENGTH:
+            keys.add(metaphone(word))
+    for first, second in zip(words, words[1:]):
+        keys.add(metaphone(first + second))
+    keys.discard('')
+    return keys
+
+def full_name_key(name):
+    """Phonetic key of a whole name with its words run together, then its numbers"""
+    name = (name or '').lower()
+    key = metaphone(''.join(WORD_RE.findall(name)))
+    numbers = NUMBER_RE.findall(name)
+    if key and numbers:
+        key = f"{key}:{'-'.join(numbers)}"
+    return key[:MAX_FULL_KEY_LENGTH]
+
+def item_keys(item):
+    """Unsaved PhoneticKey rows for an item's name"""
+    keys = [PhoneticKey(item_id=item.pk, key=key) for key in name_keys(item.name)]
+    full_key = full_name_key(item.name)
+    if full_key:
+        keys.append(PhoneticKey(item_id=item.pk, key=full_key, full_name=True))
+    return keys
+
+def index_phonetic_keys(item):
+    """Replace an item's stored keys; only approved items are kept"""
+    PhoneticKey.objects.filter(item_id=item.pk).delete()
+    if item.status == 'approved':
+        PhoneticKey.objects.bulk_create(item_keys(item))
+
+def rebuild_phonetic_keys(chunk_size=500):
+    """Re-key every approved item from scratch, one chunk at a time"""
+    PhoneticKey.objects.all().delete()
+    keyed = 0
+    for chunk in iter_chunks(Item.objects.filter(status='approved'), chunk_size):
+        PhoneticKey.objects.bulk_create([key for item in chunk for key in item_keys(item)])
+        keyed += len(chunk)
+    return keyed
+
+def phonetic_item_ids(text, exclude_id=None):
+    """Ids of approved items whose name shares a phonetic key with text"""
+    keys = name_keys(text)
+    if not keys:
+        return set()
+    item_ids = set(PhoneticKey.objects.filter(key__in=keys).values_list('item_id', flat=True))
+    item_ids.discard(exclude_id)
+    return item_ids
+
+def same_sounding_item_ids(item):
+    """Ids of approved items whose whole name sounds like this item's name"""
+    full_key = full_name_key(item.name)
+    if not full_key:
+        return set()
+    item_ids = set(PhoneticKey.objects.filter(key=full_key, full_name=True).values_list('item_id', flat=True))
+    item_ids.discard(item.pk)
+    return item_ids
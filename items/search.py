@@ -0,0 +1,355 @@
+"""
+Full-text search for approved items.
+
+Items are tokenized into an inverted index (SearchPosting rows keyed by term)
+and queries are ranked with BM25, weighting matches in the item name above
+the description and the description above the location. A query only reads
+the postings for its own terms, so its cost does not grow with the number of
+items in the collection.
+
+Postings also record where each term occurs (token positions and character
+offsets), so quoted phrases ("black leather wallet") and proximity queries
+("black wallet"~3) can be checked from the index alone, and snippets can be
+cut around the matches without re-tokenizing the item text.
+"""
+
+import heapq
+import math
+import re
+from collections import Counter, defaultdict, namedtuple
+
+from django.conf import settings
+from django.db.models import F
+
+from .models import Item, SearchDocument, SearchPosting, SearchIndexState
+from .trigrams import register_terms, clear_vocabulary, forget_terms
+from .utils import iter_chunks
+
+TOKEN_RE = re.compile(r'[a-z0-9]+')
+
+STOP_WORDS = frozenset([
+    'a', 'an', 'and', 'are', 'at', 'by', 'for', 'from', 'has', 'have', 'in',
+    'is', 'it', 'its', 'my', 'near', 'of', 'on', 'or', 'the', 'to', 'was',
+    'with',
+])
+
+# Relative importance of a term hit in each indexed field
+FIELD_WEIGHTS = {
+    'name': 3.0,
+    'description': 1.5,
+    'location': 1.0,
+    'category': 1.0,
+    'contact_info': 0.5,
+}
+
+# Fields whose terms feed the typo-tolerant trigram vocabulary
+VOCABULARY_FIELDS = ('name', 'description')
+
+# BM25 tuning constants
+K1 = 1.2
+B = 0.75
+
+MAX_TERM_LENGTH = 50
+
+# A ranked search keeps only this many best matches, so the id lists sent
+# to the database stay bounded however common the query terms are
+MAX_RANKED_RESULTS = getattr(settings, 'ITEMS_SEARCH_MAX_RESULTS', 500)
+
+# A quoted phrase, optionally followed by ~N to allow N positions of slack
+PHRASE_RE = re.compile(r'"([^"]*)"(?:~(\d+))?')
+
+# terms is a list of (relative position, term); slop 0 means an exact phrase
+Phrase = namedtuple('Phrase', ['terms', 'slop'])
+
+def normalize_token(token):
+    """Fold simple plurals so 'keys' and 'key' share a posting list"""
+    if len(token) > 3 and token.endswith('s') and not token.endswith('ss'):
+        return token[:-1]
+    return token
+
+def tokenize(text):
+    """Split text into normalized index terms"""
+    return [term for _, term, _ in tokenize_positions(text)]
+
+def tokenize_positions(text):
+    """
+    Return (position, term, offset) for each index term in text.
+
+    Positions count every token, stop words included, so "bag of keys"
+    keeps the gap between "bag" and "key". Offsets index the lowercased
+    text, which is where the token starts.
+    """
+    terms = []
+    for position, match in enumerate(TOKEN_RE.finditer((text or '').lower())):
+        token = match.group()
+        if token in STOP_WORDS or len(token) > MAX_TERM_LENGTH:
+            continue
+        terms.append((position, normalize_token(token), match.start()))
+    return terms
+
+def parse_query(query):
+    """Split a query into loose terms and quoted phrases"""
+    phrases = []
+    for match in PHRASE_RE.finditer(query or ''):
+        terms = tokenize_positions(match.group(1))
+        if terms:
+            first = terms[0][0]
+            phrases.append(Phrase([(position - first, term) for position, term, _ in terms], int(match.group(2) or 0)))
+    return tokenize(PHRASE_RE.sub(' ', query or '')), phrases
+
+def encode_numbers(numbers):
+    """Pack a list of ints into a posting's comma-separated column"""
+    return ','.join(str(number) for number in numbers)
+
+def decode_numbers(text):
+    """Unpack a comma-separated posting column"""
+    return [int(number) for number in text.split(',')] if text else []
+
+def is_indexable(item):
+    """Only approved items are searchable"""
+    return item.status == 'approved'
+
+def get_index_state():
+    """Return the single row holding collection statistics"""
+    state = SearchIndexState.objects.first()
+    if state is None:
+        state = SearchIndexState.objects.create()
+    return state
+
+def build_postings(item):
+    """Return (postings, length) for an item without touching the database"""
+    field_terms = {field: tokenize_positions(getattr(item, field)) for field in FIELD_WEIGHTS}
+    length = sum(len(terms) for terms in field_terms.values())
+
+    postings = []
+    for field, terms in field_terms.items():
+        occurrences = defaultdict(list)
+        for position, term, offset in terms:
+            occurrences[term].append((position, offset))
+        for term, found in occurrences.items():
+            postings.append(SearchPosting(
+                item_id=item.pk, term=term, field=field,
+                frequency=len(found), document_length=length,
+                positions=encode_numbers(position for position, _ in found),
+                offsets=encode_numbers(offset for _, offset in found),
+            ))
+    return postings, length
+
+def vocabulary_terms(postings):
+    """Terms from postings that belong in the trigram vocabulary"""
+    return {posting.term for posting in postings if posting.field in VOCABULARY_FIELDS}
+
+def prune_terms(terms):
+    """Drop vocabulary terms that no remaining name or description contains"""
+    terms = set(terms)
+    if not terms:
+        return
+    used = set(SearchPosting.objects.filter(term__in=terms, field__in=VOCABULARY_FIELDS).values_list('term', flat=True))
+    forget_terms(terms - used)
+
+def index_item(item):
+    """Add an item to the index, replacing any postings it already had"""
+    stale_terms = unindex_item(item.pk, prune=False)
+    if not is_indexable(item):
+        prune_terms(stale_terms)
+        return
+
+    postings, length = build_postings(item)
+    SearchPosting.objects.bulk_create(postings)
+    terms = vocabulary_terms(postings)
+    register_terms(terms)
+    prune_terms(stale_terms - terms)
+    SearchDocument.objects.create(item_id=item.pk, length=length)
+    SearchIndexState.objects.filter(pk=get_index_state().pk).update(
+        document_count=F('document_count') + 1,
+        total_length=F('total_length') + length,
+    )
+
+def index_items_bulk(items):
+    """Index a batch of items that are known not to be in the index yet"""
+    postings = []
+    documents = []
+    total_length = 0
+    for item in items:
+        if not is_indexable(item):
+            continue
+        item_postings, length = build_postings(item)
+        postings.extend(item_postings)
+        documents.append(SearchDocument(item_id=item.pk, length=length))
+        total_length += length
+
+    if not documents:
+        return 0
+
+    SearchPosting.objects.bulk_create(postings)
+    register_terms(vocabulary_terms(postings))
+    SearchDocument.objects.bulk_create(documents)
+    SearchIndexState.objects.filter(pk=get_index_state().pk).update(
+        document_count=F('document_count') + len(documents),
+        total_length=F('total_length') + total_length,
+    )
+    return len(documents)
+
+def unindex_item(item_id, prune=True):
+    """
+    Drop an item's postings and remove it from the collection statistics.
+
+    Vocabulary terms only this item used are forgotten, so the fuzzy tier
+    never suggests a word that matches nothing. With prune=False they are
+    returned instead, for a caller about to re-index the item.
+    """
+    document = SearchDocument.objects.filter(item_id=item_id).first()
+    if document is None:
+        return set()
+
+    postings = SearchPosting.objects.filter(item_id=item_id)
+    terms = set(postings.filter(field__in=VOCABULARY_FIELDS).values_list('term', flat=True))
+    postings.delete()
+    document.delete()
+    SearchIndexState.objects.filter(pk=get_index_state().pk).update(
+        document_count=F('document_count') - 1,
+        total_length=F('total_length') - document.length,
+    )
+    if not prune:
+        return terms
+    prune_terms(terms)
+    return set()
+
+def bump_item_version():
+    """Invalidate everything derived from the current set of items"""
+    SearchIndexState.objects.filter(pk=get_index_state().pk).update(item_version=F('item_version') + 1)
+
+def current_item_version():
+    """Return the global item version used to validate cached results"""
+    return get_index_state().item_version
+
+def clear_index():
+    """Remove every posting and reset the collection statistics"""
+    SearchPosting.objects.all().delete()
+    SearchDocument.objects.all().delete()
+    state = get_index_state()
+    SearchIndexState.objects.exclude(pk=state.pk).delete()
+    SearchIndexState.objects.filter(pk=state.pk).update(
+        document_count=0,
+        total_length=0,
+        item_version=F('item_version') + 1,
+    )
+    clear_vocabulary()
+
+def rebuild_index(chunk_size=500):
+    """Re-index every approved item from scratch, one chunk at a time"""
+    clear_index()
+    indexed = 0
+    for chunk in iter_chunks(Item.objects.filter(status='approved'), chunk_size):
+        indexed += index_items_bulk(chunk)
+    return indexed
+
+def fetch_postings(terms, fields=None):
+    """Read the posting rows for a set of terms in one query"""
+    terms = list(dict.fromkeys(terms))
+    if not terms:
+        return []
+
+    postings = SearchPosting.objects.filter(term__in=terms)
+    if fields:
+        postings = postings.filter(field__in=fields)
+    return list(postings.values_list('term', 'item_id', 'field', 'frequency', 'document_length'))
+
+def rank_postings(rows, terms=None, fields=None):
+    """
+    Score already-fetched posting rows with BM25.
+
+    ``terms`` and ``fields`` restrict which rows count, so several rankings
+    can be computed from a single fetch. Returns {item_id: score}.
+    """
+    # Weighted term frequency per (term, item), summed over fields
+    weighted_tf = defaultdict(float)
+    lengths = {}
+    for term, item_id, field, frequency, length in rows:
+        if terms is not None and term not in terms:
+            continue
+        if fields is not None and field not in fields:
+            continue
+        weighted_tf[(term, item_id)] += FIELD_WEIGHTS.get(field, 1.0) * frequency
+        lengths[item_id] = length
+
+    if not weighted_tf:
+        return {}
+
+    state = get_index_state()
+    document_count = max(state.document_count, len(lengths))
+    average_length = (state.total_length / state.document_count) if state.document_count else 1.0
+
+    document_frequency = Counter(term for term, _ in weighted_tf)
+
+    scores = defaultdict(float)
+    for (term, item_id), tf in weighted_tf.items():
+        df = document_frequency[term]
+        idf = math.log(1 + (document_count - df + 0.5) / (df + 0.5))
+        norm = K1 * (1 - B + B * lengths[item_id] / max(average_length, 1.0))
+        scores[item_id] += idf * tf * (K1 + 1) / (tf + norm)
+    return scores
+
+def bm25_scores(terms, fields=None):
+    """Return {item_id: score} for items containing any of the given terms"""
+    return rank_postings(fetch_postings(terms, fields))
+
+def sort_by_score(scores, limit=None):
+    """Order item ids by descending score, newest first on ties; with limit keep only the best"""
+    if limit is not None:
+        return heapq.nsmallest(limit, scores, key=lambda item_id: (-scores[item_id], -item_id))
+    return sorted(scores, key=lambda item_id: (-scores[item_id], -item_id))
+
+def phrase_positions(phrases):
+    """Read {(item_id, field): {term: positions}} for every phrase term in one query"""
+    terms = {term for phrase in phrases for _, term in phrase.terms}
+    positions = defaultdict(dict)
+    rows = SearchPosting.objects.filter(term__in=terms).values_list('item_id', 'field', 'term', 'positions')
+    for item_id, field, term, encoded in rows:
+        positions[(item_id, field)][term] = set(decode_numbers(encoded))
+    return positions
+
+def position_near(positions, target, slop):
+    """True when a position lies within slop of target"""
+    if not slop:
+        return target in positions
+    return any(abs(position - target) <= slop for position in positions)
+
+def phrase_in_field(phrase, term_positions):
+    """True when one field's positions contain the phrase within its slop"""
+    if any(term not in term_positions for _, term in phrase.terms):
+        return False
+    first_offset, first_term = phrase.terms[0]
+    for position in term_positions[first_term]:
+        start = position - first_offset
+        if all(position_near(term_positions[term], start + offset, phrase.slop) for offset, term in phrase.terms):
+            return True
+    return False
+
+def phrase_item_ids(phrases):
+    """Ids of items that contain every phrase, each within a single field"""
+    matched = defaultdict(set)
+    for (item_id, _), term_positions in phrase_positions(phrases).items():
+        for index, phrase in enumerate(phrases):
+            if phrase_in_field(phrase, term_positions):
+                matched[item_id].add(index)
+    return {item_id for item_id, found in matched.items() if len(found) == len(phrases)}
+
+def search_items(query, limit=MAX_RANKED_RESULTS):
+    """
+    Return ids of approved items matching the query, best match first.
+
+    Only the best limit matches are kept, picked with a heap rather than
+    a full sort; limit=None ranks every match.
+    """
+    terms, phrases = parse_query(query)
+    scores = bm25_scores(terms + [term for phrase in phrases for _, term in phrase.terms])
+    if phrases:
+        allowed = phrase_item_ids(phrases)
+        scores = {item_id: score for item_id, score in scores.items() if item_id in allowed}
+    return sort_by_score(scores, limit)
+
+def filter_ranked(queryset, ranked_ids):
+    """Keep the ranked ids that also pass the queryset's filters, in rank order"""
+    allowed = set(queryset.filter(id__in=ranked_ids).values_list('id', flat=True))
+    return [item_id for item_id in ranked_ids if item_id in allowed]
@@ -0,0 +1,84 @@
+"""
+In-process LRU cache of search results.
+
+Entries are keyed on the normalized search form parameters and store the
+ranked item ids together with the fallback tier that produced them. Each
+entry remembers the global item version it was computed at. Any Item write
+bumps that version, so stale entries are treated as misses without an
+explicit purge.
+"""
+
+import threading
+from collections import OrderedDict, namedtuple
+
+from django.conf import settings
+
+DEFAULT_CACHE_SIZE = getattr(settings, 'ITEMS_SEARCH_CACHE_SIZE', 256)
+
+# Form fields that change the result set (pagination cursors do not)
+KEY_FIELDS = (
+    'search', 'category', 'date_from', 'date_to', 'location', 'item_type',
+    'near_lat', 'near_lng', 'radius',
+)
+
+# ranked_ids is None when results are a plain filter over approved items;
+# filters holds the fallback filter when the tier was not a ranking
+SearchResult = namedtuple('SearchResult', ['ranked_ids', 'tier', 'filters', 'facets'])
+SearchResult.__new__.__defaults__ = (None,)
+
+def normalize_params(params):
+    """Build a cache key from search parameters"""
+    key = []
+    for field in KEY_FIELDS:
+        value = params.get(field)
+        if hasattr(value, 'isoformat'):
+            value = value.isoformat()
+        value = ' '.join(str(value or '').lower().split())
+        key.append((field, value))
+    return tuple(key)
+
+class SearchResultCache:
+    """Thread-safe LRU mapping of normalized parameters to SearchResult"""
+
+    def __init__(self, max_size=DEFAULT_CACHE_SIZE):
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, version):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] != version:
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key, version, result):
+        with self._lock:
+            self._entries[key] = (version, result)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'max_size': self.max_size,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups * 100, 1) if lookups else 0,
+            }
+
+search_cache = SearchResultCache()
@@ -0,0 +1,112 @@
+"""Keep derived item data in sync with Item writes"""
+
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from .clusters import update_clusters
+from .geo import apply_geohash
+from .jobs import enqueue
+from .locations import apply_location_fields
+from .match_frequencies import update_frequencies
+from .match_store import retire_matches
+from .minhash import apply_minhash, index_item_bands
+from .models import Item
+from .phonetic import index_phonetic_keys
+from .search import bump_item_version, index_item, unindex_item
+from .suggest import suggest_index
+
+# Previous values needed by post_save handlers to compute deltas
+TRACKED_FIELDS = (
+    'status', 'item_type', 'latitude', 'longitude', 'name', 'description',
+    'location', 'date', 'category',
+)
+
+# Fields that feed the match score; editing any of them re-scores the item
+MATCH_FIELDS = ('name', 'description', 'location', 'date', 'category', 'item_type')
+
+def tracked_state(instance):
+    """Current values of the tracked fields on an in-memory item"""
+    return {field: getattr(instance, field) for field in TRACKED_FIELDS}
+
+def changed(previous, instance, *fields):
+    """True for new items or when any of fields differs from the stored row"""
+    if previous is None:
+        return True
+    return any(previous[field] != getattr(instance, field) for field in fields)
+
+@receiver(pre_save, sender=Item)
+def remember_previous_state(sender, instance, raw=False, **kwargs):
+    """Snapshot the stored row so post_save can tell what changed"""
+    instance._previous_state = None
+    if raw or instance.pk is None:
+        return
+    instance._previous_state = Item.objects.filter(pk=instance.pk).values(*TRACKED_FIELDS).first()
+
+@receiver(pre_save, sender=Item)
+def parse_item_location(sender, instance, raw=False, **kwargs):
+    """Keep the indexed building/floor/area columns in step with location"""
+    if raw:
+        return
+    apply_location_fields(instance)
+
+@receiver(pre_save, sender=Item)
+def set_item_geohash(sender, instance, raw=False, **kwargs):
+    """Keep the indexed geohash in step with the item's coordinates"""
+    if raw:
+        return
+    apply_geohash(instance)
+
+@receiver(pre_save, sender=Item)
+def set_item_minhash(sender, instance, raw=False, **kwargs):
+    """Keep the description's MinHash signature in step with the text"""
+    if raw:
+        return
+    apply_minhash(instance)
+
+@receiver(post_save, sender=Item)
+def update_search_index(sender, instance, raw=False, **kwargs):
+    """Re-index an item after every save, covering status transitions too"""
+    if raw:
+        return
+    # index_item drops the item when it is no longer approved
+    index_item(instance)
+    suggest_index.update_item(instance)
+    previous = getattr(instance, '_previous_state', None)
+    update_clusters(previous, tracked_state(instance))
+    update_frequencies(previous, tracked_state(instance))
+    if changed(previous, instance, 'name', 'status'):
+        index_phonetic_keys(instance)
+    if changed(previous, instance, 'description', 'status'):
+        index_item_bands(instance)
+    update_matches(previous, instance)
+    bump_item_version()
+
+def update_matches(previous, instance):
+    """
+    Retire matches of items leaving approved; queue a re-score after match
+    field edits and when an item (re)enters approved.
+    """
+    # New items are matched by the find_matches job queued when reported
+    if previous is None:
+        return
+    if instance.status != 'approved':
+        if previous['status'] != instance.status:
+            retire_matches(instance.pk)
+    # Re-scoring reactivates the retired matches that still hold
+    elif previous['status'] != 'approved' or changed(previous, instance, *MATCH_FIELDS):
+        enqueue('rescore_matches', item_id=instance.pk)
+
+@receiver(pre_delete, sender=Item)
+def remove_from_search_index(sender, instance, **kwargs):
+    """Drop an item's postings before the row (and its cascade) disappears"""
+    # Runs before deletion so the document length is still available to
+    # correct the collection statistics
+    unindex_item(instance.pk)
+
+@receiver(post_delete, sender=Item)
+def invalidate_search_results(sender, instance, **kwargs):
+    """Deleted items must disappear from cached results, suggestions and the map"""
+    suggest_index.remove_item(instance.pk)
+    update_clusters(tracked_state(instance), None)
+    update_frequencies(tracked_state(instance), None)
+    bump_item_version()
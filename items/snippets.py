@@ -0,0 +1,83 @@
+"""
+Highlighted snippets for search results.
+
+Postings store the character offset of every term occurrence, so a page of
+results needs one postings query to learn which fields matched and where.
+The snippet is then cut straight out of the stored text around those
+offsets, with each matched token wrapped in <mark>, instead of searching
+the text again for every row.
+"""
+
+from collections import defaultdict
+
+from django.utils.html import escape
+from django.utils.safestring import mark_safe
+
+from .models import SearchPosting
+from .search import TOKEN_RE, decode_numbers, parse_query
+
+# Preferred field to show as the snippet when several fields matched
+SNIPPET_FIELDS = ('description', 'name', 'location')
+
+# Characters of context kept before the first highlighted term
+CONTEXT_BEFORE = 40
+SNIPPET_LENGTH = 160
+
+def query_terms(query):
+    """Every index term in a query, loose or inside a phrase"""
+    terms, phrases = parse_query(query)
+    return set(terms) | {term for phrase in phrases for _, term in phrase.terms}
+
+def match_offsets(item_ids, terms):
+    """Return {item_id: {field: [offsets]}} for the given terms in one query"""
+    offsets = defaultdict(lambda: defaultdict(list))
+    if not item_ids or not terms:
+        return offsets
+    rows = SearchPosting.objects.filter(item_id__in=item_ids, term__in=terms).values_list('item_id', 'field', 'offsets')
+    for item_id, field, encoded in rows:
+        offsets[item_id][field].extend(decode_numbers(encoded))
+    return offsets
+
+def make_snippet(text, offsets, length=SNIPPET_LENGTH):
+    """Cut a window of text around the first offset and mark the matches in it"""
+    text = text or ''
+    lowered = text.lower()
+    offsets = sorted(offsets)
+    start = max(0, offsets[0] - CONTEXT_BEFORE)
+    if start:
+        space = text.find(' ', start, offsets[0])
+        start = space + 1 if space != -1 else start
+    end = min(len(text), start + length)
+
+    pieces = ['&hellip;' if start else '']
+    cursor = start
+    for offset in offsets:
+        match = TOKEN_RE.match(lowered, offset)
+        if match is None or offset < cursor or match.end() > end:
+            continue
+        pieces.append(escape(text[cursor:offset]))
+        pieces.append('<mark>%s</mark>' % escape(text[offset:match.end()]))
+        cursor = match.end()
+    pieces.append(escape(text[cursor:end]))
+    if end < len(text):
+        pieces.append('&hellip;')
+    return mark_safe(''.join(pieces))
+
+def attach_snippets(items, query):
+    """
+    Annotate result items with why they matched.
+
+    Sets ``matched_fields`` (field names containing a query term) and
+    ``snippet`` (highlighted HTML, or None) on every item.
+    """
+    items = list(items)
+    offsets = match_offsets([item.pk for item in items], query_terms(query))
+    for item in items:
+        fields = offsets.get(item.pk, {})
+        item.matched_fields = list(fields)
+        item.snippet = None
+        for field in SNIPPET_FIELDS:
+            if fields.get(field):
+                item.snippet = make_snippet(getattr(item, field), fields[field])
+                break
+    return items
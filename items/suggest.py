@@ -0,0 +1,221 @@
+"""
+Typeahead suggestions served from an in-memory prefix index.
+
+Item names, description terms and normalized locations of approved items
+are kept in one sorted array per kind. A prefix lookup binary-searches the
+arrays of the requested kinds and ranks every entry in the prefix range by
+how many items use it. The ranked top entries of one- and two-character
+prefixes, whose ranges are the longest, are cached until an entry under
+them changes.
+
+The index is built on first use and then patched in place by the Item
+signals as items change. Once it is older than ITEMS_SUGGEST_MAX_AGE
+seconds, which bounds staleness from writes made by other processes, it
+is rebuilt in a background thread while requests keep reading the old
+copy. Signal updates made during a rebuild are replayed onto the new copy.
+"""
+
+import bisect
+import heapq
+import threading
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.db import connection
+
+from .models import Item
+from .search import STOP_WORDS, TOKEN_RE
+from .utils import iter_chunks
+
+MAX_AGE = getattr(settings, 'ITEMS_SUGGEST_MAX_AGE', 300)
+
+SUGGESTION_KINDS = ('name', 'term', 'location')
+
+# Which suggestion kinds feed each ItemSearchForm box
+FIELD_KINDS = {
+    'search': ('name', 'term'),
+    'location': ('location',),
+}
+
+# Largest number of suggestions a lookup may ask for
+MAX_LIMIT = 25
+
+# Prefixes up to this long have their ranked entries cached
+CACHED_PREFIX_LENGTH = 2
+
+MIN_TERM_LENGTH = 3
+
+def normalize_phrase(text):
+    """Lowercase and collapse whitespace so equivalent entries share a key"""
+    return ' '.join((text or '').lower().split())
+
+def item_entries(item):
+    """Return the (kind, key) suggestions contributed by one item"""
+    entries = set()
+    name = normalize_phrase(item.name)
+    if name:
+        entries.add(('name', name))
+    location = normalize_phrase(item.location)
+    if location:
+        entries.add(('location', location))
+    for term in TOKEN_RE.findall((item.description or '').lower()):
+        if len(term) >= MIN_TERM_LENGTH and term not in STOP_WORDS:
+            entries.add(('term', term))
+    return entries
+
+class PrefixIndex:
+    """Sorted-array prefix index with reference counts per suggestion"""
+
+    def __init__(self):
+        self._keys = {kind: [] for kind in SUGGESTION_KINDS}  # kind -> sorted keys
+        self._counts = Counter()   # (key, kind) -> number of items using it
+        self._item_entries = {}    # item id -> set of (kind, key)
+        self._top = {}             # (kind, short prefix) -> ranked (key, count) list
+        self._lock = threading.Lock()
+        self._pending = None       # item id -> entries, while a rebuild is loading
+        self.built_at = None
+
+    def __len__(self):
+        return sum(len(keys) for keys in self._keys.values())
+
+    def build(self):
+        """Load every approved item from the database and swap the result in"""
+        with self._lock:
+            if self._pending is None:
+                self._pending = {}
+        try:
+            counts = Counter()
+            item_entries_map = {}
+            queryset = Item.objects.filter(status='approved').only('id', 'name', 'description', 'location')
+            for chunk in iter_chunks(queryset):
+                for item in chunk:
+                    entries = item_entries(item)
+                    item_entries_map[item.id] = entries
+                    for kind, key in entries:
+                        counts[(key, kind)] += 1
+
+            keys = {kind: [] for kind in SUGGESTION_KINDS}
+            for key, kind in sorted(counts):
+                keys[kind].append(key)
+            with self._lock:
+                self._keys = keys
+                self._counts = counts
+                self._item_entries = item_entries_map
+                self._top = {}
+                # Changes saved while loading may be missing from the snapshot
+                for item_id, entries in self._pending.items():
+                    self._apply(item_id, entries)
+                self.built_at = time.monotonic()
+        finally:
+            with self._lock:
+                self._pending = None
+
+    def is_stale(self):
+        return self.built_at is None or time.monotonic() - self.built_at > MAX_AGE
+
+    def is_rebuilding(self):
+        return self._pending is not None
+
+    def rebuild_in_background(self):
+        """Start a rebuild in a daemon thread unless one is already running"""
+        with self._lock:
+            if self._pending is not None:
+                return False
+            self._pending = {}
+        threading.Thread(target=self._rebuild, name='suggest-index-rebuild', daemon=True).start()
+        return True
+
+    def _rebuild(self):
+        try:
+            self.build()
+        finally:
+            # The thread opened its own database connection
+            connection.close()
+
+    def update_item(self, item):
+        """Replace one item's suggestions, dropping them if it is not approved"""
+        entries = item_entries(item) if item.status == 'approved' else set()
+        self._update(item.pk, entries)
+
+    def remove_item(self, item_id):
+        """Drop one item's suggestions"""
+        self._update(item_id, set())
+
+    def _update(self, item_id, entries):
+        with self._lock:
+            if self._pending is not None:
+                self._pending[item_id] = entries
+            if self.built_at is not None:
+                self._apply(item_id, entries)
+
+    def _apply(self, item_id, entries):
+        old_entries = self._item_entries.pop(item_id, set())
+        for kind, key in old_entries - entries:
+            pair = (key, kind)
+            self._counts[pair] -= 1
+            if self._counts[pair] <= 0:
+                del self._counts[pair]
+                keys = self._keys[kind]
+                index = bisect.bisect_left(keys, key)
+                if index < len(keys) and keys[index] == key:
+                    del keys[index]
+        for kind, key in entries - old_entries:
+            pair = (key, kind)
+            if not self._counts[pair]:
+                bisect.insort(self._keys[kind], key)
+            self._counts[pair] += 1
+        for kind, key in entries ^ old_entries:
+            for length in range(1, CACHED_PREFIX_LENGTH + 1):
+                self._top.pop((kind, key[:length]), None)
+        if entries:
+            self._item_entries[item_id] = entries
+
+    def _ranked(self, kind, prefix, limit):
+        """Top (key, count) entries of one kind starting with prefix, most used first"""
+        cached = len(prefix) <= CACHED_PREFIX_LENGTH
+        if cached and (kind, prefix) in self._top:
+            return self._top[(kind, prefix)][:limit]
+
+        keys = self._keys[kind]
+        start = bisect.bisect_left(keys, prefix)
+        end = bisect.bisect_left(keys, prefix + '\U0010ffff', start)
+        entries = ((key, self._counts[(key, kind)]) for key in keys[start:end])
+        ranked = heapq.nsmallest(
+            MAX_LIMIT if cached else limit, entries,
+            key=lambda entry: (-entry[1], len(entry[0]), entry[0]),
+        )
+        if cached:
+            self._top[(kind, prefix)] = ranked
+        return ranked[:limit]
+
+    def lookup(self, prefix, kinds=SUGGESTION_KINDS, limit=10):
+        """Return the most common suggestions of the given kinds starting with prefix"""
+        prefix = normalize_phrase(prefix)
+        limit = min(limit, MAX_LIMIT)
+        if not prefix or limit <= 0:
+            return []
+
+        matches = []
+        with self._lock:
+            for kind in kinds:
+                if kind in self._keys:
+                    matches.extend((key, kind, count) for key, count in self._ranked(kind, prefix, limit))
+
+        matches.sort(key=lambda match: (-match[2], len(match[0]), match[0]))
+        return [{'text': key, 'kind': kind, 'count': count} for key, kind, count in matches[:limit]]
+
+suggest_index = PrefixIndex()
+
+def get_suggest_index():
+    """
+    Return the process-wide prefix index.
+
+    Only the first use builds it within the request; a stale index is
+    served as is while a background thread rebuilds it.
+    """
+    if suggest_index.built_at is None:
+        suggest_index.build()
+    elif suggest_index.is_stale():
+        suggest_index.rebuild_in_background()
+    return suggest_index
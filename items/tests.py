@@ -1,3 +1,972 @@
-from django.test import TestCase
+import datetime
+import random
+from collections import defaultdict
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Q
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from .cascade import run_cascade, tier_stats
+from .classifier import KeywordAutomaton, classify, keyword_table
+from .geo import bounds, distance_metres, encode, nearby_item_ids
+from .heuristic import HEURISTIC_SCALE, heuristic_matches
+from .jobs import (
+    JOB_HANDLERS, LOCK_TIMEOUT, RETRY_DELAY, claim_next_job, enqueue, queue_stats, run_pending_jobs,
+)
+from .locations import location_filter, parse_location
+from .match_runs import RESCORERS, changed_item_ids, rescore_item, run_matching
+from .match_store import (
+    TopMatches, counted_matches, match_success_counts, retire_matches, upsert_matches,
+)
+from .matching import item_features
+from .minhash import (
+    BANDS, estimated_similarity, lsh_candidate_pairs, pack, rebuild_minhash_index, signature,
+    similar_description_ids, similar_signatures, unpack,
+)
+from .models import (
+    Item, ItemMatch, Job, MatchingState, MinHashBand, SearchDocument, SearchIndexState, SearchPosting,
+)
+from .pagination import count_items, encode_cursor, paginate_keyset, paginate_ranked
+from .phonetic import full_name_key, same_sounding_item_ids
+from .search import Phrase, parse_query, rebuild_index, search_items, sort_by_score, tokenize_positions
+from .snippets import attach_snippets, make_snippet
+from .suggest import MAX_AGE, PrefixIndex, get_suggest_index
+
+def make_item(user, name, description='', location='Library', category='electronics',
+              item_type='lost', status='approved', days=0, **fields):
+    """Create an item dated days after 1 June 2025"""
+    return Item.objects.create(
+        name=name, description=description, location=location, category=category,
+        item_type=item_type, status=status, user=user, contact_info='owner@example.com',
+        date=datetime.date(2025, 6, 1) + datetime.timedelta(days=days), **fields
+    )
+
+class ItemTestCase(TestCase):
+    """Base class with a reporting user"""
+
+    def setUp(self):
+        self.user = User.objects.create_user('reporter', 'reporter@example.com', 'password')
+
+    def item(self, name, description='', **fields):
+        return make_item(self.user, name, description, **fields)
+
+class SearchRankingTests(ItemTestCase):
+    """BM25 ranking over the inverted index"""
+
+    def test_name_hit_outranks_description_hit(self):
+        in_name = self.item('Wallet', 'Brown with coins')
+        in_description = self.item('Pouch', 'Looks like a wallet')
+        self.item('Umbrella', 'Blue and folding')
+        self.assertEqual(search_items('wallet'), [in_name.id, in_description.id])
+
+    def test_more_query_terms_rank_higher(self):
+        one_term = self.item('Wallet', 'Plain')
+        both_terms = self.item('Leather wallet', 'Plain')
+        self.assertEqual(search_items('leather wallet'), [both_terms.id, one_term.id])
+
+    def test_rare_term_outranks_common_term(self):
+        for index in range(3):
+            self.item('Black charger', f'Cable number {index}')
+        rare = self.item('Silver laptop', 'Plain')
+        common = self.item('Black pouch', 'Plain')
+        ranked = search_items('black silver')
+        self.assertEqual(ranked[0], rare.id)
+        self.assertIn(common.id, ranked)
+
+    def test_limit_and_unknown_terms(self):
+        self.item('Wallet', 'First')
+        self.item('Wallet', 'Second')
+        self.assertEqual(len(search_items('wallet', limit=1)), 1)
+        self.assertEqual(search_items('zeppelin'), [])
+
+    def test_capped_ranking_keeps_the_best(self):
+        for index in range(12):
+            self.item('Wallet' if index % 3 else 'Wallet wallet', f'Leather {"wallet " * (index % 4)}')
+        everything = search_items('wallet', limit=None)
+        self.assertEqual(len(everything), 12)
+        for limit in (1, 5, 12, 20):
+            self.assertEqual(search_items('wallet', limit=limit), everything[:limit])
+
+    def test_ties_keep_newest_first_when_capped(self):
+        scores = {item_id: 1.0 for item_id in range(10)}
+        self.assertEqual(sort_by_score(scores, 3), [9, 8, 7])
+        self.assertEqual(sort_by_score(scores), list(range(9, -1, -1)))
+
+    def test_only_approved_items_are_found(self):
+        approved = self.item('Camera', 'Digital')
+        self.item('Camera', 'Digital', status='pending')
+        self.assertEqual(search_items('camera'), [approved.id])
+
+class SearchIndexUpdateTests(ItemTestCase):
+    """The index follows item saves and deletes"""
+
+    def index_state(self):
+        return SearchIndexState.objects.get()
+
+    def test_save_indexes_new_item(self):
+        item = self.item('Keychain', 'Red fob')
+        self.assertEqual(search_items('keychain'), [item.id])
+        self.assertEqual(self.index_state().document_count, 1)
+
+    def test_edit_replaces_postings(self):
+        item = self.item('Keychain', 'Red fob')
+        item.name = 'Lanyard'
+        item.save()
+        self.assertEqual(search_items('keychain'), [])
+        self.assertEqual(search_items('lanyard'), [item.id])
+        self.assertEqual(SearchDocument.objects.filter(item=item).count(), 1)
+
+    def test_leaving_approved_removes_item(self):
+        item = self.item('Keychain', 'Red fob')
+        item.status = 'rejected'
+        item.save()
+        self.assertEqual(search_items('keychain'), [])
+        self.assertEqual(self.index_state().document_count, 0)
+
+        item.status = 'approved'
+        item.save()
+        self.assertEqual(search_items('keychain'), [item.id])
+
+    def test_delete_removes_postings_and_statistics(self):
+        kept = self.item('Keychain', 'Red fob')
+        deleted = self.item('Keychain', 'Blue fob with a long description')
+        deleted.delete()
+        state = self.index_state()
+        self.assertEqual(search_items('keychain'), [kept.id])
+        self.assertFalse(SearchPosting.objects.filter(item_id=deleted.id).exists())
+        self.assertEqual(state.document_count, 1)
+        self.assertEqual(state.total_length, SearchDocument.objects.get(item=kept).length)
+
+    def test_rebuild_matches_incremental_index(self):
+        self.item('Black wallet', 'Leather')
+        self.item('Wallet', 'Black leather', status='pending')
+        self.item('Black pouch', 'Fabric wallet')
+        incremental = search_items('black wallet')
+        state = self.index_state()
+
+        rebuild_index()
+        rebuilt = self.index_state()
+        self.assertEqual(search_items('black wallet'), incremental)
+        self.assertEqual((rebuilt.document_count, rebuilt.total_length),
+                         (state.document_count, state.total_length))
+
+class FallbackCascadeTests(ItemTestCase):
+    """The first non-empty fallback tier answers a zero-result search"""
+
+    def test_related_terms_tier_comes_first(self):
+        item = self.item('Pouch', 'Holds a wallet', category='bags')
+        result = run_cascade({'search': 'wallet', 'category': 'bags'})
+        self.assertEqual((result.tier, result.item_ids), ('terms', [item.id]))
+
+    def test_category_keyword_tier(self):
+        self.item('Charger', 'White', category='electronics')
+        result = run_cascade({'search': 'iphone'})
+        self.assertEqual((result.tier, result.filters), ('category_keyword', {'category': 'electronics'}))
+
+    def test_fuzzy_tier_tolerates_typos(self):
+        item = self.item('Umbrella', 'Folding', category='other')
+        result = run_cascade({'search': 'umbrela'})
+        self.assertEqual((result.tier, result.item_ids), ('fuzzy', [item.id]))
+
+    def test_category_tier_needs_items_in_category(self):
+        self.item('Backpack', 'Green', category='bags')
+        result = run_cascade({'search': 'zzzz', 'category': 'bags'})
+        self.assertEqual((result.tier, result.filters), ('category', {'category': 'bags'}))
+
+    def test_location_tier_when_category_is_empty(self):
+        item = self.item('Charger', 'White', location='Science Library')
+        result = run_cascade({'category': 'bags', 'location': 'library'})
+        self.assertEqual((result.tier, result.item_ids), ('location', [item.id]))
+
+    def test_item_type_tier(self):
+        self.item('Charger', 'White', item_type='found')
+        result = run_cascade({'location': 'stadium', 'item_type': 'found'})
+        self.assertEqual((result.tier, result.filters), ('item_type', {'item_type': 'found'}))
+
+    def test_popular_then_recent(self):
+        self.item('Keys', 'Two keys', category='keys', status='pending')
+        self.assertEqual(run_cascade({'search': 'zzzz'}).tier, 'recent')
+
+        self.item('Keys', 'Two keys', category='keys')
+        result = run_cascade({'item_type': 'found'})
+        self.assertEqual((result.tier, result.filters), ('popular', {'category': 'keys'}))
+
+    def test_fired_tiers_are_counted(self):
+        before = tier_stats().get('recent', 0)
+        run_cascade({})
+        self.assertEqual(tier_stats()['recent'], before + 1)
+
+class KeysetPaginationTests(ItemTestCase):
+    """Cursor pagination over (created_at, id)"""
+
+    def setUp(self):
+        super().setUp()
+        self.items = [self.item(f'Item {index}', 'Plain') for index in range(7)]
+        # Half of them share a timestamp, so the id has to break ties
+        Item.objects.filter(pk__in=[item.pk for item in self.items[2:6]]).update(
+            created_at=self.items[2].created_at
+        )
+        self.ordered = list(Item.objects.order_by('-created_at', '-id').values_list('id', flat=True))
+
+    def walk(self, queryset, per_page):
+        pages = []
+        cursor = None
+        while True:
+            page = paginate_keyset(queryset, cursor, per_page)
+            pages.append(page)
+            if not page.has_next():
+                return pages
+            cursor = page.next_cursor
+
+    def test_forward_walk_visits_every_item_once(self):
+        pages = self.walk(Item.objects.all(), per_page=3)
+        self.assertEqual([item.id for page in pages for item in page], self.ordered)
+        self.assertEqual([len(page) for page in pages], [3, 3, 1])
+        self.assertFalse(pages[0].has_previous())
+        self.assertTrue(pages[-1].has_previous())
+
+    def test_previous_cursor_returns_the_same_page(self):
+        pages = self.walk(Item.objects.all(), per_page=3)
+        back = paginate_keyset(Item.objects.all(), pages[2].previous_cursor, per_page=3)
+        self.assertEqual([item.id for item in back], [item.id for item in pages[1]])
+        first = paginate_keyset(Item.objects.all(), back.previous_cursor, per_page=3)
+        self.assertEqual([item.id for item in first], [item.id for item in pages[0]])
+        self.assertFalse(first.has_previous())
+
+    def test_new_items_do_not_shift_later_pages(self):
+        first = paginate_keyset(Item.objects.all(), per_page=3)
+        self.item('Newest', 'Plain')
+        second = paginate_keyset(Item.objects.all(), first.next_cursor, per_page=3)
+        self.assertEqual([item.id for item in second], self.ordered[3:6])
+
+    def test_malformed_cursor_starts_over(self):
+        for cursor in ('garbage', encode_cursor(['list']), encode_cursor({'c': 'x', 'i': 'y'})):
+            page = paginate_keyset(Item.objects.all(), cursor, per_page=3)
+            self.assertEqual([item.id for item in page], self.ordered[:3])
+
+    def test_ranked_pages_follow_the_ranking(self):
+        ranked = [item.id for item in self.items][::2]
+        first = paginate_ranked(Item.objects.all(), ranked, per_page=2)
+        second = paginate_ranked(Item.objects.all(), ranked, first.next_cursor, per_page=2)
+        self.assertEqual([item.id for item in first], ranked[:2])
+        self.assertEqual([item.id for item in second], ranked[2:])
+        self.assertFalse(second.has_next())
+
+    def test_large_counts_are_cached(self):
+        cache.clear()
+        with mock.patch('items.pagination.ESTIMATED_COUNT_THRESHOLD', 5):
+            self.assertEqual(count_items(Item.objects.all(), 'test:count'), (7, False))
+            self.item('Extra', 'Plain')
+            self.assertEqual(count_items(Item.objects.all(), 'test:count'), (7, True))
+        cache.clear()
+
+class GeohashRadiusTests(ItemTestCase):
+    """Radius queries through the geohash grid"""
+
+    def located(self, latitude, longitude):
+        return self.item('Charger', 'White', latitude=latitude, longitude=longitude)
+
+    def test_encode_known_geohash(self):
+        self.assertEqual(encode(57.64911, 10.40744), 'u4pruydqq')
+        south, west, north, east = bounds('u4pruydqq')
+        self.assertTrue(south <= 57.64911 <= north and west <= 10.40744 <= east)
+
+    def test_nearest_first_within_radius(self):
+        near = self.located(51.5009, -0.1246)
+        nearer = self.located(51.5008, -0.1245)
+        self.located(51.5200, -0.1246)
+        self.item('Charger', 'No coordinates')
+        self.assertEqual(nearby_item_ids(Item.objects.all(), 51.5007, -0.1246, 500), [nearer.id, near.id])
+
+    def test_matches_brute_force(self):
+        rng = random.Random(7)
+        centre = (48.8566, 2.3522)
+        points = [(centre[0] + rng.uniform(-0.02, 0.02), centre[1] + rng.uniform(-0.03, 0.03)) for _ in range(60)]
+        items = [self.located(latitude, longitude) for latitude, longitude in points]
+        for radius in (100, 400, 1500):
+            expected = sorted(
+                (distance_metres(*centre, item.latitude, item.longitude), item.id)
+                for item in items
+                if distance_metres(*centre, item.latitude, item.longitude) <= radius
+            )
+            self.assertEqual(nearby_item_ids(Item.objects.all(), *centre, radius),
+                             [item_id for _, item_id in expected])
+
+    def test_radius_crosses_the_antimeridian(self):
+        east = self.located(0.0, 179.9995)
+        west = self.located(0.0, -179.9995)
+        self.assertEqual(set(nearby_item_ids(Item.objects.all(), 0.0, 179.9999, 500)), {east.id, west.id})
+
+    def test_coordinates_fill_the_geohash(self):
+        item = self.located(57.64911, 10.40744)
+        self.assertEqual(item.geohash, 'u4pruydqq')
+        item.latitude = None
+        item.save()
+        self.assertEqual(item.geohash, '')
+
+class KeywordClassifierTests(TestCase):
+    """The Aho-Corasick keyword automaton"""
+
+    def test_overlapping_keywords(self):
+        automaton = KeywordAutomaton({word: ('test', 1.0) for word in ('he', 'she', 'his', 'hers')})
+        self.assertEqual({keyword for keyword, _, _ in automaton.matches('ushers')}, {'he', 'she', 'hers'})
+
+    def test_matches_substring_search(self):
+        table = keyword_table()
+        automaton = KeywordAutomaton(table)
+        rng = random.Random(3)
+        words = list(table) + ['lost', 'blue', 'near', 'the', 'xyz']
+        for _ in range(200):
+            text = ''.join(rng.choice(words) + rng.choice(['', ' ', '-']) for _ in range(rng.randint(1, 6)))
+            expected = {(keyword, *table[keyword]) for keyword in table if keyword in text}
+            self.assertEqual(automaton.matches(text.upper()), expected)
+
+    def test_categories_ranked_by_weight(self):
+        self.assertEqual(classify('iPhone charger in my backpack'), [('electronics', 3.0), ('bags', 1.0)])
+        self.assertEqual(classify(''), [])
+        self.assertEqual(classify('umbrella'), [])
+
+    @override_settings(ITEMS_CATEGORY_KEYWORDS={'umbrella': 'other', 'ring': ('jewellery', 2.5)})
+    def test_setting_adds_and_overrides_keywords(self):
+        automaton = KeywordAutomaton(keyword_table())
+        self.assertEqual(automaton.classify('umbrella'), [('other', 1.0)])
+        self.assertEqual(automaton.classify('ring'), [('jewellery', 2.5)])
+
+class MinHashLSHTests(ItemTestCase):
+    """MinHash signatures and the LSH band index"""
+
+    DESCRIPTION = 'Black leather wallet with two bank cards, a student card and a folded receipt'
+
+    def bands(self, item):
+        return set(MinHashBand.objects.filter(item=item).values_list('key', flat=True))
+
+    def test_signature_depends_on_the_term_set(self):
+        self.assertEqual(signature('Blue wallet, blue cards'), signature('cards WALLET blue'))
+        self.assertNotEqual(signature('Blue wallet'), signature('Red wallet'))
+        self.assertIsNone(signature('the and of'))
+        values = signature(self.DESCRIPTION)
+        self.assertEqual(unpack(pack(values)), values)
+        self.assertIsNone(unpack(b''))
+
+    def test_estimate_tracks_jaccard_similarity(self):
+        shared = [f'shared{index}' for index in range(40)]
+        first = ' '.join(shared + [f'first{index}' for index in range(20)])
+        second = ' '.join(shared + [f'second{index}' for index in range(20)])
+        # 40 shared terms out of 80 distinct ones
+        self.assertAlmostEqual(estimated_similarity(signature(first), signature(second)), 0.5, delta=0.2)
+        self.assertEqual(estimated_similarity(signature(first), signature(first)), 1.0)
+
+    def test_near_duplicates_share_a_band(self):
+        lost = self.item('Wallet', self.DESCRIPTION)
+        found = self.item('Wallet', self.DESCRIPTION + ' inside', item_type='found')
+        self.item('Umbrella', 'Large golf umbrella with a wooden handle', item_type='found')
+        self.item('Wallet', self.DESCRIPTION, item_type='found', status='pending')
+        self.assertEqual(similar_description_ids(lost), {found.id})
+
+    def test_band_collision_alone_earns_no_description_point(self):
+        lost = self.item('Backpack', 'Black backpack')
+        found = self.item('Purse', 'Black wallet', item_type='found')
+        # Short unrelated descriptions do share a band...
+        self.assertIn(found.id, similar_description_ids(lost))
+        # ...but only place and date agree
+        self.assertEqual(list(heuristic_matches(lost)), [(lost.id, found.id, 2 * HEURISTIC_SCALE)])
+
+    def test_similar_descriptions_earn_the_point(self):
+        lost = self.item('Backpack', self.DESCRIPTION)
+        found = self.item('Purse', self.DESCRIPTION + ' inside', item_type='found')
+        self.assertTrue(similar_signatures(unpack(lost.minhash), unpack(found.minhash)))
+        self.assertEqual(list(heuristic_matches(lost)), [(lost.id, found.id, 3 * HEURISTIC_SCALE)])
+
+    def test_bands_follow_edits_and_status(self):
+        item = self.item('Wallet', self.DESCRIPTION)
+        original = self.bands(item)
+        self.assertEqual(len(original), BANDS)
+
+        item.description = 'Large golf umbrella with a wooden handle'
+        item.save()
+        self.assertTrue(self.bands(item).isdisjoint(original))
+
+        item.status = 'rejected'
+        item.save()
+        self.assertEqual(self.bands(item), set())
+
+    def test_rebuild_matches_incremental_bands(self):
+        items = [self.item('Wallet', self.DESCRIPTION), self.item('Keys', 'Two brass keys', status='pending')]
+        incremental = {item.id: self.bands(item) for item in items}
+        self.assertEqual(rebuild_minhash_index(), 1)
+        self.assertEqual({item.id: self.bands(item) for item in items}, incremental)
+
+    def test_candidate_pairs_share_a_band_and_category(self):
+        lost = [
+            self.item('Wallet', self.DESCRIPTION, category='accessories'),
+            self.item('Wallet', self.DESCRIPTION, category='documents'),
+            self.item('Umbrella', 'Large golf umbrella with a wooden handle', category='other'),
+        ]
+        found = [
+            self.item('Wallet', self.DESCRIPTION + ' inside', category='accessories', item_type='found'),
+            self.item('Umbrella', 'Golf umbrella with a wooden handle', category='other', item_type='found'),
+        ]
+        lost_features = item_features(Item.objects.filter(pk__in=[item.pk for item in lost]).order_by('id'))
+        found_features = item_features(Item.objects.filter(pk__in=[item.pk for item in found]).order_by('id'))
+
+        pairs, _ = lsh_candidate_pairs(lost_features, found_features)
+        self.assertEqual(pairs, [(0, 0), (2, 1)])
+        pairs, _ = lsh_candidate_pairs(lost_features, found_features, changed_ids={found[1].id})
+        self.assertEqual(pairs, [(2, 1)])
+
+def brute_force_top_k(scores, lost_k, found_k):
+    """Pairs ranking in their lost item's top lost_k or found item's top found_k"""
+    kept = set()
+    for side, k in ((0, lost_k), (1, found_k)):
+        ranked = defaultdict(list)
+        for pair, score in scores.items():
+            ranked[pair[side]].append((score, pair))
+        for entries in ranked.values():
+            kept.update(pair for _, pair in sorted(entries, reverse=True)[:k])
+    return kept
+
+class TopMatchesTests(ItemTestCase):
+    """Only each item's top-k matches are stored"""
+
+    def setUp(self):
+        super().setUp()
+        self.lost = [self.item(f'Lost {index}', 'Plain').id for index in range(4)]
+        self.found = [self.item(f'Found {index}', 'Plain', item_type='found').id for index in range(5)]
+
+    def random_batch(self, rng, scores, size):
+        batch = []
+        for _ in range(size):
+            pair = (rng.choice(self.lost), rng.choice(self.found))
+            score = round(rng.uniform(0, 100), 6)
+            batch.append((*pair, score))
+            scores[pair] = max(score, scores.get(pair, score))
+        return batch
+
+    def stored_pairs(self):
+        return set(ItemMatch.objects.values_list('lost_item_id', 'found_item_id'))
+
+    def test_heaps_keep_each_items_top_k(self):
+        rng = random.Random(11)
+        for lost_k, found_k in ((1, 1), (2, 1), (3, 0), (0, 2)):
+            scores = {}
+            top = TopMatches(lost_k, found_k)
+            self.random_batch(rng, scores, 40)
+            for (lost_id, found_id), score in scores.items():
+                top.add(lost_id, found_id, score)
+            self.assertEqual(set(top.scores()), brute_force_top_k(scores, lost_k, found_k))
+
+    def test_repeated_upserts_store_the_overall_top_k(self):
+        rng = random.Random(5)
+        scores = {}
+        for _ in range(6):
+            upsert_matches(self.random_batch(rng, scores, 8), 'tfidf', top_k=(2, 1))
+            self.assertEqual(self.stored_pairs(), brute_force_top_k(scores, 2, 1))
+        for lost_id, found_id, score in ItemMatch.objects.values_list('lost_item_id', 'found_item_id', 'match_score'):
+            self.assertEqual(score, scores[(lost_id, found_id)])
+
+    def test_pair_offered_twice_takes_one_place(self):
+        lost_id = self.lost[0]
+        upsert_matches([(lost_id, self.found[0], 40), (lost_id, self.found[0], 90),
+                        (lost_id, self.found[1], 60)], 'tfidf', top_k=(2, 0))
+        self.assertEqual(self.stored_pairs(), {(lost_id, self.found[0]), (lost_id, self.found[1])})
+
+    def test_better_match_evicts_the_weakest(self):
+        lost_id = self.lost[0]
+        upsert_matches([(lost_id, self.found[0], 60), (lost_id, self.found[1], 50)], 'tfidf', top_k=(2, 0))
+        created, _ = upsert_matches([(lost_id, self.found[2], 70)], 'tfidf', top_k=(2, 0))
+        self.assertEqual(created, [(lost_id, self.found[2], 70)])
+        self.assertEqual(self.stored_pairs(), {(lost_id, self.found[0]), (lost_id, self.found[2])})
+
+        created, _ = upsert_matches([(lost_id, self.found[3], 10)], 'tfidf', top_k=(2, 0))
+        self.assertEqual(created, [])
+        self.assertEqual(len(self.stored_pairs()), 2)
+
+    def test_no_limit_keeps_everything(self):
+        scored = [(lost_id, found_id, 50) for lost_id in self.lost for found_id in self.found]
+        upsert_matches(scored, 'tfidf', top_k=(0, 0))
+        self.assertEqual(len(self.stored_pairs()), len(scored))
+
+class RescoreTests(ItemTestCase):
+    """Edited items are re-scored by the scorers that matched them"""
+
+    def setUp(self):
+        super().setUp()
+        self.lost = self.item('Black wallet', 'Leather wallet with two cards', location='Library')
+        self.found = self.item('Black wallet', 'Leather wallet with two cards', location='Library', item_type='found')
+        upsert_matches(heuristic_matches(self.lost), 'heuristic')
+        self.match = ItemMatch.objects.get()
+
+    def edit(self, item, **fields):
+        for field, value in fields.items():
+            setattr(item, field, value)
+        item.save()
+        return Job.objects.filter(kind='rescore_matches', status='pending').count()
+
+    def test_lower_score_replaces_the_stored_one(self):
+        self.assertEqual(self.match.match_score, 100)
+        self.edit(self.found, date=self.found.date + datetime.timedelta(days=15))
+        self.assertEqual(rescore_item(self.found), (1, 0))
+        self.match.refresh_from_db()
+        self.assertEqual((self.match.match_score, self.match.scorer, self.match.active), (87.5, 'heuristic', True))
+
+    def test_match_that_no_longer_holds_is_retired(self):
+        self.edit(self.found, name='Umbrella', description='Golf umbrella', location='Stadium')
+        self.assertEqual(rescore_item(self.found), (0, 1))
+        self.match.refresh_from_db()
+        self.assertFalse(self.match.active)
+
+    def test_only_rescored_scorers_retire_matches(self):
+        other = self.item('Umbrella', 'Golf umbrella', location='Stadium', item_type='found')
+        upsert_matches([(self.lost.id, other.id, 80)], 'tfidf', top_k=None)
+        with mock.patch.dict(RESCORERS, {'tfidf': lambda item: []}):
+            self.assertEqual(rescore_item(self.lost), (1, 1))
+        self.assertEqual(set(ItemMatch.objects.filter(active=True).values_list('scorer', flat=True)), {'heuristic'})
+
+    def test_rescore_uses_collection_frequencies(self):
+        ItemMatch.objects.all().delete()
+        run_matching(full=True)
+        stored = dict(ItemMatch.objects.filter(scorer='tfidf').values_list('found_item_id', 'match_score'))
+        self.assertIn(self.found.id, stored)
+        rescore_item(self.lost)
+        rescored = dict(ItemMatch.objects.filter(scorer='tfidf').values_list('found_item_id', 'match_score'))
+        self.assertEqual(rescored, stored)
+
+    def test_only_match_field_edits_queue_a_rescore(self):
+        self.assertEqual(self.edit(self.found, contact_info='finder@example.com'), 0)
+        self.assertEqual(self.edit(self.found, location='Science Library'), 1)
+
+    def test_approval_queues_a_rescore(self):
+        pending = self.item('Black wallet', 'Leather wallet with two cards', item_type='found', status='pending')
+        self.assertEqual(self.edit(pending, status='approved'), 1)
+        self.match.refresh_from_db()
+        self.assertTrue(self.match.active)
+
+    def test_leaving_approved_retires_matches(self):
+        self.edit(self.found, status='claimed')
+        self.match.refresh_from_db()
+        self.assertFalse(self.match.active)
+
+    def test_returning_to_approved_reactivates_matches(self):
+        other = self.item('Umbrella', 'Golf umbrella', location='Stadium', item_type='found')
+        upsert_matches([(self.lost.id, other.id, 80)], 'tfidf', top_k=None)
+        self.assertEqual(self.edit(self.lost, status='rejected'), 0)
+        self.assertFalse(ItemMatch.objects.filter(active=True).exists())
+
+        self.assertEqual(self.edit(self.lost, status='approved'), 1)
+        run_pending_jobs()
+        self.match.refresh_from_db()
+        self.assertEqual((self.match.active, self.match.match_score), (True, 100))
+        # Both scorers were re-run; the TF-IDF pair no longer holds
+        self.assertFalse(ItemMatch.objects.get(found_item=other).active)
+
+class MatchStatisticsTests(ItemTestCase):
+    """Success statistics leave out retired matches"""
+
+    def setUp(self):
+        super().setUp()
+        self.lost = self.item('Black wallet', 'Leather')
+        self.found = [self.item(f'Wallet {index}', 'Leather', item_type='found') for index in range(3)]
+        upsert_matches([(self.lost.id, found.id, 60) for found in self.found], 'tfidf')
+
+    def test_stale_matches_are_not_counted(self):
+        retire_matches(self.lost.id, keep=[(self.lost.id, self.found[0].id)])
+        self.assertEqual(match_success_counts(), (1, 0))
+
+    def test_matches_of_claimed_items_count_as_successes(self):
+        self.found[1].status = 'claimed'
+        self.found[1].save()
+        self.found[2].status = 'rejected'
+        self.found[2].save()
+        self.assertEqual(match_success_counts(), (2, 1))
+        self.assertEqual(counted_matches().values('lost_item').distinct().count(), 1)
+
+class LocationParsingTests(ItemTestCase):
+    """Free-text locations split into building, floor and area"""
+
+    CASES = [
+        ('Main Library - 2nd Floor, Study Area Near Windows', ('main library', 2, 'study area windows')),
+        ('main library 2F', ('main library', 2, '')),
+        ('Floor 3 of Main Library', ('main library', 3, '')),
+        ('Engineering Building Room 204', ('engineering building', None, 'room 204')),
+        ('Engg Bldg rm 12', ('engg building', None, 'room 12')),
+        ('Student Center Cafeteria', ('student center', None, 'cafeteria')),
+        ('Science Centre, ground floor', ('science center', 0, '')),
+        ('Basement of the Gymnasium', ('gym', -1, '')),
+        ('third floor lounge', ('lounge', 3, '')),
+        ('', ('', None, '')),
+    ]
+
+    def test_parse_location(self):
+        for text, expected in self.CASES:
+            with self.subTest(text=text):
+                self.assertEqual(tuple(parse_location(text)), expected)
+
+    def test_filter_uses_building_prefix_and_floor(self):
+        second = self.item('Charger', 'White', location='Main Library - 2nd Floor')
+        third = self.item('Charger', 'White', location='main library, third floor')
+        self.item('Charger', 'White', location='Library of Science Building')
+        items = Item.objects.all()
+        self.assertEqual(set(items.filter(location_filter('Main Library 2F'))), {second})
+        self.assertEqual(set(items.filter(location_filter('main'))), {second, third})
+        self.assertEqual(set(items.filter(location_filter('3rd floor'))), {third})
+
+    def test_unparsed_query_matches_raw_text(self):
+        item = self.item('Charger', 'White', location='Gate (B)')
+        self.assertEqual(location_filter(' - '), Q(location__icontains='-'))
+        self.assertEqual(list(Item.objects.filter(location_filter('gate'))), [item])
+
+class SuggestIndexTests(ItemTestCase):
+    """Prefix suggestions ranked by use, rebuilt off the request path"""
+
+    def build(self):
+        index = PrefixIndex()
+        index.build()
+        return index
+
+    def test_kind_filter_applies_before_ranking(self):
+        # Hundreds of description terms sort ahead of the name
+        self.item('Apple phone', ' '.join(f'aa{number:03d}' for number in range(300)))
+        index = self.build()
+        self.assertEqual(index.lookup('a', kinds=('name',)), [{'text': 'apple phone', 'kind': 'name', 'count': 1}])
+
+    def test_most_used_suggestions_first(self):
+        self.item('Zip bag', ' '.join(f'za{number:03d}' for number in range(300)))
+        for _ in range(3):
+            self.item('Pouch', 'zebra print')
+        index = self.build()
+        self.assertEqual(index.lookup('z', kinds=('term',), limit=1), [{'text': 'zebra', 'kind': 'term', 'count': 3}])
+
+    def test_cached_prefixes_follow_updates(self):
+        item = self.item('Wallet', 'Plain')
+        index = self.build()
+        self.assertEqual([entry['count'] for entry in index.lookup('w', kinds=('name',))], [1])
+        second = self.item('Wallet', 'Plain')
+        index.update_item(second)
+        self.assertEqual([entry['count'] for entry in index.lookup('w', kinds=('name',))], [2])
+        index.remove_item(item.pk)
+        index.remove_item(second.pk)
+        self.assertEqual(index.lookup('w'), [])
+
+    def test_stale_index_is_served_while_rebuilding(self):
+        index = self.build()
+        self.item('Umbrella', 'Plain')
+        index.built_at -= MAX_AGE + 1
+        with mock.patch('items.suggest.suggest_index', index), \
+                mock.patch('items.suggest.threading.Thread') as thread:
+            self.assertIs(get_suggest_index(), index)
+            self.assertEqual(index.lookup('umb'), [])
+            self.assertIs(get_suggest_index(), index)
+        thread.assert_called_once()
+        self.assertTrue(index.is_rebuilding())
+
+        with mock.patch('items.suggest.connection'):
+            thread.call_args.kwargs['target']()
+        self.assertFalse(index.is_rebuilding())
+        self.assertFalse(index.is_stale())
+        self.assertEqual(index.lookup('umb', kinds=('name',))[0]['text'], 'umbrella')
+
+    def test_changes_during_a_rebuild_are_replayed(self):
+        item = self.item('Umbrella', 'Plain')
+        index = PrefixIndex()
+
+        def load_then_reject(queryset):
+            chunk = list(queryset)
+            item.status = 'rejected'
+            item.save()
+            index.update_item(item)
+            yield chunk
+
+        with mock.patch('items.suggest.iter_chunks', load_then_reject):
+            index.build()
+        self.assertEqual(index.lookup('umb'), [])
+
+class PhoneticKeyTests(ItemTestCase):
+    """Whole-name phonetic keys used by the match heuristic"""
+
+    def test_misheard_names_share_a_key(self):
+        self.assertEqual(full_name_key('Samsong Galaxy'), full_name_key('Samsung Galaxy'))
+        self.assertEqual(full_name_key('Eirpods'), full_name_key('Airpods'))
+
+    def test_numbers_are_kept_verbatim(self):
+        self.assertNotEqual(full_name_key('iPhone 13'), full_name_key('iPhone 14'))
+        self.assertEqual(full_name_key('iPhone 13'), full_name_key('Iphone13'))
+        self.assertNotEqual(full_name_key('Galaxy S21'), full_name_key('Galaxy S2 1'))
+
+    def test_model_variants_do_not_sound_alike(self):
+        lost = self.item('iPhone 13', 'Blue case')
+        self.item('iPhone 14', 'Blue case', item_type='found')
+        same = self.item('Iphone 13', 'Blue case', item_type='found')
+        self.assertEqual(same_sounding_item_ids(lost), {same.id})
+
+class UpsertMatchesTests(ItemTestCase):
+    """Match writes are idempotent per (lost, found) pair"""
+
+    def setUp(self):
+        super().setUp()
+        self.lost = self.item('Wallet', 'Plain')
+        self.found = self.item('Wallet', 'Plain', item_type='found')
+        self.pair = (self.lost.id, self.found.id)
+
+    def stored(self):
+        match = ItemMatch.objects.get()
+        return match.match_score, match.scorer, match.active
+
+    def test_repeated_pair_updates_the_row(self):
+        self.assertEqual(upsert_matches([(*self.pair, 40)], 'tfidf'), ([(*self.pair, 40)], 0))
+        self.assertEqual(upsert_matches([(*self.pair, 60), (*self.pair, 50)], 'tfidf'), ([], 1))
+        self.assertEqual(upsert_matches([(*self.pair, 30)], 'tfidf'), ([], 0))
+        self.assertEqual(self.stored(), (60, 'tfidf', True))
+
+    def test_replace_lowers_only_the_same_scorers_score(self):
+        upsert_matches([(*self.pair, 60)], 'tfidf')
+        upsert_matches([(*self.pair, 50)], 'heuristic', replace=True)
+        self.assertEqual(self.stored(), (60, 'tfidf', True))
+        upsert_matches([(*self.pair, 30)], 'tfidf', replace=True)
+        self.assertEqual(self.stored(), (30, 'tfidf', True))
+
+    def test_retired_pair_found_again_is_reactivated(self):
+        upsert_matches([(*self.pair, 60)], 'tfidf')
+        retire_matches(self.lost.id)
+        upsert_matches([(*self.pair, 20)], 'heuristic')
+        self.assertEqual(self.stored(), (20, 'heuristic', True))
+
+    def test_pair_inserted_concurrently_is_updated(self):
+        real_atomic = transaction.atomic
+        raced = []
+
+        def racing_atomic(*args, **kwargs):
+            # Another writer stores the pair between the lookup and the insert
+            if not raced:
+                raced.append(ItemMatch.objects.create(lost_item=self.lost, found_item=self.found, match_score=10))
+            return real_atomic(*args, **kwargs)
+
+        with mock.patch('items.match_store.transaction.atomic', racing_atomic):
+            created, updated = upsert_matches([(*self.pair, 70)], 'tfidf')
+        self.assertEqual((created, updated), ([], 1))
+        self.assertEqual(self.stored(), (70, 'tfidf', True))
+
+class PhraseQueryTests(ItemTestCase):
+    """Quoted phrases and ~N proximity queries"""
+
+    def test_parse_query(self):
+        cases = [
+            ('red "black leather wallet" keys',
+             (['red', 'key'], [Phrase([(0, 'black'), (1, 'leather'), (2, 'wallet')], 0)])),
+            ('"bag of keys"~2', ([], [Phrase([(0, 'bag'), (2, 'key')], 2)])),
+            ('"the" wallet', (['wallet'], [])),
+            ('"black wallet', (['black', 'wallet'], [])),
+        ]
+        for query, expected in cases:
+            with self.subTest(query=query):
+                self.assertEqual(parse_query(query), expected)
+
+    def test_exact_phrase_needs_adjacent_terms_in_order(self):
+        exact = self.item('Wallet', 'Black leather wallet')
+        self.item('Wallet', 'Leather wallet, black')
+        self.assertEqual(search_items('"black leather wallet"'), [exact.id])
+        self.assertEqual(search_items('"leather black"'), [])
+
+    def test_proximity_allows_slack(self):
+        gap = self.item('Wallet', 'Black leather wallet')
+        adjacent = self.item('Purse', 'Small black wallet')
+        self.assertEqual(search_items('"black wallet"'), [adjacent.id])
+        self.assertEqual(set(search_items('"black wallet"~1')), {gap.id, adjacent.id})
+
+    def test_stop_words_keep_their_positions(self):
+        item = self.item('Bag of keys', 'Plain')
+        self.assertEqual(search_items('"bag keys"'), [])
+        self.assertEqual(search_items('"bag of keys"'), [item.id])
+
+    def test_phrase_must_sit_in_one_field(self):
+        self.item('Black', 'wallet')
+        both = self.item('Black wallet', 'Plain')
+        self.assertEqual(search_items('"black wallet"'), [both.id])
+
+    def test_phrase_combines_with_loose_terms(self):
+        self.item('Wallet', 'Black leather wallet', location='Gym')
+        in_library = self.item('Wallet', 'Black leather wallet', location='Library')
+        self.item('Keys', 'Library keys', location='Library')
+        self.assertEqual(search_items('"leather wallet" library')[0], in_library.id)
+        self.assertEqual(len(search_items('"leather wallet" library')), 2)
+
+class SnippetTests(ItemTestCase):
+    """Highlights cut at the offsets stored in the postings"""
+
+    def test_marks_tokens_at_offsets(self):
+        text = 'Black <leather> wallet & keys'
+        offsets = [offset for _, term, offset in tokenize_positions(text) if term in ('leather', 'key')]
+        self.assertEqual(make_snippet(text, offsets),
+                         'Black &lt;<mark>leather</mark>&gt; wallet &amp; <mark>keys</mark>')
+
+    def test_long_text_is_windowed(self):
+        text = 'Plain words ' * 10 + 'a silver watch with a cracked strap ' + 'more words ' * 20
+        snippet = make_snippet(text, [text.index('silver')], length=60)
+        self.assertTrue(snippet.startswith('&hellip;'))
+        self.assertTrue(snippet.endswith('&hellip;'))
+        self.assertIn('<mark>silver</mark>', snippet)
+        self.assertLessEqual(len(snippet.replace('<mark>', '').replace('</mark>', '')), 60 + 2 * len('&hellip;'))
+
+    def test_attach_snippets_from_stored_offsets(self):
+        described = self.item('Bag', 'Contains two keys and a card')
+        named = self.item('Keys on a ring', 'Plain')
+        items = attach_snippets(Item.objects.filter(pk__in=[described.pk, named.pk]).order_by('id'), 'key')
+        self.assertEqual([item.matched_fields for item in items], [['description'], ['name']])
+        self.assertEqual(items[0].snippet, 'Contains two <mark>keys</mark> and a card')
+        self.assertEqual(items[1].snippet, '<mark>Keys</mark> on a ring')
+
+    def test_offsets_past_the_window_are_skipped(self):
+        self.assertEqual(make_snippet('Black wallet', [0, 40]), '<mark>Black</mark> wallet')
+
+class IncrementalMatchingTests(ItemTestCase):
+    """Runs after the first only score items changed since the watermark"""
+
+    def report(self, name, description, location, item_type, days=0, category='accessories'):
+        return self.item(name, description, location=location, item_type=item_type, days=days, category=category)
+
+    def seed(self):
+        self.report('Black leather wallet', 'Black leather wallet with two cards', 'Main Library', 'lost')
+        self.report('Black lether wallet', 'Leather wallet, black, two cards inside', 'Main Library', 'found', days=1)
+        self.report('Silver watch', 'Silver watch with a metal strap', 'Gym', 'lost', days=3)
+
+    def add_more(self):
+        self.report('Silver wrist watch', 'Metal strap silver watch', 'Gym entrance', 'found', days=4)
+        self.report('Brown wallet', 'Brown leather wallet with cards', 'Main Library', 'found', days=2)
+        self.report('Red umbrella', 'Folding red umbrella', 'Stadium', 'lost', category='other')
+
+    def tfidf_matches(self):
+        return {
+            (lost_id, found_id): round(score, 6)
+            for lost_id, found_id, score in ItemMatch.objects.filter(scorer='tfidf').values_list(
+                'lost_item_id', 'found_item_id', 'match_score')
+        }
+
+    def test_incremental_run_matches_a_full_run(self):
+        for lsh in (False, True):
+            with self.subTest(lsh=lsh):
+                Item.objects.all().delete()
+                MatchingState.objects.all().delete()
+                self.seed()
+                first = run_matching(lsh=lsh)
+                self.assertTrue(first.full)
+                self.add_more()
+                second = run_matching(lsh=lsh)
+                self.assertFalse(second.full)
+                self.assertEqual(second.changed_count, 3)
+                incremental = self.tfidf_matches()
+
+                ItemMatch.objects.all().delete()
+                run_matching(full=True, lsh=lsh)
+                self.assertEqual(set(incremental), set(self.tfidf_matches()))
+                self.assertGreater(len(incremental), 1)
+
+    def test_new_pairs_score_as_in_a_full_run(self):
+        self.seed()
+        run_matching()
+        self.add_more()
+        run_matching()
+        incremental = self.tfidf_matches()
+        ItemMatch.objects.all().delete()
+        run_matching(full=True)
+        full = self.tfidf_matches()
+        new_ids = set(Item.objects.filter(name__in=['Silver wrist watch', 'Brown wallet']).values_list('id', flat=True))
+        new_pairs = {pair for pair in full if new_ids & set(pair)}
+        self.assertTrue(new_pairs)
+        self.assertEqual({pair: incremental[pair] for pair in new_pairs}, {pair: full[pair] for pair in new_pairs})
+
+    def test_watermark_advances(self):
+        self.seed()
+        run_matching()
+        first_mark = MatchingState.objects.get().matched_until
+        self.assertIsNotNone(first_mark)
+
+        idle = run_matching()
+        self.assertEqual((idle.changed_count, idle.matches), (0, []))
+        second_mark = MatchingState.objects.get().matched_until
+        self.assertGreater(second_mark, first_mark)
+
+        self.add_more()
+        self.assertEqual(len(changed_item_ids(second_mark)), 3)
+        run_matching()
+        self.assertEqual(changed_item_ids(MatchingState.objects.get().matched_until), set())
+
+class JobQueueTests(TestCase):
+    """Retries with exponential backoff until a job runs out of attempts"""
+
+    def setUp(self):
+        # Ahead of the real clock, which stamps run_after on new jobs
+        self.now = timezone.now() + datetime.timedelta(seconds=1)
+        self.calls = []
+        patcher = mock.patch('items.jobs.timezone.now', lambda: self.now)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        handlers = mock.patch.dict(JOB_HANDLERS, {'flaky': self.flaky})
+        handlers.start()
+        self.addCleanup(handlers.stop)
+
+    def flaky(self, failures):
+        self.calls.append(self.now)
+        if len(self.calls) <= failures:
+            raise RuntimeError(f'failure {len(self.calls)}')
+
+    def advance(self, seconds):
+        self.now += datetime.timedelta(seconds=seconds)
+
+    def test_failed_job_is_retried_with_backoff(self):
+        job = enqueue('flaky', max_attempts=5, failures=2)
+        self.assertEqual(run_pending_jobs(), (0, 1))
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), ('pending', 1))
+        self.assertEqual(job.run_after, self.now + datetime.timedelta(seconds=RETRY_DELAY))
+        self.assertIn('RuntimeError: failure 1', job.last_error)
+
+        # Not due again before the delay has passed
+        self.advance(RETRY_DELAY - 1)
+        self.assertEqual(run_pending_jobs(), (0, 0))
+        self.advance(1)
+        self.assertEqual(run_pending_jobs(), (0, 1))
+        job.refresh_from_db()
+        self.assertEqual(job.run_after, self.now + datetime.timedelta(seconds=2 * RETRY_DELAY))
+
+        self.advance(2 * RETRY_DELAY)
+        self.assertEqual(run_pending_jobs(), (1, 0))
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts, job.locked_at), ('done', 3, None))
+
+    def test_job_fails_after_max_attempts(self):
+        job = enqueue('flaky', max_attempts=3, failures=10)
+        for attempt in range(3):
+            self.assertEqual(run_pending_jobs(), (0, 1))
+            self.advance(RETRY_DELAY * 2 ** attempt)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), ('failed', 3))
+        self.assertIn('failure 3', job.last_error)
+
+        self.advance(RETRY_DELAY * 100)
+        self.assertEqual(run_pending_jobs(), (0, 0))
+        self.assertEqual(len(self.calls), 3)
+        self.assertEqual(queue_stats()['failed'], 1)
+
+    def test_unknown_kind_fails_like_any_error(self):
+        job = enqueue('missing', max_attempts=1)
+        self.assertEqual(run_pending_jobs(), (0, 1))
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'failed')
+        self.assertIn('KeyError', job.last_error)
+
+    def test_abandoned_job_is_claimed_again(self):
+        job = enqueue('flaky', failures=0)
+        self.assertEqual(claim_next_job(), job)
+        self.assertIsNone(claim_next_job())
+        self.advance(LOCK_TIMEOUT + 1)
+        self.assertEqual(run_pending_jobs(), (1, 0))
+
+    def test_pending_duplicate_is_reused(self):
+        first = enqueue('flaky', failures=0)
+        self.assertEqual(enqueue('flaky', failures=0), first)
+        self.assertNotEqual(enqueue('flaky', failures=1), first)
+        run_pending_jobs()
+        self.assertNotEqual(enqueue('flaky', failures=0), first)
@@ -0,0 +1,88 @@
+"""
+Character-trigram index over the search vocabulary.
+
+Every distinct term from item names and descriptions is broken into padded
+trigrams ("walet" -> "  w", " wa", "wal", "ale", "let", "et "). A misspelled
+query word is resolved to known terms with a single lookup on the trigram
+column, ranked by Jaccard similarity of the two trigram sets.
+"""
+
+from collections import defaultdict
+
+from .models import SearchTerm, SearchTrigram
+
+# Minimum trigram similarity for a vocabulary term to count as a match
+SIMILARITY_THRESHOLD = 0.4
+
+# Very short words share too few trigrams to compare meaningfully
+MIN_TERM_LENGTH = 3
+
+def trigrams(term):
+    """Return the set of padded character trigrams for a term"""
+    padded = f"  {term} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+def register_terms(terms):
+    """Add any unseen terms to the vocabulary along with their trigrams"""
+    terms = {term for term in terms if len(term) >= MIN_TERM_LENGTH}
+    if not terms:
+        return
+
+    known = set(SearchTerm.objects.filter(text__in=terms).values_list('text', flat=True))
+    new_terms = sorted(terms - known)
+    if not new_terms:
+        return
+
+    grams = []
+    for term in new_terms:
+        term_grams = trigrams(term)
+        for gram in term_grams:
+            grams.append(SearchTrigram(gram=gram, term=term, gram_count=len(term_grams)))
+
+    # Another save may register the same new term concurrently
+    SearchTerm.objects.bulk_create([SearchTerm(text=term) for term in new_terms], ignore_conflicts=True)
+    SearchTrigram.objects.bulk_create(grams, ignore_conflicts=True)
+
+def forget_terms(terms):
+    """Remove terms and their trigrams from the vocabulary"""
+    terms = sorted(terms)
+    if not terms:
+        return
+    SearchTrigram.objects.filter(term__in=terms).delete()
+    SearchTerm.objects.filter(text__in=terms).delete()
+
+def clear_vocabulary():
+    """Forget every registered term"""
+    SearchTrigram.objects.all().delete()
+    SearchTerm.objects.all().delete()
+
+def similar_terms(words, threshold=SIMILARITY_THRESHOLD, limit=5):
+    """
+    Map each query word to its closest vocabulary terms.
+
+    Returns {word: [(term, similarity), ...]} ordered by similarity. All
+    words are resolved with one query against the trigram index.
+    """
+    word_grams = {word: trigrams(word) for word in words if len(word) >= MIN_TERM_LENGTH}
+    if not word_grams:
+        return {}
+
+    all_grams = set().union(*word_grams.values())
+    term_grams = defaultdict(set)
+    gram_counts = {}
+    rows = SearchTrigram.objects.filter(gram__in=all_grams).values_list('gram', 'term', 'gram_count')
+    for gram, term, gram_count in rows:
+        term_grams[term].add(gram)
+        gram_counts[term] = gram_count
+
+    matches = {}
+    for word, grams in word_grams.items():
+        scored = []
+        for term, shared_grams in term_grams.items():
+            shared = len(grams & shared_grams)
+            similarity = shared / (len(grams) + gram_counts[term] - shared)
+            if similarity >= threshold:
+                scored.append((term, similarity))
+        scored.sort(key=lambda match: (-match[1], match[0]))
+        matches[word] = scored[:limit]
+    return matches
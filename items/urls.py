@@ -4,6 +4,7 @@ from . import views
 urlpatterns = [
     path('', views.home, name='home'),
     path('items/', views.item_list, name='item_list'),
+    path('items/export/', views.export_items, name='export_items'),
     path('items/<int:pk>/', views.item_detail, name='item_detail'),
     path('items/lost/report/', views.report_lost_item, name='report_lost_item'),
     path('items/found/report/', views.report_found_item, name='report_found_item'),
@@ -18,5 +19,8 @@ urlpatterns = [
     path('statistics/', views.statistics, name='statistics'),
     path('success-dashboard/', views.success_dashboard, name='success_dashboard'),
     path('select-location/', views.select_location, name='select_location'),
+    path('select-location/clusters/', views.api_map_clusters, name='api_map_clusters'),
     path('api/items-by-date/', views.api_items_by_date, name='api_items_by_date'),
+    path('api/suggest/', views.api_suggest, name='api_suggest'),
+    path('api/search-stats/', views.api_search_stats, name='api_search_stats'),
 ]
@@ -0,0 +1,39 @@
+"""Small helpers shared by views and management commands"""
+
+def iter_chunks(queryset, chunk_size=500):
+    """
+    Yield lists of objects from a queryset in primary-key order.
+
+    Each chunk is fetched with an ``id > last_id`` filter rather than an
+    OFFSET, so walking a large collection stays cheap on every chunk.
+    """
+    last_id = 0
+    while True:
+        chunk = list(queryset.filter(id__gt=last_id).order_by('id')[:chunk_size])
+        if not chunk:
+            return
+        yield chunk
+        last_id = chunk[-1].id
+
+def iter_value_chunks(queryset, fields, chunk_size=500):
+    """
+    Yield lists of dicts holding only ``fields`` in primary-key order.
+
+    Like iter_chunks, but projects each row so large exports never build
+    model instances or fetch unused columns.
+    """
+    fields = tuple(fields) if 'id' in fields else ('id',) + tuple(fields)
+    last_id = 0
+    while True:
+        chunk = list(queryset.filter(id__gt=last_id).order_by('id').values(*fields)[:chunk_size])
+        if not chunk:
+            return
+        yield chunk
+        last_id = chunk[-1]['id']
+
+def iter_id_chunks(queryset, ids, fields, chunk_size=500):
+    """Yield projected rows for an ordered id list, chunk by chunk, keeping that order"""
+    for start in range(0, len(ids), chunk_size):
+        chunk_ids = ids[start:start + chunk_size]
+        rows = {row['id']: row for row in queryset.filter(id__in=chunk_ids).values('id', *fields)}
+        yield [rows[item_id] for item_id in chunk_ids if item_id in rows]
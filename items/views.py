@@ -2,12 +2,29 @@ from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from django.db.models import Q, Count
-from django.core.paginator import Paginator
 from django.utils import timezone
 from datetime import timedelta
 from .models import Item, Claim, ItemMatch
 from .forms import LostItemForm, FoundItemForm, ClaimForm, ItemSearchForm
+from .search import search_items, filter_ranked, current_item_version
+from .search_cache import search_cache, normalize_params, SearchResult, KEY_FIELDS
+from .pagination import paginate_keyset, paginate_ranked, count_items
+from .cascade import run_cascade, tier_stats
+from .facets import compute_facets
+from .suggest import get_suggest_index, FIELD_KINDS
+from .locations import location_filter
+from .geo import nearby_item_ids
+from .clusters import clusters_in_view
+from .export import export_response, CONTENT_TYPES
+from .jobs import enqueue
+from .heuristic import heuristic_matches
+from .match_store import match_success_counts
+from .match_store import upsert_matches
+from .snippets import attach_snippets
 from django.http import HttpResponseForbidden, JsonResponse
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import condition
+import hashlib
 
 def home(request):
     """Home page view"""
@@ -26,188 +43,154 @@ def item_list(request):
     form = ItemSearchForm(request.GET)
     items = Item.objects.filter(status='approved')
     search_performed = False
-    original_count = items.count()
+    result = None
+    search = ''
+    original_count, count_is_estimate = count_items(items, 'items:approved_count')
 
     # Apply filters if form is valid
     if form.is_valid():
-        search = form.cleaned_data.get('search')
-        category = form.cleaned_data.get('category')
-        date_from = form.cleaned_data.get('date_from')
-        date_to = form.cleaned_data.get('date_to')
-        location = form.cleaned_data.get('location')
-        item_type = form.cleaned_data.get('item_type')
+        params = form.cleaned_data
 
         # Track if any search was performed
-        if any([search, category, date_from, date_to, location, item_type]):
+        if any(params.get(field) for field in KEY_FIELDS):
             search_performed = True
 
-        # Enhanced search logic - more flexible and forgiving
-        if search:
-            # Split search terms for better matching
-            search_terms = search.lower().split()
-            search_query = Q()
+        result = cached_search(params)
+        items = filter_items(items, params)
+        search = params.get('search') or ''
 
-            for term in search_terms:
-                search_query |= (
-                    Q(name__icontains=term) |
-                    Q(description__icontains=term) |
-                    Q(location__icontains=term) |
-                    Q(category__icontains=term) |
-                    Q(contact_info__icontains=term)
-                )
+    # Fall back to related items when the search itself matched nothing
+    if result is not None and result.filters is not None:
+        items = Item.objects.filter(status='approved', **result.filters)
 
-            items = items.filter(search_query)
-
-        if category:
-            items = items.filter(category=category)
-
-        if date_from:
-            items = items.filter(date__gte=date_from)
-
-        if date_to:
-            items = items.filter(date__lte=date_to)
-
-        if location:
-            items = items.filter(location__icontains=location)
-
-        if item_type:
-            items = items.filter(item_type=item_type)
-
-    # Order by relevance if search was performed, otherwise by date
-    items = items.order_by('-created_at')
-
-    # If search was performed but no results found, try to find related items
-    if search_performed and items.count() == 0:
-        items = find_related_items(request.GET, original_count)
+    # Paginate results with opaque cursors rather than page numbers
+    cursor = request.GET.get('cursor')
+    if result is not None and result.ranked_ids is not None:
+        page_obj = paginate_ranked(Item.objects.filter(status='approved'), result.ranked_ids, cursor)
+    else:
+        page_obj = paginate_keyset(items, cursor)
 
-    # Paginate results
-    paginator = Paginator(items, 10)  # Show 10 items per page
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    # Snippets and matched fields for this page only, from one postings query
+    if search:
+        attach_snippets(page_obj.object_list, search)
 
     context = {
         'form': form,
         'page_obj': page_obj,
         'search_performed': search_performed,
+        'fallback_tier': result.tier if result is not None else None,
+        'facets': result.facets if result is not None else None,
         'total_items': original_count,
+        'total_is_estimate': count_is_estimate,
     }
     return render(request, 'items/item_list.html', context)
 
-def find_related_items(search_params, original_count):
-    """Find related items when exact search returns no results"""
-    items = Item.objects.filter(status='approved')
+def filter_items(items, params):
+    """Apply the structured (non full-text) search filters to a queryset"""
+    category = params.get('category')
+    date_from = params.get('date_from')
+    date_to = params.get('date_to')
+    location = params.get('location')
+    item_type = params.get('item_type')
+    near_lat = params.get('near_lat')
+    near_lng = params.get('near_lng')
+    radius = params.get('radius')
 
-    search = search_params.get('search', '')
-    category = search_params.get('category', '')
-    location = search_params.get('location', '')
-    item_type = search_params.get('item_type', '')
-
-    # Try progressively broader searches
-    if search:
-        # First try: partial word matches (more aggressive)
-        search_terms = search.lower().split()
-        related_query = Q()
-
-        for term in search_terms:
-            if len(term) > 2:  # Only search terms longer than 2 characters
-                related_query |= (
-                    Q(name__icontains=term) |
-                    Q(description__icontains=term) |
-                    Q(location__icontains=term)
-                )
-
-        if related_query:
-            related_items = items.filter(related_query)
-            if related_items.exists():
-                return related_items
-
-        # Second try: similar categories based on search terms (enhanced)
-        category_keywords = {
-            'phone': 'electronics', 'mobile': 'electronics', 'laptop': 'electronics',
-            'computer': 'electronics', 'tablet': 'electronics', 'iphone': 'electronics',
-            'samsung': 'electronics', 'apple': 'electronics', 'android': 'electronics',
-            'airpods': 'electronics', 'headphones': 'electronics', 'earbuds': 'electronics',
-            'charger': 'electronics', 'cable': 'electronics', 'mouse': 'electronics',
-            'keyboard': 'electronics', 'speaker': 'electronics', 'camera': 'electronics',
-            'shirt': 'clothing', 'jacket': 'clothing', 'pants': 'clothing',
-            'shoes': 'clothing', 'dress': 'clothing', 'hoodie': 'clothing',
-            'jeans': 'clothing', 'sweater': 'clothing', 'coat': 'clothing',
-            'watch': 'accessories', 'glasses': 'accessories', 'jewelry': 'accessories',
-            'ring': 'accessories', 'necklace': 'accessories', 'bracelet': 'accessories',
-            'wallet': 'accessories', 'sunglasses': 'accessories', 'hat': 'accessories',
-            'purse': 'bags', 'backpack': 'bags', 'bag': 'bags', 'luggage': 'bags',
-            'suitcase': 'bags', 'briefcase': 'bags', 'handbag': 'bags',
-            'key': 'keys', 'keys': 'keys', 'keychain': 'keys', 'fob': 'keys',
-            'id': 'documents', 'passport': 'documents', 'license': 'documents',
-            'card': 'documents', 'certificate': 'documents', 'paper': 'documents'
-        }
-
-        for keyword, cat in category_keywords.items():
-            if keyword in search.lower():
-                cat_items = items.filter(category=cat)
-                if cat_items.exists():
-                    return cat_items
-
-        # Third try: fuzzy matching for common misspellings and variations
-        fuzzy_matches = {
-            'iphone': ['phone', 'apple', 'mobile'],
-            'airpod': ['earbuds', 'headphones', 'apple'],
-            'samsung': ['phone', 'galaxy', 'mobile'],
-            'macbook': ['laptop', 'apple', 'computer'],
-            'ipad': ['tablet', 'apple'],
-            'backpack': ['bag', 'school'],
-            'wallet': ['money', 'cards'],
-            'glasses': ['eyewear', 'prescription'],
-            'keys': ['key', 'car', 'house', 'dorm']
-        }
-
-        for main_term, related_terms in fuzzy_matches.items():
-            if main_term in search.lower():
-                fuzzy_query = Q()
-                for related_term in related_terms:
-                    fuzzy_query |= (
-                        Q(name__icontains=related_term) |
-                        Q(description__icontains=related_term)
-                    )
-                fuzzy_items = items.filter(fuzzy_query)
-                if fuzzy_items.exists():
-                    return fuzzy_items
-
-    # Fourth try: same category if category filter was used
     if category:
-        cat_items = items.filter(category=category)
-        if cat_items.exists():
-            return cat_items
+        items = items.filter(category=category)
+
+    if date_from:
+        items = items.filter(date__gte=date_from)
+
+    if date_to:
+        items = items.filter(date__lte=date_to)
 
-    # Fifth try: same location area (more flexible)
     if location:
-        location_terms = location.lower().split()
-        location_query = Q()
-        for term in location_terms:
-            if len(term) > 2:
-                location_query |= Q(location__icontains=term)
-
-        if location_query:
-            location_items = items.filter(location_query)
-            if location_items.exists():
-                return location_items
-
-    # Sixth try: same item type
+        items = items.filter(location_filter(location))
+
     if item_type:
-        type_items = items.filter(item_type=item_type)
-        if type_items.exists():
-            return type_items
-
-    # Seventh try: return recent items from popular categories
-    popular_categories = ['electronics', 'bags', 'keys', 'accessories', 'clothing', 'documents']
-    for cat in popular_categories:
-        cat_items = items.filter(category=cat)
-        if cat_items.exists():
-            return cat_items
-
-    # If all else fails, return recent items (always return something)
+        items = items.filter(item_type=item_type)
+
+    if radius and near_lat is not None and near_lng is not None:
+        items = items.filter(id__in=nearby_item_ids(items, near_lat, near_lng, radius))
+
     return items
 
+def cached_search(params):
+    """Run a search and its facet counts through the result cache"""
+    key = normalize_params(params)
+    version = current_item_version()
+    result = search_cache.get(key, version)
+    if result is None:
+        result = run_search(params)
+        result = result._replace(facets=compute_facets(result_queryset(result, params)))
+        search_cache.set(key, version, result)
+    return result
+
+def result_queryset(result, params):
+    """Queryset of every approved item in a search result, ranked ones up to the cap"""
+    items = Item.objects.filter(status='approved')
+    if result.ranked_ids is not None:
+        return items.filter(id__in=result.ranked_ids)
+    if result.filters is not None:
+        return items.filter(**result.filters)
+    return filter_items(items, params)
+
+def run_search(params):
+    """Rank and filter approved items, falling back to related items if none match"""
+    items = filter_items(Item.objects.filter(status='approved'), params)
+    search = params.get('search')
+
+    # Ranked full-text search through the inverted index
+    if search:
+        ranked_ids = filter_ranked(items, search_items(search))
+        if ranked_ids:
+            return SearchResult(ranked_ids, None, None)
+    elif items.exists() or not any(params.get(field) for field in KEY_FIELDS):
+        return SearchResult(None, None, None)
+
+    # If search was performed but no results found, try to find related items
+    return find_related_items(params)
+
+@login_required
+def export_items(request):
+    """Stream every item matching the browse filters as CSV or NDJSON"""
+    if not request.user.is_staff:
+        return HttpResponseForbidden("You don't have permission to export items.")
+
+    export_format = request.GET.get('format', 'csv')
+    form = ItemSearchForm(request.GET)
+    if export_format not in CONTENT_TYPES or not form.is_valid():
+        errors = dict(form.errors)
+        if export_format not in CONTENT_TYPES:
+            errors['format'] = [f"Unknown format '{export_format}'."]
+        return JsonResponse({
+            'error': 'Invalid export parameters',
+            'errors': errors,
+            'formats': sorted(CONTENT_TYPES),
+            'fields': list(form.fields),
+        }, status=400)
+
+    params = form.cleaned_data
+    result = cached_search(params)
+    items = Item.objects.filter(status='approved')
+
+    # Fallback tiers only suggest related items; an export holds real matches
+    if result.tier is not None:
+        return export_response(items.none(), export_format)
+    if result.ranked_ids is not None:
+        # The cached ranking is capped; an export streams every match in chunks
+        ranked_ids = search_items(params['search'], limit=None)
+        return export_response(filter_items(items, params), export_format, ranked_ids=ranked_ids)
+    if result.filters is not None:
+        return export_response(items.filter(**result.filters), export_format)
+    return export_response(filter_items(items, params), export_format)
+
+def find_related_items(search_params):
+    """Find related items when exact search returns no results"""
+    cascade = run_cascade(search_params)
+    return SearchResult(cascade.item_ids, cascade.tier, cascade.filters)
+
 def item_detail(request, pk):
     """View for item details"""
     item = get_object_or_404(Item, pk=pk, status='approved')
@@ -222,12 +205,12 @@ def item_detail(request, pk):
         elif item.item_type == 'lost' and Item.objects.filter(user=request.user, item_type='found').exists():
             can_claim = True
 
-    # Get potential matches
+    # Get potential matches that still hold
     matches = None
     if item.item_type == 'lost':
-        matches = ItemMatch.objects.filter(lost_item=item).order_by('-match_score')[:5]
+        matches = ItemMatch.objects.filter(lost_item=item, active=True).order_by('-match_score')[:5]
     else:
-        matches = ItemMatch.objects.filter(found_item=item).order_by('-match_score')[:5]
+        matches = ItemMatch.objects.filter(found_item=item, active=True).order_by('-match_score')[:5]
 
     # Get similar items (same category, different type)
     similar_items_query = Item.objects.filter(
@@ -271,6 +254,14 @@ def item_detail(request, pk):
     }
     return render(request, 'items/item_detail.html', context)
 
+def location_initial(request):
+    """Initial location fields passed back by the map picker"""
+    initial = {}
+    for field, param in (('location', 'location'), ('latitude', 'lat'), ('longitude', 'lng')):
+        if request.GET.get(param):
+            initial[field] = request.GET[param]
+    return initial
+
 @login_required
 def report_lost_item(request):
     """View for reporting a lost item"""
@@ -281,13 +272,14 @@ def report_lost_item(request):
             item.user = request.user
             item.save()
 
-            # Find potential matches
-            find_matches(item)
+            # Find potential matches in the background
+            enqueue('find_matches', item_id=item.pk)
 
             messages.success(request, 'Your lost item has been reported and is pending approval.')
             return redirect('dashboard')
     else:
-        form = LostItemForm()
+        # Location and coordinates may come back from the select_location map
+        form = LostItemForm(initial=location_initial(request))
 
     context = {
         'form': form,
@@ -305,13 +297,14 @@ def report_found_item(request):
             item.user = request.user
             item.save()
 
-            # Find potential matches
-            find_matches(item)
+            # Find potential matches in the background
+            enqueue('find_matches', item_id=item.pk)
 
             messages.success(request, 'Your found item has been reported and is pending approval.')
             return redirect('dashboard')
     else:
-        form = FoundItemForm()
+        # Location and coordinates may come back from the select_location map
+        form = FoundItemForm(initial=location_initial(request))
 
     context = {
         'form': form,
@@ -470,61 +463,7 @@ def mark_returned(request, pk):
 # Helper function to find potential matches
 def find_matches(item):
     """Find potential matches for a lost or found item"""
-    if item.item_type == 'lost':
-        # Find matching found items
-        potential_matches = Item.objects.filter(
-            item_type='found',
-            status='approved',
-            category=item.category
-        )
-
-        for match in potential_matches:
-            # Calculate a simple match score based on text similarity
-            # This is a very basic implementation - in a real app, you'd use more sophisticated matching
-            name_match = 1 if item.name.lower() in match.name.lower() or match.name.lower() in item.name.lower() else 0
-            desc_match = 1 if item.description.lower() in match.description.lower() or match.description.lower() in item.description.lower() else 0
-            location_match = 1 if item.location.lower() in match.location.lower() or match.location.lower() in item.location.lower() else 0
-
-            # Date proximity (0-1 score)
-            date_diff = abs((item.date - match.date).days)
-            date_score = 1 if date_diff == 0 else max(0, 1 - (date_diff / 30))  # Within a month
-
-            # Calculate overall score (0-4)
-            score = name_match + desc_match + location_match + date_score
-
-            # Only create a match if score is above threshold
-            if score > 1:
-                ItemMatch.objects.create(
-                    lost_item=item,
-                    found_item=match,
-                    match_score=score
-                )
-
-    elif item.item_type == 'found':
-        # Find matching lost items
-        potential_matches = Item.objects.filter(
-            item_type='lost',
-            status='approved',
-            category=item.category
-        )
-
-        for match in potential_matches:
-            # Calculate match score (same as above)
-            name_match = 1 if item.name.lower() in match.name.lower() or match.name.lower() in item.name.lower() else 0
-            desc_match = 1 if item.description.lower() in match.description.lower() or match.description.lower() in item.description.lower() else 0
-            location_match = 1 if item.location.lower() in match.location.lower() or match.location.lower() in item.location.lower() else 0
-
-            date_diff = abs((item.date - match.date).days)
-            date_score = 1 if date_diff == 0 else max(0, 1 - (date_diff / 30))
-
-            score = name_match + desc_match + location_match + date_score
-
-            if score > 1:
-                ItemMatch.objects.create(
-                    lost_item=match,
-                    found_item=item,
-                    match_score=score
-                )
+    upsert_matches(heuristic_matches(item), scorer='heuristic')
 
 def statistics(request):
     """View for displaying statistics and analytics"""
@@ -566,15 +505,17 @@ def statistics(request):
             'found': found_count
         })
 
-    # Top locations
-    top_locations = Item.objects.values('location').annotate(count=Count('id')).order_by('-count')[:5]
+    # Top locations, grouped on the parsed building so spelling variants count together
+    top_buildings = Item.objects.exclude(location_building='').values('location_building').annotate(
+        count=Count('id')
+    ).order_by('-count')[:5]
+    top_locations = [
+        {'location': row['location_building'].title(), 'count': row['count']}
+        for row in top_buildings
+    ]
 
     # Match success rate
-    total_matches = ItemMatch.objects.count()
-    successful_matches = ItemMatch.objects.filter(
-        Q(lost_item__status='claimed') | Q(lost_item__status='returned') |
-        Q(found_item__status='claimed') | Q(found_item__status='returned')
-    ).count()
+    total_matches, successful_matches = match_success_counts()
 
     match_success_rate = 0
     if total_matches > 0:
@@ -603,7 +544,7 @@ def statistics(request):
 
 def success_dashboard(request):
     """Enhanced success rate dashboard"""
-    from django.db.models import Count, Q
+    from django.db.models import Count
     from datetime import timedelta
     import json
 
@@ -620,11 +561,7 @@ def success_dashboard(request):
         success_rate = round(((total_returned + total_claimed) / total_lost) * 100, 1)
 
     # Match statistics
-    total_matches = ItemMatch.objects.count()
-    successful_matches = ItemMatch.objects.filter(
-        Q(lost_item__status='claimed') | Q(lost_item__status='returned') |
-        Q(found_item__status='claimed') | Q(found_item__status='returned')
-    ).count()
+    total_matches, successful_matches = match_success_counts()
 
     match_success_rate = 0
     if total_matches > 0:
@@ -666,7 +603,7 @@ def success_dashboard(request):
         })
 
     # Recent matches
-    recent_matches = ItemMatch.objects.select_related('lost_item', 'found_item').order_by('-created_at')[:10]
+    recent_matches = ItemMatch.objects.filter(active=True).select_related('lost_item', 'found_item').order_by('-created_at')[:10]
 
     # Chart data for last 30 days
     thirty_days_ago = timezone.now() - timedelta(days=30)
@@ -731,6 +668,37 @@ def api_items_by_date(request):
 
     return JsonResponse({'data': items_by_date})
 
+def suggest_etag(request):
+    """ETag for suggestions: changes whenever items change or the query differs"""
+    key = f"{current_item_version()}:{request.GET.get('field', 'search')}:{request.GET.get('q', '')}"
+    return hashlib.md5(key.encode()).hexdigest()
+
+@cache_control(max_age=60)
+@condition(etag_func=suggest_etag)
+def api_suggest(request):
+    """API endpoint for search-box and location-box autocomplete"""
+    query = request.GET.get('q', '')
+    kinds = FIELD_KINDS.get(request.GET.get('field', 'search'), FIELD_KINDS['search'])
+    try:
+        limit = min(int(request.GET.get('limit', 10)), 25)
+    except ValueError:
+        limit = 10
+
+    suggestions = get_suggest_index().lookup(query, kinds=kinds, limit=limit)
+    return JsonResponse({'query': query, 'suggestions': suggestions})
+
+@login_required
+def api_search_stats(request):
+    """API endpoint exposing search cache and fallback counters for monitoring"""
+    if not request.user.is_staff:
+        return HttpResponseForbidden("You don't have permission to view search statistics.")
+
+    return JsonResponse({
+        'cache': search_cache.stats(),
+        'fallback_tiers': tier_stats(),
+        'item_version': current_item_version(),
+    })
+
 def share_item(request, pk):
     """View for sharing an item on social media"""
     item = get_object_or_404(Item, pk=pk)
@@ -749,6 +717,25 @@ def select_location(request):
     context = {
         'form_action': form_action,
         'cancel_url': cancel_url,
+        'latitude': request.GET.get('lat', ''),
+        'longitude': request.GET.get('lng', ''),
     }
 
     return render(request, 'items/map_location.html', context)
+
+def api_map_clusters(request):
+    """API endpoint returning pre-aggregated item clusters for a map viewport"""
+    try:
+        west, south, east, north = (float(value) for value in request.GET.get('bbox', '').split(','))
+        zoom = int(request.GET.get('zoom', 15))
+    except ValueError:
+        return JsonResponse({'error': 'bbox must be "west,south,east,north" and zoom an integer'}, status=400)
+
+    item_type = request.GET.get('item_type') or None
+    precision, clusters = clusters_in_view(south, west, north, east, zoom, item_type)
+
+    return JsonResponse({
+        'zoom': zoom,
+        'precision': precision,
+        'clusters': clusters,
+    })